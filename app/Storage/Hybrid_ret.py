@@ -6,37 +6,79 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')
 from app.Storage.keyword_ret import KeywordRetrieverManager
 from app.Storage.vectors import VectorDatabaseManager
 from app.dataloader.Database import VectorDB
-from app.llm_config import no_k, vector_weight, keyword_weight
-from langchain_community.retrievers import BM25Retriever
-from langchain.retrievers import EnsembleRetriever
-from langchain.retrievers.document_compressors import CohereRerank
-from langchain.retrievers import ContextualCompressionRetriever, MergerRetriever
+from app.llm_config import no_k, vector_weight, keyword_weight, vector_index_mode, unified_index_directory
+from langchain.retrievers import ContextualCompressionRetriever
+from app.Storage.parallel_ret import ConcurrentEnsembleRetriever
+from app.Storage.fusion import scored_retriever
+from app.Storage.registry import RetrieverRegistry
+from app.Storage.rerankers import get_reranker
 from app.logger import logging
 
 base_path = Path("resources/data")
 keyword_manager = KeywordRetrieverManager()
 
-# Initialize reranker
-reranker = CohereRerank(
-    cohere_api_key=os.getenv("cohere_api_key"),
-    model="rerank-v3.5",
-    top_n=no_k
-)
+# Source files of each department and the directory each is indexed in outside the unified mode
+DEPARTMENT_SOURCES = {
+    "engineering": [("engineering/engineering_master_doc.md", "eng_db")],
+    "finance": [("finance/financial_summary.md", "fin_db1"), ("finance/quarterly_financial_report.md", "fin_db2")],
+    "general": [("general/employee_handbook.md", "gen_db")],
+    "hr": [("hr/hr_data.csv", "hr_db")],
+    "marketing": [("marketing/market_report_q4_2024.md", "mark_db"), ("marketing/marketing_report_2024.md", "mark2_db")],
+}
+
+
+def department_filter(departments=None):
+    """Chroma where clause selecting departments of the unified index; None searches all of them."""
+    if not departments:
+        return None
+    departments = list(departments)
+    if len(departments) == 1:
+        return {"department": departments[0]}
+    return {"department": {"$in": departments}}
+
+
+def create_unified_retriever(departments=None, k: int = no_k):
+    """Filtered view of the unified index over one, several or all departments."""
+    store = VectorDB(str(base_path), unified_index_directory).load_existing_db()
+    search_kwargs = {"k": k}
+    where = department_filter(departments)
+    if where is not None:
+        search_kwargs["filter"] = where
+    return scored_retriever(store, **search_kwargs)
+
+
+def create_vector_retrievers(department: str, index_mode: str = vector_index_mode):
+    """Vector retrievers of a department: one per source directory, or one filtered unified search.
+
+    The unified search returns no_k chunks per source so a department sees as many candidates in
+    either mode.
+    """
+    sources = DEPARTMENT_SOURCES[department]
+    if index_mode == "unified":
+        return [create_unified_retriever([department], k=no_k * len(sources))]
+    return [
+        scored_retriever(VectorDB(str(base_path / file_path), db_name).load_existing_db(), k=no_k)
+        for file_path, db_name in sources
+    ]
+
+
+def _hybrid_retriever(department: str, keyword_name: str):
+    vector_retrievers = create_vector_retrievers(department)
+    # vector_weight is shared by a department's vector sources, so fusion weighs vector against keyword
+    # results the same in every department and index mode
+    return ConcurrentEnsembleRetriever(
+        retrievers=[*vector_retrievers, keyword_manager.get_retriever(keyword_name)],
+        weights=[vector_weight / len(vector_retrievers)] * len(vector_retrievers) + [keyword_weight]
+    )
 
 
 def create_engineering_reranker():
     """Create reranker for Engineering department."""
     try:
         logging.info("Creating Engineering reranker...")
-        vector_db = VectorDB(str(base_path / "engineering" / "engineering_master_doc.md"), "eng_db")
-        vector_retriever = vector_db.load_existing_db().as_retriever(search_kwargs={"k": no_k})
-        keyword_retriever = keyword_manager.get_retriever("eng_keyword")
-        ensemble = EnsembleRetriever(
-            retrievers=[vector_retriever, keyword_retriever],
-            weights=[vector_weight, keyword_weight]
-        )
+        ensemble = _hybrid_retriever("engineering", "eng_keyword")
         engineering_reranker = ContextualCompressionRetriever(
-            base_compressor=reranker,
+            base_compressor=get_reranker("engineering"),
             base_retriever=ensemble
         )
         logging.info("✅ Engineering reranker created successfully")
@@ -50,18 +92,9 @@ def create_finance_summary_reranker():
     """Create reranker for Finance Summary."""
     try:
         logging.info("Creating Finance Summary reranker...")
-        vector_db1 = VectorDB(str(base_path / "finance" / "financial_summary.md"), "fin_db1")
-        vector_db2 = VectorDB(str(base_path / "finance" / "quarterly_financial_report.md"), "fin_db2")
-        vector_retriever1 = vector_db1.load_existing_db().as_retriever(search_kwargs={"k": no_k})
-        vector_retriever2 = vector_db2.load_existing_db().as_retriever(search_kwargs={"k": no_k})
-        lotr = MergerRetriever(retrievers=[vector_retriever1, vector_retriever2])
-        keyword_retriever = keyword_manager.get_retriever("fin_summary_keyword")
-        ensemble = EnsembleRetriever(
-            retrievers=[lotr, keyword_retriever],
-            weights=[vector_weight, keyword_weight]
-        )
+        ensemble = _hybrid_retriever("finance", "fin_summary_keyword")
         finance_summary_reranker = ContextualCompressionRetriever(
-            base_compressor=reranker,
+            base_compressor=get_reranker("finance"),
             base_retriever=ensemble
         )
         logging.info("✅ Finance Summary reranker created successfully")
@@ -76,15 +109,9 @@ def create_general_reranker():
     """Create reranker for Employee Handbook (General)."""
     try:
         logging.info("Creating General (Employee Handbook) reranker...")
-        vector_db = VectorDB(str(base_path / "general" / "employee_handbook.md"), "gen_db")
-        vector_retriever = vector_db.load_existing_db().as_retriever(search_kwargs={"k": no_k})
-        keyword_retriever = keyword_manager.get_retriever("general_keyword")
-        ensemble = EnsembleRetriever(
-            retrievers=[vector_retriever, keyword_retriever],
-            weights=[vector_weight, keyword_weight]
-        )
+        ensemble = _hybrid_retriever("general", "general_keyword")
         general_reranker = ContextualCompressionRetriever(
-            base_compressor=reranker,
+            base_compressor=get_reranker("general"),
             base_retriever=ensemble
         )       
         logging.info("✅ General reranker created successfully")
@@ -98,15 +125,9 @@ def create_hr_reranker():
     """Create reranker for HR Data."""
     try:
         logging.info("Creating HR reranker...")
-        vector_db = VectorDB(str(base_path / "hr" / "hr_data.csv"), "hr_db")
-        vector_retriever = vector_db.load_existing_db().as_retriever(search_kwargs={"k": no_k})
-        keyword_retriever = keyword_manager.get_retriever("hr_keyword")
-        ensemble = EnsembleRetriever(
-            retrievers=[vector_retriever, keyword_retriever],
-            weights=[vector_weight, keyword_weight]
-        )
+        ensemble = _hybrid_retriever("hr", "hr_keyword")
         hr_reranker = ContextualCompressionRetriever(
-            base_compressor=reranker,
+            base_compressor=get_reranker("hr"),
             base_retriever=ensemble
         )
         logging.info("✅ HR reranker created successfully")
@@ -120,19 +141,9 @@ def create_marketing_reranker():
     """Create reranker for Marketing Report."""
     try:
         logging.info("Creating Marketing reranker...")
-        vector_db1 = VectorDB(str(base_path / "marketing" / "market_report_q4_2024.md"), "mark_db")
-        vector_db2 = VectorDB(str(base_path / "marketing" / "marketing_report_2024.md"), "mark2_db")
-        vector_retriever = vector_db1.load_existing_db().as_retriever(search_kwargs={"k": no_k})
-        vector_retriever1 = vector_db2.load_existing_db().as_retriever(search_kwargs={"k": no_k})
-        keyword_retriever2 = keyword_manager.get_retriever("marketing_keyword")
-        lotr = MergerRetriever(retrievers=[vector_retriever1, vector_retriever2])
-
-        ensemble = EnsembleRetriever(
-            retrievers=[lotr, keyword_retriever],
-            weights=[vector_weight, keyword_weight]
-        )
+        ensemble = _hybrid_retriever("marketing", "marketing_keyword")
         marketing_reranker = ContextualCompressionRetriever(
-            base_compressor=reranker,
+            base_compressor=get_reranker("marketing"),
             base_retriever=ensemble
         )
         logging.info("✅ Marketing reranker created successfully")
@@ -142,6 +153,59 @@ def create_marketing_reranker():
         return None
 
 
+def _vector_paths(department):
+    """Index directories a department is served from in the configured mode."""
+    if vector_index_mode == "unified":
+        return [Path(unified_index_directory)]
+    return [Path(db_name) for _, db_name in DEPARTMENT_SOURCES[department]]
+
+
+def _keyword_files(name):
+    """Legacy pickle and memory-mapped index of a keyword retriever; meta.json is rewritten on every index build."""
+    return [keyword_manager.storage_path / f"{name}.pkl", keyword_manager.storage_path / name / "meta.json"]
+
+
+def _evict_keyword_retrievers(*names):
+    """Drop cached keyword retrievers so a reload picks up the files on disk."""
+    def evict():
+        for name in names:
+            keyword_manager.retrievers.pop(name, None)
+    return evict
+
+
+# Shared pipelines, built once per process and rebuilt when their index files change
+retriever_registry = RetrieverRegistry()
+retriever_registry.register(
+    "engineering",
+    create_engineering_reranker,
+    watch_paths=[base_path / "engineering", *_vector_paths("engineering"), *_keyword_files("eng_keyword")],
+    on_reload=_evict_keyword_retrievers("eng_keyword")
+)
+retriever_registry.register(
+    "finance",
+    create_finance_summary_reranker,
+    watch_paths=[base_path / "finance", *_vector_paths("finance"), *_keyword_files("fin_summary_keyword")],
+    on_reload=_evict_keyword_retrievers("fin_summary_keyword")
+)
+retriever_registry.register(
+    "general",
+    create_general_reranker,
+    watch_paths=[base_path / "general", *_vector_paths("general"), *_keyword_files("general_keyword")],
+    on_reload=_evict_keyword_retrievers("general_keyword")
+)
+retriever_registry.register(
+    "hr",
+    create_hr_reranker,
+    watch_paths=[base_path / "hr", *_vector_paths("hr"), *_keyword_files("hr_keyword")],
+    on_reload=_evict_keyword_retrievers("hr_keyword")
+)
+retriever_registry.register(
+    "marketing",
+    create_marketing_reranker,
+    watch_paths=[base_path / "marketing", *_vector_paths("marketing"), *_keyword_files("marketing_keyword")],
+    on_reload=_evict_keyword_retrievers("marketing_keyword")
+)
+
 
 if __name__ == "__main__":
 
@@ -0,0 +1,183 @@
+import sys
+import os
+import json
+import math
+import mmap
+import shutil
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from app.llm_config import no_k
+from app.logger import logging
+
+INDEX_VERSION = 1
+
+
+def default_preprocessing_func(text: str) -> List[str]:
+    """Same whitespace tokenization as LangChain's BM25Retriever, so scores match the pickled retrievers."""
+    return text.split()
+
+
+def build_bm25_index(documents: List[Document], index_dir, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25,
+                     preprocess_func: Callable[[str], List[str]] = default_preprocessing_func):
+    """Write a BM25Okapi inverted index as flat arrays that BM25Index memory-maps.
+
+    Layout: a sorted term dictionary, CSR-style postings (doc ids and term frequencies with
+    per-term offsets), precomputed IDF and length norms, and the documents as JSONL with
+    byte offsets so they can be sliced out of the mapped file without parsing the rest.
+    """
+    index_dir = Path(index_dir)
+    tmp_dir = index_dir.with_name(index_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    postings = defaultdict(list)
+    doc_lengths = np.zeros(len(documents))
+    for doc_id, doc in enumerate(documents):
+        tokens = preprocess_func(doc.page_content)
+        doc_lengths[doc_id] = len(tokens)
+        for term, tf in Counter(tokens).items():
+            postings[term].append((doc_id, tf))
+
+    terms = sorted(postings)
+    n_docs = len(documents)
+    avg_length = float(doc_lengths.mean()) if n_docs else 0.0
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    postings_docs, postings_tfs = [], []
+    idf = np.zeros(len(terms))
+    for term_id, term in enumerate(terms):
+        entries = postings[term]
+        offsets[term_id + 1] = offsets[term_id] + len(entries)
+        postings_docs.extend(doc_id for doc_id, _ in entries)
+        postings_tfs.extend(tf for _, tf in entries)
+        idf[term_id] = math.log(n_docs - len(entries) + 0.5) - math.log(len(entries) + 0.5)
+
+    # Same negative-IDF flooring as rank_bm25.BM25Okapi
+    if len(terms):
+        floor = epsilon * float(idf.mean())
+        idf[idf < 0] = floor
+
+    norms = k1 * (1 - b + b * doc_lengths / avg_length) if avg_length else np.full(n_docs, k1)
+
+    np.save(tmp_dir / "terms.npy", np.array(terms, dtype=str) if terms else np.array([], dtype="<U1"))
+    np.save(tmp_dir / "term_offsets.npy", offsets)
+    np.save(tmp_dir / "postings_docs.npy", np.array(postings_docs, dtype=np.int32))
+    np.save(tmp_dir / "postings_tfs.npy", np.array(postings_tfs, dtype=np.float32))
+    np.save(tmp_dir / "idf.npy", idf)
+    np.save(tmp_dir / "norms.npy", norms)
+
+    doc_offsets = np.zeros(n_docs + 1, dtype=np.int64)
+    with open(tmp_dir / "docs.jsonl", "wb") as f:
+        for doc_id, doc in enumerate(documents):
+            line = json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}).encode("utf-8") + b"\n"
+            f.write(line)
+            doc_offsets[doc_id + 1] = doc_offsets[doc_id] + len(line)
+    np.save(tmp_dir / "doc_offsets.npy", doc_offsets)
+
+    with open(tmp_dir / "meta.json", "w") as f:
+        json.dump({"version": INDEX_VERSION, "k1": k1, "b": b, "epsilon": epsilon,
+                   "n_docs": n_docs, "n_terms": len(terms), "avg_length": avg_length}, f)
+
+    # Swap the finished index in so readers never see a half-written directory
+    if index_dir.exists():
+        shutil.rmtree(index_dir)
+    os.replace(tmp_dir, index_dir)
+    logging.info(f"BM25 index with {n_docs} documents and {len(terms)} terms written to {index_dir}")
+
+
+class BM25Index:
+    """Read-only, memory-mapped BM25 index; pages are shared between every process that maps it."""
+
+    def __init__(self, index_dir):
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / "meta.json") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported BM25 index version {self.meta.get('version')} in {self.index_dir}")
+        self.k1 = self.meta["k1"]
+        self.n_docs = self.meta["n_docs"]
+        self.terms = np.load(self.index_dir / "terms.npy", mmap_mode="r")
+        self.term_offsets = np.load(self.index_dir / "term_offsets.npy", mmap_mode="r")
+        self.postings_docs = np.load(self.index_dir / "postings_docs.npy", mmap_mode="r")
+        self.postings_tfs = np.load(self.index_dir / "postings_tfs.npy", mmap_mode="r")
+        self.idf = np.load(self.index_dir / "idf.npy", mmap_mode="r")
+        self.norms = np.load(self.index_dir / "norms.npy", mmap_mode="r")
+        self.doc_offsets = np.load(self.index_dir / "doc_offsets.npy", mmap_mode="r")
+        self._docs_file = open(self.index_dir / "docs.jsonl", "rb")
+        self._docs = mmap.mmap(self._docs_file.fileno(), 0, access=mmap.ACCESS_READ) if self.n_docs else b""
+
+    @staticmethod
+    def exists(index_dir) -> bool:
+        return (Path(index_dir) / "meta.json").exists()
+
+    def term_id(self, term: str) -> int:
+        """Position of a term in the sorted dictionary, or -1 if absent."""
+        if not len(self.terms) or len(term) > self.terms.dtype.itemsize // 4:
+            return -1
+        position = int(np.searchsorted(self.terms, term))
+        if position < len(self.terms) and self.terms[position] == term:
+            return position
+        return -1
+
+    def get_scores(self, query_tokens: List[str]) -> np.ndarray:
+        """BM25Okapi score of every document, accumulated one postings list at a time."""
+        scores = np.zeros(self.n_docs)
+        for token in query_tokens:
+            term_id = self.term_id(token)
+            if term_id < 0:
+                continue
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            doc_ids = self.postings_docs[start:end]
+            tfs = self.postings_tfs[start:end]
+            scores[doc_ids] += self.idf[term_id] * tfs * (self.k1 + 1) / (tfs + self.norms[doc_ids])
+        return scores
+
+    def document(self, doc_id: int) -> Document:
+        raw = json.loads(self._docs[self.doc_offsets[doc_id]:self.doc_offsets[doc_id + 1]])
+        return Document(page_content=raw["page_content"], metadata=raw["metadata"])
+
+    def top_n(self, query_tokens: List[str], n: int) -> List[Document]:
+        if not self.n_docs:
+            return []
+        scores = self.get_scores(query_tokens)
+        # Same ordering as rank_bm25.get_top_n, including how ties fall, so results match the pickled retrievers
+        ranked = np.argsort(scores)[::-1][:n]
+        documents = [self.document(int(doc_id)) for doc_id in ranked]
+        # Fusion's "score" method normalises these instead of falling back to ranks
+        for document, doc_id in zip(documents, ranked):
+            document.metadata["score"] = float(scores[doc_id])
+        return documents
+
+    def close(self):
+        if isinstance(self._docs, mmap.mmap):
+            self._docs.close()
+        self._docs_file.close()
+
+
+class MmapBM25Retriever(BaseRetriever):
+    """Drop-in replacement for BM25Retriever backed by a memory-mapped BM25Index."""
+
+    index: Any
+    k: int = no_k
+    preprocess_func: Callable[[str], List[str]] = default_preprocessing_func
+
+    @classmethod
+    def load(cls, index_dir, k: int = no_k, **kwargs) -> "MmapBM25Retriever":
+        return cls(index=BM25Index(index_dir), k=k, **kwargs)
+
+    @classmethod
+    def from_documents(cls, documents: List[Document], index_dir, k: int = no_k, **kwargs) -> "MmapBM25Retriever":
+        build_bm25_index(documents, index_dir)
+        return cls.load(index_dir, k=k, **kwargs)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: Optional[CallbackManagerForRetrieverRun] = None
+    ) -> List[Document]:
+        return self.index.top_n(self.preprocess_func(query), self.k)
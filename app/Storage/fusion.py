@@ -0,0 +1,133 @@
+import sys
+import os
+import re
+import zlib
+import hashlib
+from typing import Any, List, Optional, Sequence
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStoreRetriever
+from app.llm_config import (
+    fusion_method,
+    fusion_rrf_k,
+    fusion_near_duplicate_threshold,
+    fusion_max_candidates,
+    fusion_hash_dimensions,
+)
+
+FUSION_METHODS = ("rrf", "score")
+_TOKEN = re.compile(r"\w+")
+
+
+def content_hash(text: str) -> str:
+    """Hash of a chunk with whitespace collapsed, so re-split copies of the same text collide."""
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def shingle_vectors(texts: Sequence[str], dimensions: int = fusion_hash_dimensions) -> np.ndarray:
+    """L2-normalised hashed word unigram and bigram counts, one row per text.
+
+    Cheap enough to compute per query and close enough to catch chunks that share most of their
+    text, which is what overlapping splits and copies of a paragraph in two reports look like.
+    """
+    vectors = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = _TOKEN.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        if features:
+            buckets = np.fromiter((zlib.crc32(f.encode("utf-8")) % dimensions for f in features),
+                                  dtype=np.int64, count=len(features))
+            vectors[row] = np.bincount(buckets, minlength=dimensions)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class ScoredVectorRetriever(VectorStoreRetriever):
+    """Similarity search that keeps each chunk's relevance score in metadata["relevance_score"] for fusion."""
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                **kwargs: Any) -> List[Document]:
+        # The unchecked variant: L2 relevance of unnormalised embeddings can leave [0, 1], which
+        # min-max fusion does not mind but the public method warns about on every query
+        results = self.vectorstore._similarity_search_with_relevance_scores(query, **(self.search_kwargs | kwargs))
+        return [_with_score(doc, score) for doc, score in results]
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun,
+                                       **kwargs: Any) -> List[Document]:
+        results = await self.vectorstore._asimilarity_search_with_relevance_scores(query, **(self.search_kwargs | kwargs))
+        return [_with_score(doc, score) for doc, score in results]
+
+
+def _with_score(doc: Document, score: float) -> Document:
+    return Document(page_content=doc.page_content, metadata={**doc.metadata, "relevance_score": float(score)}, id=doc.id)
+
+
+def scored_retriever(vectorstore, **search_kwargs) -> ScoredVectorRetriever:
+    """Drop-in for vectorstore.as_retriever(search_kwargs=...) whose results carry relevance scores."""
+    return ScoredVectorRetriever(vectorstore=vectorstore, search_kwargs=search_kwargs)
+
+
+def _list_scores(docs: List[Document], method: str, c: int) -> np.ndarray:
+    ranks = np.arange(1, len(docs) + 1, dtype=np.float64)
+    if method == "score":
+        scores = [d.metadata.get("score", d.metadata.get("relevance_score")) for d in docs]
+        if docs and all(isinstance(s, (int, float)) for s in scores):
+            scores = np.asarray(scores, dtype=np.float64)
+            spread = scores.max() - scores.min()
+            return (scores - scores.min()) / spread if spread else np.ones_like(scores)
+        # Children not built with scored_retriever or MmapBM25Retriever fall back to a linear rank score in [0, 1]
+        return 1.0 - (ranks - 1) / max(len(docs), 1)
+    return 1.0 / (c + ranks)
+
+
+def fuse_documents(doc_lists: List[List[Document]], weights: Sequence[float], method: str = fusion_method,
+                   c: int = fusion_rrf_k, near_duplicate_threshold: Optional[float] = fusion_near_duplicate_threshold,
+                   max_candidates: Optional[int] = fusion_max_candidates) -> List[Document]:
+    """Fuse ranked lists from several retrievers into one deduplicated, capped candidate list.
+
+    Documents are keyed by content hash and their weighted scores summed with one bincount, which
+    gives the same order as EnsembleRetriever's weighted RRF. Walking that order, a candidate whose
+    cosine similarity to one already kept reaches near_duplicate_threshold is dropped, until
+    max_candidates are kept for the reranker.
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method {method}, expected one of {FUSION_METHODS}")
+    if len(doc_lists) != len(weights):
+        raise ValueError("Number of rank lists must be equal to the number of weights.")
+
+    slots, unique_docs, positions, contributions = {}, [], [], []
+    for docs, weight in zip(doc_lists, weights):
+        if not docs:
+            continue
+        for doc in docs:
+            key = content_hash(doc.page_content)
+            if key not in slots:
+                slots[key] = len(unique_docs)
+                unique_docs.append(doc)
+            positions.append(slots[key])
+        contributions.append(weight * _list_scores(docs, method, c))
+    if not unique_docs:
+        return []
+
+    scores = np.bincount(np.asarray(positions), weights=np.concatenate(contributions), minlength=len(unique_docs))
+    # Stable sort keeps first-seen order on ties, like sorted(..., reverse=True)
+    order = np.argsort(-scores, kind="stable")
+
+    limit = len(order) if max_candidates is None else min(max_candidates, len(order))
+    if near_duplicate_threshold is None:
+        return [unique_docs[i] for i in order[:limit]]
+
+    # Walk candidates best first and stop once the cap is filled, so only those few are vectorised
+    kept, kept_vectors = [], np.zeros((limit, fusion_hash_dimensions), dtype=np.float32)
+    for i in order:
+        vector = shingle_vectors([unique_docs[i].page_content])[0]
+        if kept and (kept_vectors[:len(kept)] @ vector >= near_duplicate_threshold).any():
+            continue
+        kept_vectors[len(kept)] = vector
+        kept.append(i)
+        if len(kept) == limit:
+            break
+    return [unique_docs[i] for i in kept]
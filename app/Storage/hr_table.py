@@ -0,0 +1,167 @@
+import sys
+import os
+import csv
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.llm_config import hr_data_path, hr_query_max_rows
+from app.logger import logging
+from app.exception import CustomException
+
+# Column types of hr_data.csv; text columns compare case-insensitively
+HR_SCHEMA = {
+    "employee_id": "TEXT",
+    "full_name": "TEXT",
+    "role": "TEXT",
+    "department": "TEXT",
+    "email": "TEXT",
+    "location": "TEXT",
+    "date_of_birth": "TEXT",
+    "date_of_joining": "TEXT",
+    "manager_id": "TEXT",
+    "salary": "REAL",
+    "leave_balance": "INTEGER",
+    "leaves_taken": "INTEGER",
+    "attendance_pct": "REAL",
+    "performance_rating": "INTEGER",
+    "last_review_date": "TEXT",
+}
+INDEXED_COLUMNS = ["department", "manager_id", "location"]
+DEFAULT_SELECT = ["employee_id", "full_name", "role", "department", "location"]
+AGGREGATES = {"count": "COUNT(*)", "avg": "AVG({})", "sum": "SUM({})", "min": "MIN({})", "max": "MAX({})"}
+OPERATORS = {"=", "!=", ">", ">=", "<", "<="}
+
+
+class HRTable:
+    """hr_data.csv loaded once into a typed in-memory SQLite table, queried through validated HRQuery specs."""
+
+    def __init__(self, csv_path: str = hr_data_path, max_rows: int = hr_query_max_rows):
+        self.csv_path = Path(csv_path)
+        self.max_rows = max_rows
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _column_definition(self, name: str, sql_type: str) -> str:
+        return f"{name} {sql_type} COLLATE NOCASE" if sql_type == "TEXT" else f"{name} {sql_type}"
+
+    def _load(self):
+        try:
+            connection = sqlite3.connect(":memory:", check_same_thread=False)
+            columns = ", ".join(self._column_definition(name, sql_type) for name, sql_type in HR_SCHEMA.items())
+            connection.execute(f"CREATE TABLE employees ({columns})")
+            with open(self.csv_path, newline="", encoding="utf-8") as f:
+                rows = [tuple(self._convert(name, row.get(name, "")) for name in HR_SCHEMA) for row in csv.DictReader(f)]
+            placeholders = ", ".join("?" * len(HR_SCHEMA))
+            connection.executemany(f"INSERT INTO employees VALUES ({placeholders})", rows)
+            for column in INDEXED_COLUMNS:
+                connection.execute(f"CREATE INDEX idx_employees_{column} ON employees ({column})")
+            connection.commit()
+            logging.info(f"HR table loaded with {len(rows)} employees from {self.csv_path}")
+            return connection
+        except Exception as e:
+            logging.error(f"Failed to load HR table: {str(e)}")
+            raise CustomException(e, sys)
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            with self._lock:
+                if self._connection is None:
+                    self._connection = self._load()
+        return self._connection
+
+    @staticmethod
+    def _convert(column: str, value: str):
+        value = (value or "").strip()
+        if HR_SCHEMA[column] == "TEXT" or value == "":
+            return value or None
+        return float(value) if HR_SCHEMA[column] == "REAL" else int(float(value))
+
+    def _where(self, spec) -> Tuple[str, List[Any]]:
+        for column in [f.column for f in spec.filters] + list(spec.select) + [spec.order_by, spec.group_by, spec.aggregate_column]:
+            if column is not None and column not in HR_SCHEMA:
+                raise ValueError(f"Unknown HR column {column}")
+
+        conditions, params = [], []
+        for condition in spec.filters:
+            if condition.op == "contains":
+                conditions.append(f"{condition.column} LIKE ?")
+                params.append(f"%{condition.value}%")
+            elif condition.op in OPERATORS:
+                conditions.append(f"{condition.column} {condition.op} ?")
+                params.append(self._convert(condition.column, condition.value))
+            else:
+                raise ValueError(f"Unknown operator {condition.op}")
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+    def build_sql(self, spec) -> Tuple[str, List[Any]]:
+        """Translate an HRQuery into parameterised SQL; column names come only from HR_SCHEMA."""
+        where, params = self._where(spec)
+        limit = min(spec.limit, self.max_rows)
+
+        if spec.aggregate == "list":
+            select = list(dict.fromkeys(spec.select or DEFAULT_SELECT))
+            order = f" ORDER BY {spec.order_by} {'DESC' if spec.descending else 'ASC'}" if spec.order_by else ""
+            return f"SELECT {', '.join(select)} FROM employees{where}{order} LIMIT {limit}", params
+
+        value = AGGREGATES[spec.aggregate].format(spec.aggregate_column)
+        if spec.group_by:
+            return (f"SELECT {spec.group_by}, {value} AS value, COUNT(*) AS employees FROM employees{where} "
+                    f"GROUP BY {spec.group_by} ORDER BY value {'DESC' if spec.descending else 'ASC'} "
+                    f"LIMIT {limit}", params)
+        return f"SELECT {value} AS value, COUNT(*) AS employees FROM employees{where}", params
+
+    def build_total_sql(self, spec) -> Tuple[str, List[Any]]:
+        """SQL counting every employee (or group) a list or group-by HRQuery matches, ignoring its limit."""
+        where, params = self._where(spec)
+        if spec.group_by:
+            return f"SELECT COUNT(*) FROM (SELECT 1 FROM employees{where} GROUP BY {spec.group_by})", params
+        return f"SELECT COUNT(*) FROM employees{where}", params
+
+    def execute(self, spec) -> Dict[str, Any]:
+        """Run an HRQuery and return the SQL, column names, rows and how many rows matched before the limit."""
+        sql, params = self.build_sql(spec)
+        connection = self.connection
+        with self._lock:
+            cursor = connection.execute(sql, params)
+            rows = cursor.fetchall()
+            columns = [description[0] for description in cursor.description]
+            total = len(rows)
+            # Only a result that filled its limit can have been cut short
+            if (spec.aggregate == "list" or spec.group_by) and len(rows) >= min(spec.limit, self.max_rows):
+                total = connection.execute(*self.build_total_sql(spec)).fetchone()[0]
+        logging.info(f"HR structured query returned {len(rows)} of {total} row(s): {sql}")
+        return {"sql": sql, "params": params, "columns": columns, "rows": rows, "total": total}
+
+    @staticmethod
+    def format_result(spec, result: Dict[str, Any]) -> str:
+        """Render a query result as a short answer without another LLM call."""
+        rows, columns = result["rows"], result["columns"]
+        conditions = " and ".join(f"{f.column} {f.op} {f.value}" for f in spec.filters) or "all employees"
+        if spec.aggregate != "list" and not spec.group_by:
+            value, employees = rows[0] if rows else (None, 0)
+            if spec.aggregate == "count":
+                return f"{employees} employee(s) match {conditions}."
+            if value is None:
+                return f"No employees match {conditions}."
+            label = f"{spec.aggregate} {spec.aggregate_column}"
+            return f"The {label} for {conditions} is {round(value, 2)} across {employees} employee(s)."
+        if not rows:
+            return f"No employees match {conditions}."
+        header = "| " + " | ".join(columns) + " |"
+        divider = "| " + " | ".join("---" for _ in columns) + " |"
+        lines = ["| " + " | ".join("" if v is None else str(round(v, 2) if isinstance(v, float) else v) for v in row) + " |"
+                 for row in rows]
+        total = result.get("total", len(rows))
+        heading = f"Results for {conditions}"
+        if total > len(rows):
+            matched = f"{spec.group_by} groups" if spec.group_by else "matching employees"
+            heading += f" (showing {len(rows)} of {total} {matched})"
+        return f"{heading}:\n\n" + "\n".join([header, divider, *lines])
+
+
+hr_table = HRTable()
@@ -1,11 +1,14 @@
 import sys
 import os
+import json
 import pickle
+import argparse
 from pathlib import Path
 from typing import Dict, List, Optional
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from langchain.retrievers import BM25Retriever, EnsembleRetriever
+from langchain.retrievers import EnsembleRetriever
+from app.Storage.bm25_index import BM25Index, MmapBM25Retriever
 from app.dataloader.splitter import TextSplitter
 from app.dataloader.dataload import DataLoader
 from app.llm_config import no_k
@@ -15,8 +18,10 @@ from app.logger import logging
 class KeywordRetrieverManager:
     """Manages creation and storage of BM25 keyword retrievers for different departments."""
     
-    def __init__(self, base_resources_path="resources/data", retrievers_storage_path="retrievers", top_k: int = no_k):
+    def __init__(self, base_resources_path="resources/data", retrievers_storage_path="retrievers", top_k: int = no_k,
+                 incremental: bool = False):
         self.base_path = Path(base_resources_path)
+        self.incremental = incremental
         self.storage_path = Path(retrievers_storage_path)
         self.storage_path.mkdir(exist_ok=True)
         self.top_k = top_k
@@ -95,18 +100,27 @@ class KeywordRetrieverManager:
             
             # Split text into chunks
             chunks = self.text_splitter.split_text(documents)
+            chunk_hashes = sorted({chunk.metadata["chunk_hash"] for chunk in chunks})
             
-            # Create BM25 retriever
-            retriever = BM25Retriever.from_documents(
+            # BM25 statistics are corpus-wide, so any chunk change means a rebuild; an unchanged corpus is skipped
+            if self.incremental and self._load_manifest(config['retriever_name']) == chunk_hashes:
+                retriever = self.get_retriever(config['retriever_name'])
+                if retriever is not None:
+                    logging.info(f"{config['name']} Keyword Retriever unchanged, skipping rebuild")
+                    print(f"✅ {config['name']} Keyword Retriever Unchanged")
+                    return retriever
+            
+            # Build the memory-mapped BM25 index on disk and open the retriever over it
+            retriever = MmapBM25Retriever.from_documents(
                 chunks, 
+                self._index_dir(config['retriever_name']),
                 k=config['k']
             )
             
             # Store retriever
             self.retrievers[config['retriever_name']] = retriever
-            
-            # Save retriever to disk
-            self._save_retriever(retriever, config['retriever_name'])
+            logging.info(f"Retriever {config['retriever_name']} saved to {self._index_dir(config['retriever_name'])}")
+            self._save_manifest(config['retriever_name'], chunk_hashes)
             
             logging.info(f"{config['name']} Keyword Retriever Created Successfully")
             print(f"✅ {config['name']} Keyword Retriever Created")
@@ -163,21 +177,56 @@ class KeywordRetrieverManager:
             print(f"Available retrievers: {', '.join(available_names)}")
             return None
     
-    def _save_retriever(self, retriever, name):
-        """Save retriever to disk for later use."""
-        try:
+    def _index_dir(self, name):
+        """Directory holding the memory-mapped BM25 index of a retriever."""
+        return self.storage_path / name
+    
+    def migrate_pickles(self):
+        """Convert legacy pickled BM25Retrievers into memory-mapped indexes, keeping their documents and k."""
+        migrated = []
+        for config in self.retrievers_config:
+            name = config['retriever_name']
             file_path = self.storage_path / f"{name}.pkl"
-            with open(file_path, 'wb') as f:
-                pickle.dump(retriever, f)
-            logging.info(f"Retriever {name} saved to {file_path}")
+            if not file_path.exists() or BM25Index.exists(self._index_dir(name)):
+                continue
+            try:
+                with open(file_path, 'rb') as f:
+                    legacy = pickle.load(f)
+                self.retrievers[name] = MmapBM25Retriever.from_documents(legacy.docs, self._index_dir(name), k=legacy.k)
+                migrated.append(name)
+                print(f"✅ {name} migrated to memory-mapped index")
+            except Exception as e:
+                logging.error(f"Error migrating retriever {name}: {str(e)}")
+                print(f"❌ Error migrating {name}: {str(e)}")
+        return migrated
+    
+    def _save_manifest(self, name, chunk_hashes):
+        """Record the chunk hashes a retriever was built from."""
+        try:
+            with open(self.storage_path / f"{name}.manifest.json", 'w') as f:
+                json.dump(chunk_hashes, f)
         except Exception as e:
-            logging.error(f"Error saving retriever {name}: {str(e)}")
+            logging.error(f"Error saving manifest for {name}: {str(e)}")
+    
+    def _load_manifest(self, name):
+        """Chunk hashes the saved retriever was built from, or None if unknown."""
+        try:
+            with open(self.storage_path / f"{name}.manifest.json") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
     
     def load_retriever(self, name):
-        """Load a saved retriever from disk."""
+        """Load a saved retriever from disk, preferring the memory-mapped index over a legacy pickle."""
         try:
+            index_dir = self._index_dir(name)
+            if BM25Index.exists(index_dir):
+                retriever = MmapBM25Retriever.load(index_dir, k=self.top_k)
+                logging.info(f"Retriever {name} mapped from {index_dir}")
+                return retriever
             file_path = self.storage_path / f"{name}.pkl"
             if file_path.exists():
+                logging.warning(f"Loading legacy pickled retriever {name}, run keyword_ret.py --migrate-pickles to convert it")
                 with open(file_path, 'rb') as f:
                     retriever = pickle.load(f)
                 logging.info(f"Retriever {name} loaded from {file_path}")
@@ -248,9 +297,20 @@ class KeywordRetrieverManager:
 
 def main():
     """Main function to execute keyword retriever creation."""
+    parser = argparse.ArgumentParser(description="Build the department keyword retrievers")
+    parser.add_argument("--incremental", action="store_true", help="skip retrievers whose chunks have not changed")
+    parser.add_argument("--migrate-pickles", action="store_true",
+                        help="convert existing .pkl retrievers to memory-mapped indexes without re-reading the sources")
+    args = parser.parse_args()
+    
     try:
         # Initialize the manager
-        manager = KeywordRetrieverManager()
+        manager = KeywordRetrieverManager(incremental=args.incremental)
+        
+        if args.migrate_pickles:
+            migrated = manager.migrate_pickles()
+            print(f"📊 Migrated {len(migrated)} retriever(s)")
+            return
         
         # Create all retrievers
         retrievers = manager.create_all_retrievers()
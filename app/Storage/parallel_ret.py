@@ -0,0 +1,124 @@
+import sys
+import os
+import time
+import asyncio
+from concurrent.futures import wait
+from typing import List, Optional
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from langchain.retrievers import EnsembleRetriever
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor, patch_config
+from langchain_core.vectorstores import VectorStoreRetriever
+from app.Storage.fusion import fuse_documents
+from app.llm_config import (
+    retrieval_child_timeout,
+    retrieval_max_workers,
+    fusion_method,
+    fusion_near_duplicate_threshold,
+    fusion_max_candidates,
+)
+from app.monitoring.metrics import timed_span
+from app.logger import logging
+
+# Shared by every department; threads carry the caller's context so callbacks and tracing still nest
+_executor = ContextThreadPoolExecutor(max_workers=retrieval_max_workers, thread_name_prefix="retrieval")
+
+
+def _as_documents(results) -> List[Document]:
+    return [Document(page_content=r) if isinstance(r, str) else r for r in results]
+
+
+class ConcurrentEnsembleRetriever(EnsembleRetriever):
+    """EnsembleRetriever that queries its children at the same time and fuses whatever answers in time.
+
+    Each child gets child_timeout seconds; a child that is slower or fails is left out of the fusion
+    and logged, so retrieval costs the slowest healthy child instead of the sum of all of them.
+    Results are fused by fuse_documents, which also drops near-duplicates and caps the candidates.
+    """
+
+    child_timeout: float = retrieval_child_timeout
+    fusion_method: str = fusion_method
+    near_duplicate_threshold: Optional[float] = fusion_near_duplicate_threshold
+    max_candidates: Optional[int] = fusion_max_candidates
+
+    def _child_name(self, index: int) -> str:
+        return f"retriever_{index + 1} ({type(self.retrievers[index]).__name__})"
+
+    def _child_span(self, index: int) -> str:
+        # Vector children are Chroma collections; every other child is a BM25 keyword index
+        return "chroma" if isinstance(self.retrievers[index], VectorStoreRetriever) else "bm25"
+
+    def _invoke_child(self, index: int, query: str, config: RunnableConfig):
+        with timed_span(self._child_span(index), self._child_name(index)):
+            return self.retrievers[index].invoke(query, config)
+
+    async def _ainvoke_child(self, index: int, query: str, config: RunnableConfig):
+        with timed_span(self._child_span(index), self._child_name(index)):
+            return await self.retrievers[index].ainvoke(query, config)
+
+    def rank_fusion(self, query: str, run_manager: CallbackManagerForRetrieverRun, *,
+                    config: Optional[RunnableConfig] = None) -> List[Document]:
+        start = time.perf_counter()
+        futures = [
+            _executor.submit(
+                self._invoke_child,
+                i,
+                query,
+                patch_config(config, callbacks=run_manager.get_child(tag=f"retriever_{i + 1}"))
+            )
+            for i in range(len(self.retrievers))
+        ]
+        wait(futures, timeout=self.child_timeout)
+
+        doc_lists, weights = [], []
+        for i, future in enumerate(futures):
+            if not future.done():
+                future.cancel()
+                logging.warning(f"{self._child_name(i)} missed the {self.child_timeout}s retrieval deadline")
+                continue
+            if future.exception() is not None:
+                logging.error(f"{self._child_name(i)} failed: {future.exception()}")
+                continue
+            doc_lists.append(_as_documents(future.result()))
+            weights.append(self.weights[i])
+
+        logging.info(f"Concurrent retrieval: {len(doc_lists)}/{len(futures)} children in "
+                     f"{(time.perf_counter() - start) * 1000:.1f} ms")
+        return self._fuse(doc_lists, weights)
+
+    async def arank_fusion(self, query: str, run_manager: AsyncCallbackManagerForRetrieverRun, *,
+                           config: Optional[RunnableConfig] = None) -> List[Document]:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            asyncio.wait_for(
+                self._ainvoke_child(i, query, patch_config(config, callbacks=run_manager.get_child(tag=f"retriever_{i + 1}"))),
+                timeout=self.child_timeout
+            )
+            for i in range(len(self.retrievers))
+        ], return_exceptions=True)
+
+        doc_lists, weights = [], []
+        for i, result in enumerate(results):
+            if isinstance(result, asyncio.TimeoutError):
+                logging.warning(f"{self._child_name(i)} missed the {self.child_timeout}s retrieval deadline")
+                continue
+            if isinstance(result, BaseException):
+                logging.error(f"{self._child_name(i)} failed: {result}")
+                continue
+            doc_lists.append(_as_documents(result))
+            weights.append(self.weights[i])
+
+        logging.info(f"Concurrent retrieval: {len(doc_lists)}/{len(results)} children in "
+                     f"{(time.perf_counter() - start) * 1000:.1f} ms")
+        return self._fuse(doc_lists, weights)
+
+    def _fuse(self, doc_lists: List[List[Document]], weights: List[float]) -> List[Document]:
+        if not doc_lists:
+            logging.error("No retriever answered before the deadline")
+            return []
+        return fuse_documents(doc_lists, weights, method=self.fusion_method, c=self.c,
+                              near_duplicate_threshold=self.near_duplicate_threshold,
+                              max_candidates=self.max_candidates)
@@ -0,0 +1,120 @@
+import sys
+import os
+import time
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.llm_config import retriever_reload_interval
+from app.logger import logging
+
+
+class RetrieverRegistry:
+    """Process-wide registry that builds each department retrieval pipeline once and shares it."""
+
+    def __init__(self, reload_interval: float = retriever_reload_interval):
+        self.reload_interval = reload_interval
+        self._factories: Dict[str, Callable] = {}
+        self._watch_paths: Dict[str, List[Path]] = {}
+        self._on_reload: Dict[str, Optional[Callable]] = {}
+        self._instances: Dict[str, object] = {}
+        self._signatures: Dict[str, Tuple] = {}
+        self._last_check: Dict[str, float] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable, watch_paths: Iterable = (), on_reload: Optional[Callable] = None):
+        """Register a pipeline factory and the index files it is built from."""
+        with self._lock:
+            self._factories[name] = factory
+            self._watch_paths[name] = [Path(p) for p in watch_paths]
+            self._on_reload[name] = on_reload
+            self._instances.pop(name, None)
+            self._signatures.pop(name, None)
+
+    def names(self) -> List[str]:
+        """Names of all registered pipelines."""
+        return list(self._factories.keys())
+
+    def signature(self, name: str) -> Tuple:
+        """Fingerprint of the watched index files (path, mtime, size) for a pipeline."""
+        entries = []
+        for path in self._watch_paths.get(name, []):
+            if path.is_dir():
+                for root, _, files in os.walk(path):
+                    for file_name in sorted(files):
+                        entries.append(self._stat_entry(Path(root) / file_name))
+            else:
+                entries.append(self._stat_entry(path))
+        return tuple(sorted(entries))
+
+    @staticmethod
+    def _stat_entry(path: Path) -> Tuple:
+        try:
+            stat = path.stat()
+            return (str(path), stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return (str(path), 0, 0)
+
+    def _build(self, name: str):
+        if name not in self._factories:
+            raise KeyError(f"No retriever registered under '{name}'")
+        on_reload = self._on_reload.get(name)
+        if name in self._instances and on_reload is not None:
+            on_reload()
+        instance = self._factories[name]()
+        if instance is not None:
+            # Fingerprint after building, since opening Chroma touches its sqlite file
+            self._instances[name] = instance
+            self._signatures[name] = self.signature(name)
+            self._last_check[name] = time.monotonic()
+            self._generations[name] = self._generations.get(name, 0) + 1
+            logging.info(f"Retriever pipeline '{name}' built and registered")
+        return instance
+
+    def _is_stale(self, name: str) -> bool:
+        if self.reload_interval is None or self.reload_interval < 0:
+            return False
+        now = time.monotonic()
+        if now - self._last_check.get(name, 0.0) < self.reload_interval:
+            return False
+        self._last_check[name] = now
+        return self.signature(name) != self._signatures.get(name)
+
+    def get(self, name: str):
+        """Return the shared pipeline, building it on first use or after its index files change."""
+        instance = self._instances.get(name)
+        if instance is not None and not self._is_stale(name):
+            return instance
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is not None and self._signatures.get(name) == self.signature(name):
+                return instance
+            if instance is not None:
+                logging.info(f"Index files for '{name}' changed, reloading retriever pipeline")
+            return self._build(name)
+
+    def generation(self, name: str) -> int:
+        """Build counter of a pipeline, bumped every time it is rebuilt after its index files change."""
+        self.get(name)
+        return self._generations.get(name, 0)
+
+    def reload(self, name: Optional[str] = None):
+        """Force a rebuild of one pipeline, or all of them when no name is given."""
+        with self._lock:
+            targets = [name] if name else self.names()
+            for target in targets:
+                self._build(target)
+
+    def warm(self) -> Dict[str, bool]:
+        """Build every registered pipeline up front, returning which ones succeeded."""
+        status = {}
+        for name in self.names():
+            try:
+                status[name] = self.get(name) is not None
+            except Exception as e:
+                logging.error(f"Error warming retriever pipeline '{name}': {str(e)}")
+                status[name] = False
+        logging.info(f"Retriever registry warmed: {status}")
+        return status
@@ -0,0 +1,211 @@
+import sys
+import os
+import argparse
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import numpy as np
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import Document
+from langchain_core.documents.compressor import BaseDocumentCompressor
+from langchain.retrievers.document_compressors import CohereRerank
+from app.llm_config import (
+    no_k,
+    reranker_backends,
+    reranker_default_backend,
+    cohere_rerank_model,
+    cross_encoder_model,
+    cross_encoder_model_dir,
+    cross_encoder_max_length,
+    cross_encoder_threads,
+    fake_providers,
+)
+from app.monitoring.metrics import metrics, timed_span
+from app.monitoring.tracing import tracer
+from app.logger import logging
+
+RERANKER_BACKENDS = ("cohere", "cross_encoder", "none")
+
+
+@lru_cache(maxsize=None)
+def _load_cross_encoder(model_dir: str, threads: int, max_length: int):
+    """One onnxruntime session and tokenizer per model, shared by every department using it."""
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+
+    model_dir = Path(model_dir)
+    model_path = model_dir / "model_int8.onnx"
+    if not model_path.exists():
+        model_path = model_dir / "model.onnx"
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+    tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+    tokenizer.enable_truncation(max_length=max_length)
+    tokenizer.enable_padding()
+    logging.info(f"Cross-encoder loaded from {model_path}")
+    return session, tokenizer
+
+
+class CrossEncoderReranker(BaseDocumentCompressor):
+    """In-process cross-encoder reranker running an (int8 quantized) ONNX model on CPU.
+
+    All (question, chunk) pairs are scored in a single batched forward pass, so reranking costs
+    one local inference instead of a network round-trip.
+    """
+
+    model_dir: str = cross_encoder_model_dir
+    top_n: int = no_k
+    max_length: int = cross_encoder_max_length
+    threads: int = cross_encoder_threads
+
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        """Relevance logit of every text for the query."""
+        session, tokenizer = _load_cross_encoder(self.model_dir, self.threads, self.max_length)
+        encodings = tokenizer.encode_batch([(query, text) for text in texts])
+        features = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        inputs = {i.name: features[i.name] for i in session.get_inputs()}
+        logits = session.run(None, inputs)[0]
+        # Single-logit heads score relevance directly, two-class heads put it in the last column
+        return logits.reshape(len(texts), -1)[:, -1]
+
+    def compress_documents(
+        self, documents: Sequence[Document], query: str, callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        if not documents:
+            return []
+        scores = self.score(query, [doc.page_content for doc in documents])
+        ranked = np.argsort(-scores, kind="stable")[:self.top_n]
+        results = []
+        for index in ranked:
+            doc = documents[int(index)]
+            # Same metadata key as CohereRerank, as a probability
+            metadata = {**doc.metadata, "relevance_score": float(1 / (1 + np.exp(-scores[index])))}
+            results.append(Document(page_content=doc.page_content, metadata=metadata))
+        return results
+
+
+class PassthroughReranker(BaseDocumentCompressor):
+    """Keeps the ensemble's fused order and only truncates it to top_n."""
+
+    top_n: int = no_k
+
+    def compress_documents(
+        self, documents: Sequence[Document], query: str, callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        return list(documents)[:self.top_n]
+
+
+class TimedReranker(BaseDocumentCompressor):
+    """Records the latency of every rerank call under the rerank span, labelled by backend."""
+
+    reranker: BaseDocumentCompressor
+    backend: str
+
+    def compress_documents(
+        self, documents: Sequence[Document], query: str, callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        with timed_span("rerank", self.backend):
+            return self.reranker.compress_documents(documents, query, callbacks)
+
+    async def acompress_documents(
+        self, documents: Sequence[Document], query: str, callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        with timed_span("rerank", self.backend):
+            return await self.reranker.acompress_documents(documents, query, callbacks)
+
+
+def create_reranker(backend: str, top_n: int = no_k) -> BaseDocumentCompressor:
+    """Build a reranker for one of RERANKER_BACKENDS."""
+    if backend == "cohere" and fake_providers:
+        from app.fake_providers import FakeCohereRerank
+        return FakeCohereRerank(top_n=top_n)
+    if backend == "cohere":
+        return CohereRerank(cohere_api_key=os.getenv("cohere_api_key"), model=cohere_rerank_model, top_n=top_n)
+    if backend == "cross_encoder":
+        return CrossEncoderReranker(top_n=top_n)
+    if backend == "none":
+        return PassthroughReranker(top_n=top_n)
+    raise ValueError(f"Unknown reranker backend '{backend}', expected one of {RERANKER_BACKENDS}")
+
+
+_rerankers: Dict[str, BaseDocumentCompressor] = {}
+_rerankers_lock = threading.Lock()
+
+
+def get_reranker(department: str) -> BaseDocumentCompressor:
+    """Reranker configured for a department; instances are shared between departments on the same backend."""
+    backend = reranker_backends.get(department, reranker_default_backend)
+    with _rerankers_lock:
+        if backend not in _rerankers:
+            reranker = create_reranker(backend)
+            if metrics.enabled or tracer.enabled:
+                reranker = TimedReranker(reranker=reranker, backend=backend)
+            _rerankers[backend] = reranker
+            logging.info(f"{backend} reranker created")
+        return _rerankers[backend]
+
+
+def export_cross_encoder(model_name: str = cross_encoder_model, output_dir: str = cross_encoder_model_dir,
+                         quantize: bool = True):
+    """Export a Hugging Face cross-encoder to ONNX and quantize its weights to int8.
+
+    Needs torch, transformers and onnx, which are only required where the model is exported.
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    sample = tokenizer(["what is the leave policy"], ["employees get 12 days of sick leave"], return_tensors="pt")
+    input_names = list(sample.keys())
+
+    class _Logits(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).logits
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+    torch.onnx.export(
+        _Logits(), tuple(sample[name] for name in input_names), str(output_dir / "model.onnx"),
+        input_names=input_names, output_names=["logits"], dynamic_axes=dynamic_axes, opset_version=14
+    )
+    tokenizer.backend_tokenizer.save(str(output_dir / "tokenizer.json"))
+    print(f"✅ {model_name} exported to {output_dir / 'model.onnx'}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(output_dir / "model.onnx"), str(output_dir / "model_int8.onnx"), weight_type=QuantType.QInt8)
+        print(f"✅ int8 model written to {output_dir / 'model_int8.onnx'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepare the local cross-encoder reranker")
+    parser.add_argument("--export", action="store_true", help="export and quantize the configured cross-encoder")
+    parser.add_argument("--model", default=cross_encoder_model)
+    parser.add_argument("--output-dir", default=cross_encoder_model_dir)
+    parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+
+    if args.export:
+        export_cross_encoder(args.model, args.output_dir, quantize=not args.no_quantize)
+    for department, backend in reranker_backends.items():
+        print(f"• {department}: {backend}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 import sys
 import os
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add the app directory to Python path
@@ -7,13 +10,34 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')
 
 from app.logger import logging
 from app.dataloader.Database import VectorDB
+from app.llm_config import (
+    embedding_batch_size,
+    embedding_max_concurrency,
+    index_build_workers,
+    vector_index_mode,
+    unified_index_directory,
+)
+
+VECTOR_INDEX_MODES = ("per_department", "unified")
 
 
 class VectorDatabaseManager:
     """Manages creation of multiple vector databases for different departments."""
     
-    def __init__(self, base_resources_path="resources/data"):
+    def __init__(self, base_resources_path="resources/data", batch_size: int = embedding_batch_size,
+                 max_workers: int = index_build_workers, resume: bool = True, incremental: bool = False,
+                 index_mode: str = vector_index_mode, unified_directory: str = unified_index_directory):
+        if index_mode not in VECTOR_INDEX_MODES:
+            raise ValueError(f"Unknown vector index mode {index_mode}, expected one of {VECTOR_INDEX_MODES}")
         self.base_path = Path(base_resources_path)
+        self.index_mode = index_mode
+        self.unified_directory = unified_directory
+        self.incremental = incremental
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.resume = resume
+        # Shared across department workers so parallel builds stay under the embedding rate limit
+        self.embedding_semaphore = threading.BoundedSemaphore(embedding_max_concurrency)
         self.databases_config = self._get_databases_config()
     
     def _get_databases_config(self):
@@ -21,42 +45,49 @@ class VectorDatabaseManager:
         return [
             {
                 "name": "Engineering",
+                "department": "engineering",
                 "file_path": self.base_path / "engineering" / "engineering_master_doc.md",
                 "db_name": "eng_db",
                 "type": "markdown"
             },
             {
                 "name": "Finance Summary",
+                "department": "finance",
                 "file_path": self.base_path / "finance" / "financial_summary.md",
                 "db_name": "fin_db1",
                 "type": "markdown"
             },
             {
                 "name": "Quarterly Financial Report",
+                "department": "finance",
                 "file_path": self.base_path / "finance" / "quarterly_financial_report.md",
                 "db_name": "fin_db2",
                 "type": "markdown"
             },
             {
                 "name": "Employee Handbook",
+                "department": "general",
                 "file_path": self.base_path / "general" / "employee_handbook.md",
                 "db_name": "gen_db",
                 "type": "markdown"
             },
             {
                 "name": "HR Data",
+                "department": "hr",
                 "file_path": self.base_path / "hr" / "hr_data.csv",
                 "db_name": "hr_db",
                 "type": "csv"
             },
             {
                 "name": "Marketing Report",
+                "department": "marketing",
                 "file_path": self.base_path / "marketing" / "market_report_q4_2024.md",
                 "db_name": "mark_db",
                 "type": "markdown"
             },
             {
                 "name": "Marketing Report",
+                "department": "marketing",
                 "file_path": self.base_path / "marketing" / "marketing_report_2024.md",
                 "db_name": "mark2_db",
                 "type": "markdown"
@@ -90,10 +121,25 @@ class VectorDatabaseManager:
             vector_db = VectorDB(str(config['file_path']), config['db_name'])
             
             # Create database based on type
+            if self.incremental:
+                summary = vector_db.sync_vector_db(
+                    file_type=config['type'],
+                    batch_size=self.batch_size,
+                    semaphore=self.embedding_semaphore
+                )
+                logging.info(f"{config['name']} Database Synced: {summary}")
+                print(f"✅ {config['name']} Database Synced ({summary['added']} added, {summary['removed']} removed)")
+                return True
+            
+            build_options = {
+                "batch_size": self.batch_size,
+                "resume": self.resume,
+                "semaphore": self.embedding_semaphore
+            }
             if config['type'] == 'csv':
-                db = vector_db.create_csv_vector_db()
+                db = vector_db.create_csv_vector_db(**build_options)
             else:  # markdown
-                db = vector_db.create_vector_db()
+                db = vector_db.create_vector_db(**build_options)
             
             logging.info(f"{config['name']} Database Completed Successfully")
             print(f"✅ {config['name']} Database Completed")
@@ -104,20 +150,62 @@ class VectorDatabaseManager:
             print(f"❌ Error creating {config['name']} database: {str(e)}")
             return False
     
-    def create_all_databases(self):
-        """Create all vector databases."""
+    def _load_tagged_chunks(self, config):
+        """Split one source file and tag its chunks with the department they are served to."""
+        if not config['file_path'].exists():
+            raise FileNotFoundError(f"File not found: {config['file_path']}")
+        chunks = VectorDB(str(config['file_path']), self.unified_directory).load_chunks(config['type'])
+        for chunk in chunks:
+            chunk.metadata["department"] = config['department']
+        print(f"✅ {config['name']}: {len(chunks)} chunks ({config['department']})")
+        return chunks
+
+    def create_unified_database(self):
+        """Build every department into one collection whose chunks carry department and source metadata."""
+        print("🚀 Starting Unified Vector Index Creation...")
+        print("=" * 60)
+        try:
+            with ThreadPoolExecutor(max_workers=max(self.max_workers, 1), thread_name_prefix="index-load") as pool:
+                chunks = [chunk for file_chunks in pool.map(self._load_tagged_chunks, self.databases_config)
+                          for chunk in file_chunks]
+
+            index = VectorDB(str(self.base_path), self.unified_directory)
+            if self.incremental:
+                summary = index.sync_chunks(chunks, self.unified_directory, self.batch_size, self.embedding_semaphore)
+                print(f"✅ Unified index synced ({summary['added']} added, {summary['removed']} removed)")
+            else:
+                index.build_from_chunks(chunks, batch_size=self.batch_size, resume=self.resume,
+                                        semaphore=self.embedding_semaphore)
+                print(f"✅ Unified index built with {len(chunks)} chunks")
+
+            print("=" * 60)
+            print(f"🎉 Unified index ready in {self.unified_directory}")
+            logging.info(f"Unified vector index built in {self.unified_directory} with {len(chunks)} chunks")
+            return True
+        except Exception as e:
+            logging.error(f"Error creating unified vector index: {str(e)}")
+            print(f"❌ Error creating unified vector index: {str(e)}")
+            return False
+
+    def create_all_databases(self, parallel: bool = True):
+        """Create all vector databases, building departments concurrently on a worker pool."""
+        if self.index_mode == "unified":
+            return self.create_unified_database()
+
         print("🚀 Starting Vector Database Creation Process...")
         print("=" * 60)
         
-        successful = 0
-        failed = 0
+        if parallel and self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="index-build") as pool:
+                results = list(pool.map(self.create_single_database, self.databases_config))
+        else:
+            results = []
+            for config in self.databases_config:
+                results.append(self.create_single_database(config))
+                print("-" * 40)
         
-        for config in self.databases_config:
-            if self.create_single_database(config):
-                successful += 1
-            else:
-                failed += 1
-            print("-" * 40)
+        successful = sum(1 for result in results if result)
+        failed = len(results) - successful
         
         # Summary
         print("=" * 60)
@@ -149,9 +237,19 @@ class VectorDatabaseManager:
 
 def main():
     """Main function to execute vector database creation."""
+    parser = argparse.ArgumentParser(description="Build the department vector databases")
+    parser.add_argument("--batch-size", type=int, default=embedding_batch_size, help="chunks embedded per request")
+    parser.add_argument("--workers", type=int, default=index_build_workers, help="departments built in parallel")
+    parser.add_argument("--fresh", action="store_true", help="ignore checkpoints and rebuild from scratch")
+    parser.add_argument("--incremental", action="store_true", help="only embed new chunks and delete removed ones")
+    parser.add_argument("--index-mode", choices=VECTOR_INDEX_MODES, default=vector_index_mode,
+                        help="separate directories per source or one collection filtered by department")
+    args = parser.parse_args()
+    
     try:
         # Initialize the manager
-        manager = VectorDatabaseManager()
+        manager = VectorDatabaseManager(batch_size=args.batch_size, max_workers=args.workers, resume=not args.fresh,
+                                        incremental=args.incremental, index_mode=args.index_mode)
         
         # Create all databases
         manager.create_all_databases()
@@ -0,0 +1,195 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import re
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+from app.llm_config import (
+    answer_cache_enabled,
+    answer_cache_max_entries,
+    answer_cache_ttl,
+    answer_cache_similarity_threshold,
+)
+from app.logger import logging
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivially different phrasings share a key."""
+    question = _PUNCTUATION.sub(" ", question.lower())
+    return _WHITESPACE.sub(" ", question).strip()
+
+
+class AnswerCache:
+    """Two tier (exact and embedding similarity) cache of department answers.
+
+    Entries are keyed on the normalized question, the routed department and the caller's role,
+    evicted least recently used beyond max_entries or after ttl seconds, and dropped when the index
+    generation of any department the answer came from changes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = answer_cache_max_entries,
+        ttl: float = answer_cache_ttl,
+        similarity_threshold: Optional[float] = answer_cache_similarity_threshold,
+        embeddings=None,
+        index_generation: Optional[Callable[[str], int]] = None,
+        enabled: bool = answer_cache_enabled,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.enabled = enabled
+        self.index_generation = index_generation
+        self._embeddings = embeddings
+        self._entries: "OrderedDict[Tuple[str, str, str], Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from app.dataloader.Database import get_embeddings
+            self._embeddings = get_embeddings()
+        return self._embeddings
+
+    @staticmethod
+    def _departments(department: str) -> Tuple[str, ...]:
+        # Multi-route answers are cached under the joined label route_node gives them, e.g. "finance+marketing"
+        return tuple(department.split("+"))
+
+    def _generation(self, department: str) -> Tuple[int, ...]:
+        """Index generation of every department the answer was built from."""
+        if self.index_generation is None:
+            return (0,)
+        generations = []
+        for name in self._departments(department):
+            try:
+                generations.append(self.index_generation(name))
+            except Exception as e:
+                logging.error(f"Could not read index generation for {name}: {str(e)}")
+                generations.append(-1)
+        return tuple(generations)
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        if self.similarity_threshold is None:
+            return None
+        try:
+            # The raw question is embedded so retrieval reuses the same cached query vector
+            vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            return vector / norm if norm else None
+        except Exception as e:
+            logging.error(f"Answer cache embedding failed, skipping semantic tier: {str(e)}")
+            return None
+
+    def _expire(self, now: float):
+        expired = [key for key, entry in self._entries.items() if now - entry["created"] > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def _drop_stale(self, department: str, generation: Tuple[int, ...]):
+        current = dict(zip(self._departments(department), generation))
+        stale = [key for key, entry in self._entries.items()
+                 if any(name in current and current[name] != built
+                        for name, built in zip(self._departments(key[1]), entry["generation"]))]
+        if stale:
+            logging.info(f"Index for {department} rebuilt, invalidating {len(stale)} cached answers")
+        for key in stale:
+            del self._entries[key]
+
+    def get(self, question: str, department: str, role: str) -> Optional[str]:
+        """Return a cached answer for the question, trying the exact tier before the semantic tier."""
+        if not self.enabled:
+            return None
+        normalized = normalize_question(question)
+        key = (normalized, department, role)
+        generation = self._generation(department)
+        with self._lock:
+            self._expire(time.time())
+            self._drop_stale(department, generation)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits["exact"] += 1
+                return entry["response"]
+            candidates = [(k, e) for k, e in self._entries.items()
+                          if k[1] == department and k[2] == role and e["vector"] is not None]
+
+        if candidates:
+            vector = self._embed(question)
+            if vector is not None:
+                similarities = np.stack([e["vector"] for _, e in candidates]) @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    best_key, best_entry = candidates[best]
+                    with self._lock:
+                        if best_key in self._entries:
+                            self._entries.move_to_end(best_key)
+                        self.hits["semantic"] += 1
+                    logging.info(f"Semantic answer cache hit ({similarities[best]:.3f}) for {department}")
+                    return best_entry["response"]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, question: str, department: str, role: str, response: str):
+        """Cache an answer produced by a department node."""
+        if not self.enabled or not response:
+            return
+        normalized = normalize_question(question)
+        entry = {
+            "response": response,
+            "created": time.time(),
+            "generation": self._generation(department),
+            "vector": self._embed(question),
+        }
+        with self._lock:
+            self._entries[(normalized, department, role)] = entry
+            self._entries.move_to_end((normalized, department, role))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def aget(self, question: str, department: str, role: str) -> Optional[str]:
+        """Async variant of get, the embedding call runs in a worker thread"""
+        return await asyncio.to_thread(self.get, question, department, role)
+
+    async def aput(self, question: str, department: str, role: str, response: str):
+        """Async variant of put"""
+        await asyncio.to_thread(self.put, question, department, role, response)
+
+    def invalidate(self, department: Optional[str] = None):
+        """Drop every cached answer, or only those of one department."""
+        with self._lock:
+            if department is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if department in self._departments(k[1])]:
+                    del self._entries[key]
+
+    def stats(self) -> Dict:
+        """Hit and miss counters plus current size."""
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.hits["exact"],
+            "semantic_hits": self.hits["semantic"],
+            "misses": self.misses,
+        }
+
+
+def _registry_generation(department: str) -> int:
+    from app.Storage.Hybrid_ret import retriever_registry
+    return retriever_registry.generation(department)
+
+
+answer_cache = AnswerCache(index_generation=_registry_generation)
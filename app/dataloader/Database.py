@@ -1,10 +1,12 @@
 from dataloader import DataLoader, TextSplitter
+from dataloader.splitter import chunk_hash
+from dataloader.embedding_cache import CachedEmbeddings
 # from dataload import DataLoader
 # from splitter import TextSplitter
 from langchain_community.vectorstores import Chroma
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.embeddings import HuggingFaceInferenceAPIEmbeddings
-from llm_config import embeddings_model, huggingface_embeddings_model, no_k
+from llm_config import embeddings_model, huggingface_embeddings_model, no_k, embedding_batch_size, embedding_max_retries, embedding_retry_backoff, fake_providers
 from dotenv import load_dotenv
 from langchain.schema import Document
 
@@ -12,6 +14,8 @@ import sys
 import os
 import time
 import json
+import hashlib
+import threading
 from pathlib import Path
 
 app_dir = Path(__file__).parent.parent
@@ -24,6 +28,26 @@ load_dotenv()
 os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 huggingface_api = os.getenv("HUGGINGFACE_API_KEY")
 
+_shared_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings():
+    """Process-wide Gemini embeddings client wrapped in the persistent query/document cache."""
+    global _shared_embeddings
+    if _shared_embeddings is None:
+        with _embeddings_lock:
+            if _shared_embeddings is None and fake_providers:
+                from app.fake_providers import FakeEmbeddings
+                # Own model name so stand-in vectors never mix with Gemini ones in the persistent cache
+                _shared_embeddings = CachedEmbeddings(FakeEmbeddings(), model_name="fake-embeddings")
+            if _shared_embeddings is None:
+                _shared_embeddings = CachedEmbeddings(
+                    GoogleGenerativeAIEmbeddings(model=embeddings_model, google_api_key=os.getenv("GOOGLE_API_KEY")),
+                    model_name=embeddings_model
+                )
+    return _shared_embeddings
+
 
 class VectorDB:
     def __init__(self, file_path: str, persist_directory: str = "db"):
@@ -31,30 +55,164 @@ class VectorDB:
         self.persist_directory = persist_directory
         self.data_loader = DataLoader(file_path)
         self.text_splitter = TextSplitter()
-        self.embeddings = GoogleGenerativeAIEmbeddings(model=embeddings_model, google_api_key=os.getenv("GOOGLE_API_KEY"))
+        self.embeddings = get_embeddings()
         # self.embeddings = HuggingFaceInferenceAPIEmbeddings(
         #     model_name=huggingface_embeddings_model,
         #     api_key=huggingface_api
         # )
         logging.info(f"VectorDB initialized with file_path: {self.file_path} and persist_directory: {self.persist_directory}")
 
-    def create_vector_db(self):
-        """Create a vector database from the loaded documents."""
+    def create_vector_db(self, batch_size: int = embedding_batch_size, resume: bool = True, semaphore=None):
+        """Create a vector database from the loaded documents, embedding in resumable batches."""
         try:
             logging.info("Creating vector database from markdown files.")
             documents = self.data_loader.load_markdown()
             split_docs = self.text_splitter.split_text(documents)
-            vector_db = Chroma.from_documents(
-                split_docs,
-                self.embeddings,
-                persist_directory=self.persist_directory
-            )
+            vector_db = self._build_in_batches(split_docs, self.persist_directory, batch_size, resume, semaphore)
             logging.info(f"Vector database created successfully with {len(split_docs)} documents.")
             return vector_db
         except Exception as e:
             logging.error(f"Error creating vector database: {str(e)}")
             raise CustomException(e, sys) from e
 
+    @staticmethod
+    def _unique_chunks(split_docs):
+        """Drop chunks whose content hash was already seen, so every chunk ID is unique."""
+        unique = {}
+        for doc in split_docs:
+            doc.metadata.setdefault("chunk_hash", chunk_hash(doc))
+            unique.setdefault(doc.metadata["chunk_hash"], doc)
+        return list(unique.values())
+
+    @staticmethod
+    def _fingerprint(split_docs) -> str:
+        digest = hashlib.sha256()
+        for doc in split_docs:
+            digest.update(doc.page_content.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @staticmethod
+    def _read_checkpoint(checkpoint_path: Path) -> dict:
+        try:
+            with open(checkpoint_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_checkpoint(checkpoint_path: Path, checkpoint: dict):
+        tmp_path = checkpoint_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, checkpoint_path)
+
+    def _add_batch_with_retry(self, vector_db, batch, ids, semaphore=None):
+        """Embed and upsert one batch, backing off exponentially on rate limits and transient errors."""
+        for attempt in range(embedding_max_retries + 1):
+            try:
+                if semaphore is not None:
+                    with semaphore:
+                        vector_db.add_documents(batch, ids=ids)
+                else:
+                    vector_db.add_documents(batch, ids=ids)
+                return
+            except Exception as e:
+                if attempt == embedding_max_retries:
+                    raise
+                delay = embedding_retry_backoff * (2 ** attempt)
+                logging.warning(f"Embedding batch failed ({str(e)}), retry {attempt + 1}/{embedding_max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _build_in_batches(self, split_docs, persist_directory: str, batch_size: int, resume: bool, semaphore=None):
+        """Embed chunks batch by batch, checkpointing after each so a failed build resumes where it stopped."""
+        split_docs = self._unique_chunks(split_docs)
+        Path(persist_directory).mkdir(parents=True, exist_ok=True)
+        checkpoint_path = Path(persist_directory) / "build_checkpoint.json"
+        fingerprint = self._fingerprint(split_docs)
+        total_batches = (len(split_docs) + batch_size - 1) // batch_size
+        checkpoint = self._read_checkpoint(checkpoint_path) if resume else {}
+
+        if checkpoint.get("fingerprint") == fingerprint and checkpoint.get("batch_size") == batch_size:
+            start_batch = checkpoint.get("completed_batches", 0)
+            logging.info(f"Resuming {persist_directory} build at batch {start_batch}/{total_batches}")
+            vector_db = Chroma(persist_directory=persist_directory, embedding_function=self.embeddings)
+        else:
+            # Fresh build: drop whatever a previous run left behind so chunks are not duplicated
+            start_batch = 0
+            Chroma(persist_directory=persist_directory, embedding_function=self.embeddings).delete_collection()
+            vector_db = Chroma(persist_directory=persist_directory, embedding_function=self.embeddings)
+
+        for batch_index in range(start_batch, total_batches):
+            start = batch_index * batch_size
+            batch = split_docs[start:start + batch_size]
+            ids = [doc.metadata["chunk_hash"] for doc in batch]
+            self._add_batch_with_retry(vector_db, batch, ids, semaphore)
+            self._write_checkpoint(checkpoint_path, {
+                "fingerprint": fingerprint,
+                "batch_size": batch_size,
+                "completed_batches": batch_index + 1,
+                "total_batches": total_batches,
+            })
+            logging.info(f"{persist_directory}: embedded batch {batch_index + 1}/{total_batches}")
+
+        return vector_db
+
+    def sync_vector_db(self, file_type: str = "markdown", batch_size: int = embedding_batch_size, semaphore=None) -> dict:
+        """Incrementally update the index: embed only new chunks and delete chunks no longer in the source."""
+        try:
+            logging.info(f"Syncing vector database {self.persist_directory} with {self.file_path}")
+            persist_directory = self.persist_directory + "_csv" if file_type == "csv" else self.persist_directory
+            return self.sync_chunks(self.load_chunks(file_type), persist_directory, batch_size, semaphore)
+        except Exception as e:
+            logging.error(f"Error syncing vector database: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    def load_chunks(self, file_type: str = "markdown"):
+        """Load and split the source file into uniquely hashed chunks without embedding them."""
+        documents = self.data_loader.load_csv() if file_type == "csv" else self.data_loader.load_markdown()
+        return self._unique_chunks(self.text_splitter.split_text(documents))
+
+    def sync_chunks(self, split_docs, persist_directory: str, batch_size: int = embedding_batch_size, semaphore=None) -> dict:
+        """Bring an index in line with the given chunks: embed the new ones and delete the ones that are gone."""
+        try:
+            split_docs = self._unique_chunks(split_docs)
+            Path(persist_directory).mkdir(parents=True, exist_ok=True)
+            vector_db = Chroma(persist_directory=persist_directory, embedding_function=self.embeddings)
+            existing_ids = set(vector_db.get(include=[])["ids"])
+            current = {doc.metadata["chunk_hash"]: doc for doc in split_docs}
+
+            new_docs = [doc for chunk_id, doc in current.items() if chunk_id not in existing_ids]
+            removed_ids = sorted(existing_ids - current.keys())
+
+            for start in range(0, len(new_docs), batch_size):
+                batch = new_docs[start:start + batch_size]
+                self._add_batch_with_retry(vector_db, batch, [doc.metadata["chunk_hash"] for doc in batch], semaphore)
+            if removed_ids:
+                vector_db.delete(ids=removed_ids)
+
+            # Keep the build checkpoint in step so a later resumable build sees a finished index
+            self._write_checkpoint(Path(persist_directory) / "build_checkpoint.json", {
+                "fingerprint": self._fingerprint(split_docs),
+                "batch_size": batch_size,
+                "completed_batches": (len(split_docs) + batch_size - 1) // batch_size,
+                "total_batches": (len(split_docs) + batch_size - 1) // batch_size,
+            })
+            summary = {"added": len(new_docs), "removed": len(removed_ids), "unchanged": len(current) - len(new_docs)}
+            logging.info(f"Synced {persist_directory}: {summary}")
+            return summary
+        except Exception as e:
+            logging.error(f"Error syncing chunks into {persist_directory}: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    def build_from_chunks(self, split_docs, batch_size: int = embedding_batch_size, resume: bool = True, semaphore=None):
+        """Embed already split chunks into this database's persist directory, resumable like the file builds."""
+        try:
+            return self._build_in_batches(split_docs, self.persist_directory, batch_size, resume, semaphore)
+        except Exception as e:
+            logging.error(f"Error building {self.persist_directory} from chunks: {str(e)}")
+            raise CustomException(e, sys) from e
+
     def load_existing_db(self):
         """Load an existing vector database."""
         try:
@@ -72,8 +230,9 @@ class VectorDB:
         vector_db = self.load_existing_db()
         new_data_loader = DataLoader(new_file_path)
         new_documents = new_data_loader.load_markdown()
-        new_split_docs = self.text_splitter.split_text(new_documents)
-        vector_db.add_documents(new_split_docs)
+        new_split_docs = self._unique_chunks(self.text_splitter.split_text(new_documents))
+        # Content hash IDs make re-adding the same file an upsert instead of a duplicate
+        vector_db.add_documents(new_split_docs, ids=[doc.metadata["chunk_hash"] for doc in new_split_docs])
         return vector_db
 
     def create_embeddings_for_text(self, text: str):
@@ -94,17 +253,13 @@ class VectorDB:
         vector_db = self.load_existing_db()
         return vector_db.similarity_search_with_score(query, k=k)
 
-    def create_csv_vector_db(self):
-        """Create a vector database from CSV files."""
+    def create_csv_vector_db(self, batch_size: int = embedding_batch_size, resume: bool = True, semaphore=None):
+        """Create a vector database from CSV files, embedding in resumable batches."""
         try:
             logging.info("Creating vector database from CSV files.")
             documents = self.data_loader.load_csv()
             split_docs = self.text_splitter.split_text(documents)
-            vector_db = Chroma.from_documents(
-                split_docs,
-                self.embeddings,
-                persist_directory=self.persist_directory + "_csv"
-            )
+            vector_db = self._build_in_batches(split_docs, self.persist_directory + "_csv", batch_size, resume, semaphore)
             return vector_db
         except Exception as e:
             logging.error(f"Error creating vector database from CSV: {str(e)}")
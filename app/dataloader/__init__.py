@@ -1,3 +1,4 @@
 from .dataload import DataLoader
-from .splitter import TextSplitter
-from .Database import VectorDB
\ No newline at end of file
+from .splitter import TextSplitter, chunk_hash
+from .embedding_cache import CachedEmbeddings
+from .Database import VectorDB, get_embeddings
\ No newline at end of file
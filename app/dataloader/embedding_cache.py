@@ -0,0 +1,149 @@
+import sys
+import os
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+app_dir = Path(__file__).parent.parent
+sys.path.append(str(app_dir))
+sys.path.append(str(app_dir.parent))
+from logger import logging
+from llm_config import embedding_cache_path, embedding_cache_memory_entries
+from app.monitoring.metrics import timed_span
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper with an in-memory LRU in front of a persistent SQLite store.
+
+    Vectors are keyed by model name, kind (query or document, since providers such as Gemini
+    embed them with different task types) and the SHA-256 of the text, so repeated and
+    duplicated embeddings cost no network call and survive restarts.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        cache_path: Optional[str] = embedding_cache_path,
+        max_memory_entries: int = embedding_cache_memory_entries,
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        if cache_path:
+            self._connection = sqlite3.connect(cache_path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, kind TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, kind, text_hash))"
+            )
+            self._connection.commit()
+        logging.info(f"CachedEmbeddings initialized for {model_name} with store {cache_path}")
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, kind: str, hashes: List[str]) -> dict:
+        found = {}
+        missing = []
+        with self._lock:
+            for text_hash in hashes:
+                vector = self._memory.get((kind, text_hash))
+                if vector is not None:
+                    self._memory.move_to_end((kind, text_hash))
+                    found[text_hash] = vector
+                else:
+                    missing.append(text_hash)
+            if missing and self._connection is not None:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._connection.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND kind = ? AND text_hash IN ({placeholders})",
+                    [self.model_name, kind, *missing]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                    found[text_hash] = vector
+                    self._remember(kind, text_hash, vector)
+        return found
+
+    def _remember(self, kind: str, text_hash: str, vector: List[float]):
+        self._memory[(kind, text_hash)] = vector
+        self._memory.move_to_end((kind, text_hash))
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _store(self, kind: str, items: List[Tuple[str, List[float]]]):
+        with self._lock:
+            for text_hash, vector in items:
+                self._remember(kind, text_hash, vector)
+            if self._connection is not None:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, kind, text_hash, vector) VALUES (?, ?, ?, ?)",
+                    [(self.model_name, kind, text_hash, np.asarray(vector, dtype=np.float32).tobytes())
+                     for text_hash, vector in items]
+                )
+                self._connection.commit()
+
+    def _split(self, kind: str, texts: List[str]):
+        hashes = [self._hash(text) for text in texts]
+        found = self._lookup(kind, list(dict.fromkeys(hashes)))
+        # Embed each distinct missing text once, even if it repeats within the batch
+        missing = list(dict.fromkeys(text for text, text_hash in zip(texts, hashes) if text_hash not in found))
+        self.hits += len(texts) - sum(1 for h in hashes if h not in found)
+        self.misses += len(missing)
+        return hashes, found, missing
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, found, missing = self._split("document", texts)
+        if missing:
+            with timed_span("embedding", "document"):
+                vectors = self.underlying.embed_documents(missing)
+            new_items = [(self._hash(text), vector) for text, vector in zip(missing, vectors)]
+            self._store("document", new_items)
+            found.update(new_items)
+        return [found[text_hash] for text_hash in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        hashes, found, missing = self._split("query", [text])
+        if missing:
+            with timed_span("embedding", "query"):
+                vector = self.underlying.embed_query(text)
+            self._store("query", [(hashes[0], vector)])
+            return vector
+        return found[hashes[0]]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, found, missing = self._split("document", texts)
+        if missing:
+            with timed_span("embedding", "document"):
+                vectors = await self.underlying.aembed_documents(missing)
+            new_items = [(self._hash(text), vector) for text, vector in zip(missing, vectors)]
+            self._store("document", new_items)
+            found.update(new_items)
+        return [found[text_hash] for text_hash in hashes]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        hashes, found, missing = self._split("query", [text])
+        if missing:
+            with timed_span("embedding", "query"):
+                vector = await self.underlying.aembed_query(text)
+            self._store("query", [(hashes[0], vector)])
+            return vector
+        return found[hashes[0]]
+
+    def stats(self) -> dict:
+        """Hit and miss counters of the cache."""
+        return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory)}
@@ -1,5 +1,6 @@
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from typing import List, Any
+import hashlib
 from logger import logging
 from llm_config import chunk_overlap, chunk_size
 
@@ -12,6 +13,13 @@ app_dir = Path(__file__).parent.parent
 sys.path.append(str(app_dir))
 from exception import CustomException
 
+
+def chunk_hash(document: Any) -> str:
+    """Stable hash of a chunk's source and content, used as its index ID."""
+    source = str(document.metadata.get("source", ""))
+    return hashlib.sha256(f"{source}\0{document.page_content}".encode("utf-8")).hexdigest()
+
+
 class TextSplitter:
     def __init__(self, chunk_size: int = chunk_size, chunk_overlap: int = chunk_overlap):
         self.chunk_size = chunk_size
@@ -27,6 +35,8 @@ class TextSplitter:
         try:
             logging.info("Starting text splitting process.")
             split_docs = self.text_splitter.split_documents(documents)
+            for doc in split_docs:
+                doc.metadata["chunk_hash"] = chunk_hash(doc)
             logging.info(f"Text splitting completed. Number of chunks created: {len(split_docs)}")
             return split_docs
         except Exception as e:
@@ -0,0 +1,329 @@
+import sys
+import os
+import re
+import json
+import time
+import zlib
+import random
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from chromadb import Documents, EmbeddingFunction
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import Document
+from langchain_core.documents.compressor import BaseDocumentCompressor
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from app.Storage.fusion import shingle_vectors
+from app.llm_config import (
+    fake_latency,
+    fake_jitter,
+    fake_seed,
+    fake_answer_words,
+    fake_embedding_dimensions,
+)
+
+# Keyword routing of the Gemini stand-in; a question matching none of them goes to general
+DEPARTMENT_KEYWORDS = {
+    "engineering": ("engineering", "architecture", "api", "deploy", "infrastructure", "microservice", "security",
+                    "kubernetes", "database", "technical", "system", "code"),
+    "finance": ("finance", "financial", "revenue", "expense", "budget", "cash", "profit", "margin", "quarter",
+                "cost", "spend", "vendor"),
+    "hr": ("employee", "salary", "leave", "attendance", "performance", "manager", "hr", "payroll", "joining",
+           "reports to", "rating"),
+    "marketing": ("marketing", "campaign", "brand", "customer", "acquisition", "market", "advertising", "roi"),
+}
+VOICE_KEYWORDS = ("voice", "audio", "speak", "read it out", "listen")
+_QUESTION = re.compile(r"(?:User question|Question):\s*(.+)")
+_WORD = re.compile(r"\w+")
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+class FakeLatency:
+    """Injected latency of the stand-ins: a base delay per provider with seeded +/- jitter.
+
+    The jitter is drawn from a generator seeded by the provider and the input, so the same call
+    always takes the same time and benchmark runs are reproducible. scale multiplies every delay,
+    0 removes them to measure only the application's own work.
+    """
+
+    def __init__(self, base: Dict[str, float] = fake_latency, jitter: float = fake_jitter, seed: int = fake_seed,
+                 scale: float = 1.0):
+        self.base = dict(base)
+        self.jitter = jitter
+        self.seed = seed
+        self.scale = scale
+
+    def delay(self, provider: str, key: str = "") -> float:
+        base = self.base.get(provider, 0.0) * self.scale
+        if base <= 0:
+            return 0.0
+        rng = random.Random(f"{self.seed}:{provider}:{key}")
+        return max(0.0, base * (1 + self.jitter * rng.uniform(-1, 1)))
+
+    def sleep(self, provider: str, key: str = ""):
+        seconds = self.delay(provider, key)
+        if seconds:
+            time.sleep(seconds)
+
+    async def asleep(self, provider: str, key: str = ""):
+        seconds = self.delay(provider, key)
+        if seconds:
+            await asyncio.sleep(seconds)
+
+
+latency = FakeLatency()
+
+
+def question_of(prompt: str) -> str:
+    """User question of a filled prompt template, or the whole prompt when it has none."""
+    matches = _QUESTION.findall(prompt)
+    return matches[-1].strip() if matches else prompt.strip()
+
+
+def route_departments(question: str) -> List[str]:
+    """Departments whose keywords the question mentions, most hits first."""
+    text = question.lower()
+    scores = {department: sum(keyword in text for keyword in keywords)
+              for department, keywords in DEPARTMENT_KEYWORDS.items()}
+    ranked = sorted((d for d, score in scores.items() if score), key=lambda d: -scores[d])
+    return ranked or ["general"]
+
+
+def _voice(question: str) -> str:
+    return "Yes" if any(keyword in question.lower() for keyword in VOICE_KEYWORDS) else "No"
+
+
+def _hr_query(question: str) -> Dict[str, Any]:
+    text = question.lower()
+    if "how many" in text or "count" in text:
+        return {"structured": True, "aggregate": "count", "group_by": "department"}
+    if "average" in text:
+        column = "attendance_pct" if "attendance" in text else "salary"
+        return {"structured": True, "aggregate": "avg", "aggregate_column": column, "group_by": "department"}
+    return {"structured": False}
+
+
+# Structured outputs the app asks Gemini for, keyed by schema name
+STRUCTURED_OUTPUTS = {
+    "Router": lambda q: {"post": route_departments(q)[0], "voice": _voice(q)},
+    "MultiRouter": lambda q: {"posts": route_departments(q), "voice": _voice(q)},
+    "HRQuery": _hr_query,
+}
+
+
+def _prompt_text(messages: List[BaseMessage]) -> str:
+    return "\n".join(m.content if isinstance(m.content, str) else json.dumps(m.content) for m in messages)
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic Gemini stand-in.
+
+    Answers are answer_words words taken from the prompt at an offset fixed by the question, streamed
+    word by word after the time-to-first-token delay. with_structured_output returns the Router,
+    MultiRouter and HRQuery specs the app asks for, derived from keywords in the question.
+    """
+
+    model: str = "fake-gemini"
+    answer_words: int = fake_answer_words
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _content(self, prompt: str, schema: Optional[str]) -> str:
+        question = question_of(prompt)
+        if schema is not None:
+            return json.dumps(STRUCTURED_OUTPUTS[schema](question))
+        words = _WORD.findall(prompt)
+        if not words:
+            return ""
+        start = zlib.crc32(question.encode("utf-8")) % len(words)
+        return " ".join((words * (self.answer_words // len(words) + 2))[start:start + self.answer_words])
+
+    def _generate(self, messages, stop=None, run_manager=None, fake_schema: Optional[str] = None, **kwargs):
+        prompt = _prompt_text(messages)
+        content = self._content(prompt, fake_schema)
+        latency.sleep("gemini", prompt)
+        if fake_schema is None:
+            time.sleep(latency.delay("gemini_token", prompt) * max(len(content.split()) - 1, 0))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, fake_schema: Optional[str] = None, **kwargs):
+        prompt = _prompt_text(messages)
+        content = self._content(prompt, fake_schema)
+        await latency.asleep("gemini", prompt)
+        if fake_schema is None:
+            await asyncio.sleep(latency.delay("gemini_token", prompt) * max(len(content.split()) - 1, 0))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _stream(self, messages, stop=None, run_manager=None, fake_schema: Optional[str] = None, **kwargs):
+        prompt = _prompt_text(messages)
+        latency.sleep("gemini", prompt)
+        for i, word in enumerate(self._content(prompt, fake_schema).split(" ")):
+            if i:
+                latency.sleep("gemini_token", prompt)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, fake_schema: Optional[str] = None, **kwargs):
+        prompt = _prompt_text(messages)
+        await latency.asleep("gemini", prompt)
+        for i, word in enumerate(self._content(prompt, fake_schema).split(" ")):
+            if i:
+                await latency.asleep("gemini_token", prompt)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def get_num_tokens(self, text: str) -> int:
+        # Close to Gemini's count on English text: a token per punctuation mark and per 4 characters of a word
+        return sum(-(-len(token) // 4) for token in _TOKEN.findall(text))
+
+    def with_structured_output(self, schema, **kwargs):
+        if schema.__name__ not in STRUCTURED_OUTPUTS:
+            raise NotImplementedError(f"FakeChatModel has no structured output for {schema.__name__}")
+        # Still a model call, so callbacks (metrics, tracing) see it like the Gemini one
+        return self.bind(fake_schema=schema.__name__) | RunnableLambda(
+            lambda message: schema.model_validate_json(message.content)
+        )
+
+
+class FakeEmbeddings(Embeddings):
+    """Google embeddings stand-in: hashed word and bigram vectors, so similar texts are close."""
+
+    def __init__(self, dimensions: int = fake_embedding_dimensions):
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        latency.sleep("embeddings", texts[0] if texts else "")
+        return shingle_vectors(texts, self.dimensions).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        latency.sleep("embeddings", text)
+        return shingle_vectors([text], self.dimensions)[0].tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await latency.asleep("embeddings", texts[0] if texts else "")
+        return shingle_vectors(texts, self.dimensions).tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await latency.asleep("embeddings", text)
+        return shingle_vectors([text], self.dimensions)[0].tolist()
+
+
+class FakeChromaEmbeddings(EmbeddingFunction):
+    """Stand-in for Chroma's default ONNX model in conversation memory, so nothing is downloaded."""
+
+    def __init__(self, dimensions: int = fake_embedding_dimensions):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents):
+        return list(shingle_vectors(list(input), self.dimensions))
+
+    @staticmethod
+    def name() -> str:
+        return "fake-shingle"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "FakeChromaEmbeddings":
+        return FakeChromaEmbeddings(config["dimensions"])
+
+
+class FakeCohereRerank(BaseDocumentCompressor):
+    """Cohere rerank stand-in: orders candidates by hashed-shingle cosine to the question."""
+
+    top_n: int = 3
+
+    def compress_documents(
+        self, documents: Sequence[Document], query: str, callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        if not documents:
+            return []
+        latency.sleep("cohere", query)
+        vectors = shingle_vectors([query, *(doc.page_content for doc in documents)])
+        scores = vectors[1:] @ vectors[0]
+        results = []
+        for index in np.argsort(-scores, kind="stable")[:self.top_n]:
+            doc = documents[int(index)]
+            results.append(Document(page_content=doc.page_content,
+                                    metadata={**doc.metadata, "relevance_score": float(scores[index])}))
+        return results
+
+
+def _pcm(transcript: str, sample_rate: int) -> bytes:
+    """A 440 Hz tone lasting about as long as reading the transcript, as 32-bit float mono PCM."""
+    seconds = max(len(transcript.split()), 1) * 0.3
+    t = np.arange(int(seconds * sample_rate), dtype=np.float32) / sample_rate
+    return (0.2 * np.sin(2 * np.pi * 440 * t)).astype("<f4").tobytes()
+
+
+class _FakeTTS:
+    chunk_seconds = 1.0
+
+    def _chunks(self, transcript: str, output_format: Dict[str, Any]):
+        sample_rate = output_format.get("sample_rate", 16000)
+        audio = _pcm(transcript, sample_rate)
+        step = int(self.chunk_seconds * sample_rate) * 4
+        return [audio[i:i + step] for i in range(0, len(audio), step)]
+
+    def bytes(self, *, transcript: str, output_format: Dict[str, Any], **kwargs):
+        latency.sleep("cartesia", transcript)
+        return iter(self._chunks(transcript, output_format))
+
+
+class _FakeAsyncTTS(_FakeTTS):
+
+    async def _stream(self, transcript: str, output_format: Dict[str, Any]):
+        await latency.asleep("cartesia", transcript)
+        for chunk in self._chunks(transcript, output_format):
+            yield chunk
+
+    def bytes(self, *, transcript: str, output_format: Dict[str, Any], **kwargs):
+        return self._stream(transcript, output_format)
+
+
+class FakeCartesia:
+    """Cartesia client stand-in; tts.bytes yields raw PCM chunks like the SDK."""
+
+    def __init__(self, **kwargs):
+        self.tts = _FakeTTS()
+
+
+class FakeAsyncCartesia:
+    """AsyncCartesia stand-in; tts.bytes is an async iterator of raw PCM chunks."""
+
+    def __init__(self, **kwargs):
+        self.tts = _FakeAsyncTTS()
+
+
+FAKE_TRANSCRIPTS = [
+    "What is our leave policy for new employees?",
+    "How did marketing spend affect cash flow last quarter?",
+    "Explain the deployment architecture of the platform.",
+    "What was the revenue growth in the latest quarter?",
+    "How many employees are there in each department?",
+]
+
+
+class FakeTranscriber:
+    """AssemblyAI Transcriber stand-in: the same audio always yields the same fixture question."""
+
+    def transcribe(self, audio_path: str):
+        with open(audio_path, "rb") as f:
+            audio = f.read()
+        latency.sleep("assemblyai", str(len(audio)))
+        text = FAKE_TRANSCRIPTS[zlib.crc32(audio) % len(FAKE_TRANSCRIPTS)]
+        return SimpleNamespace(status="completed", text=text, error=None)
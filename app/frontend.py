@@ -19,6 +19,7 @@ st.set_page_config(
 )
 
 API_URL = "http://localhost:8000/ask"
+STREAM_URL = "http://localhost:8000/ask/stream"
 HISTORY_URL = "http://localhost:8000/history"
 SEARCH_URL = "http://localhost:8000/search"
 
@@ -83,6 +84,35 @@ def get_response_from_api(question, user_email):
     except requests.exceptions.RequestException as e:
         return {"response": f"Connection error: {str(e)}", "audio": ""}
 
+def stream_response_from_api(question, user_email):
+    """Yield (event, data) pairs from the streaming endpoint as they arrive"""
+    try:
+        with requests.post(
+            STREAM_URL,
+            json={
+                "user_question": question,
+                "user_email": user_email
+            },
+            stream=True,
+            timeout=(5, 60)
+        ) as response:
+            if response.status_code != 200:
+                yield "error", {"detail": f"Error: {response.status_code} - {response.text}"}
+                return
+            event, data_lines = "message", []
+            for line in response.iter_lines(decode_unicode=True):
+                if line is None:
+                    continue
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data_lines.append(line[len("data:"):].strip())
+                elif line == "" and data_lines:
+                    yield event, json.loads("\n".join(data_lines))
+                    event, data_lines = "message", []
+    except requests.exceptions.RequestException as e:
+        yield "error", {"detail": f"Connection error: {str(e)}"}
+
 def get_user_history(user_email, limit=10):
     """Get user's conversation history"""
     try:
@@ -160,20 +190,41 @@ def process_user_input(user_input, input_type="text"):
     with st.chat_message("user"):
         st.markdown(user_input)
     
-    # Get response from API
+    # Stream the response from the API, rendering each part as it arrives
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            api_response = get_response_from_api(user_input, user_email)
-            response_text = api_response.get("response", "")
-            audio_data = api_response.get("audio", "")
-            
-            st.markdown(response_text)
-            
-            if audio_data:
-                st.markdown("🔊 **Audio Response:**")
-                play_audio_response(audio_data)
-            
-            st.session_state.messages.append({"role": "assistant", "content": response_text})
+        status = st.empty()
+        status.caption("Thinking...")
+        sources = st.empty()
+        answer = st.empty()
+        response_text = ""
+        audio_data = ""
+        source_docs = []
+        for event, data in stream_response_from_api(user_input, user_email):
+            if event == "route":
+                departments = data.get("departments") or [data.get("department", "")]
+                status.caption(f"Routed to **{', '.join(departments)}**")
+            elif event == "sources":
+                # A multi-department question sends one sources event per department
+                source_docs.extend(data.get("documents", []))
+                with sources.expander(f"📄 Sources ({len(source_docs)})"):
+                    for doc in source_docs:
+                        st.caption(f"{doc.get('source', '')}: {doc.get('snippet', '')}...")
+            elif event == "token":
+                response_text += data.get("text", "")
+                answer.markdown(response_text + "▌")
+            elif event == "done":
+                response_text = data.get("response", "") or response_text
+                audio_data = data.get("audio", "")
+            elif event == "error":
+                response_text = data.get("detail", "Error while answering")
+        
+        answer.markdown(response_text)
+        
+        if audio_data:
+            st.markdown("🔊 **Audio Response:**")
+            play_audio_response(audio_data)
+        
+        st.session_state.messages.append({"role": "assistant", "content": response_text})
 
 def chat_page():
     """Display chat interface"""
@@ -0,0 +1,260 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import inspect
+from cartesia import AsyncCartesia
+from langchain_core.runnables import RunnableConfig
+from langgraph.types import StreamWriter
+from graph.state import AgentState
+from graph.utils.helper import tts_request, pcm_to_wav_base64, multi_route_limit, format_department_contexts
+from graph.fast_router import fast_router
+from graph.chains import chain_factory
+from app.memory.write_behind import conversation_memory
+from app.cache.answer_cache import answer_cache
+from app.Storage.hr_table import hr_table
+from app.llm_config import hr_structured_enabled, multi_route_enabled, fake_providers
+from app.users import get_user_role
+from app.monitoring.metrics import timed_span
+from app.logger import logging
+from app.exception import CustomException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+async def route_node(state: AgentState) -> AgentState:
+    decision = fast_router.route(state['user_question'])
+    if decision is not None:
+        logging.info(f"Fast router sent question to {decision.post} ({decision.source}, {decision.confidence:.2f})")
+        return {
+            "post": decision.post,
+            "posts": [decision.post],
+            "voice": decision.voice
+        }
+    if multi_route_enabled:
+        limit = multi_route_limit(get_user_role(state.get("user_email", "")))
+        result = await chain_factory.multi_router_chain.ainvoke({"question": state['user_question'], "max_departments": limit})
+        posts = result.posts[:limit]
+        logging.info(f"Routed question to {posts} (voice={result.voice})")
+        if len(posts) == 1:
+            fast_router.remember(state['user_question'], posts[0])
+        # posts stays in relevance order for the prompt; the cache and memory label does not depend on it
+        return {
+            "post": "+".join(sorted(posts)),
+            "posts": posts,
+            "voice": result.voice
+        }
+    result = await chain_factory.router_chain.ainvoke({"question": state['user_question']})
+    logging.info(f"Routed question to {result.post} (voice={result.voice})")
+    fast_router.remember(state['user_question'], result.post)
+    return {
+        "post": result.post,
+        "posts": [result.post],
+        "voice": result.voice
+    }
+
+
+def _source_summary(document) -> dict:
+    return {
+        "source": document.metadata.get("source", ""),
+        "relevance_score": document.metadata.get("relevance_score"),
+        "snippet": document.page_content[:200],
+    }
+
+
+async def _answer_department(department: str, state: AgentState, config: RunnableConfig, writer: StreamWriter) -> AgentState:
+    """Answer a question from a department's shared retrieval pipeline using ainvoke end to end.
+
+    Retrieval and generation run as two steps of the shared RetrievalQA chain so the sources can be
+    streamed to the client before the first token; config carries the stream callbacks to the LLM.
+    """
+    try:
+        logging.info(f"Enter async {department} node")
+        retrieval_chain = chain_factory.qa_chain(department)
+        if retrieval_chain is None:
+            raise CustomException(f"Failed to create {department} reranker", sys)
+
+        question = state["user_question"]
+        documents = await retrieval_chain.retriever.ainvoke(question, config=config)
+        writer({"sources": {"department": department, "documents": [_source_summary(d) for d in documents]}})
+        result = await retrieval_chain.combine_documents_chain.ainvoke(
+            {"input_documents": documents, "question": question}, config=config
+        )
+
+        return {
+            "response": result["output_text"]
+        }
+    except CustomException as e:
+        logging.error(f"Error in async {department} node : {str(e)}")
+        raise CustomException(e, sys) from e
+
+
+async def EngineeringNode(state: AgentState, config: RunnableConfig, writer: StreamWriter) -> AgentState:
+    return await _answer_department("engineering", state, config, writer)
+
+
+async def FinanceNode(state: AgentState, config: RunnableConfig, writer: StreamWriter) -> AgentState:
+    return await _answer_department("finance", state, config, writer)
+
+
+async def GeneralNode(state: AgentState, config: RunnableConfig, writer: StreamWriter) -> AgentState:
+    return await _answer_department("general", state, config, writer)
+
+
+async def _structured_hr_answer(question: str, config: RunnableConfig, writer: StreamWriter):
+    """Answer filter / aggregate questions from the employee table, None falls back to RAG"""
+    if not hr_structured_enabled:
+        return None
+    try:
+        spec = await chain_factory.hr_query_chain.ainvoke({"question": question}, config=config)
+        if spec is None or not spec.structured:
+            return None
+        result = hr_table.execute(spec)
+        writer({"sources": {"department": "hr", "documents": [
+            {"source": hr_table.csv_path.name, "relevance_score": None, "snippet": result["sql"]}
+        ]}})
+        return hr_table.format_result(spec, result)
+    except Exception as e:
+        logging.error(f"Structured HR query failed, falling back to RAG: {str(e)}")
+        return None
+
+
+async def HRNode(state: AgentState, config: RunnableConfig, writer: StreamWriter) -> AgentState:
+    structured_answer = await _structured_hr_answer(state["user_question"], config, writer)
+    if structured_answer is not None:
+        return {
+            "response": structured_answer
+        }
+    return await _answer_department("hr", state, config, writer)
+
+
+async def MarketingNode(state: AgentState, config: RunnableConfig, writer: StreamWriter) -> AgentState:
+    return await _answer_department("marketing", state, config, writer)
+
+
+async def RetrieveNode(state: AgentState, config: RunnableConfig, writer: StreamWriter) -> AgentState:
+    """Map step of a multi-route question: retrieve one department's context without generating"""
+    department = state["department"]
+    question = state["user_question"]
+    try:
+        logging.info(f"Enter async Retrieve Node for {department}")
+        if department == "hr":
+            structured_answer = await _structured_hr_answer(question, config, writer)
+            if structured_answer is not None:
+                return {"contexts": [{"department": department, "documents": [structured_answer]}]}
+
+        retrieval_chain = chain_factory.qa_chain(department)
+        if retrieval_chain is None:
+            raise CustomException(f"Failed to create {department} reranker", sys)
+        documents = await retrieval_chain.retriever.ainvoke(question, config=config)
+        writer({"sources": {"department": department, "documents": [_source_summary(d) for d in documents]}})
+        return {"contexts": [{"department": department, "documents": [d.page_content for d in documents]}]}
+    except Exception as e:
+        # One failing department should not sink the others; the merge step says what is missing
+        logging.error(f"Error in async Retrieve Node for {department}: {str(e)}")
+        return {"contexts": [{"department": department, "documents": []}]}
+
+
+async def MergeNode(state: AgentState, config: RunnableConfig) -> AgentState:
+    """Reduce step of a multi-route question: one streamed generation over every department's context"""
+    try:
+        logging.info(f"Enter async Merge Node for {state['posts']}")
+        response = await chain_factory.merge_chain.ainvoke({
+            "context": format_department_contexts(state.get("contexts", []), state["posts"]),
+            "question": state["user_question"]
+        }, config=config)
+        return {
+            "response": response
+        }
+    except Exception as e:
+        logging.error(f"Error in async Merge Node : {str(e)}")
+        raise CustomException(e, sys) from e
+
+
+async def CacheNode(state: AgentState) -> AgentState:
+    try:
+        cached = await answer_cache.aget(state["user_question"], state["post"], get_user_role(state.get("user_email", "")))
+        if cached is not None:
+            logging.info(f"Answer cache hit for {state['post']}")
+            return {"response": cached, "cache_hit": True}
+    except Exception as e:
+        logging.error(f"Error in async Cache Node: {str(e)}")
+    return {"cache_hit": False}
+
+
+async def CacheStoreNode(state: AgentState) -> AgentState:
+    try:
+        await answer_cache.aput(state["user_question"], state["post"], get_user_role(state.get("user_email", "")), state.get("response", ""))
+    except Exception as e:
+        logging.error(f"Error in async Cache Store Node: {str(e)}")
+    return {}
+
+
+async_cartesia_client = None
+try:
+    cartesia_api_key = os.getenv('CARTESIA_API_KEY')
+    if fake_providers:
+        from app.fake_providers import FakeAsyncCartesia
+        async_cartesia_client = FakeAsyncCartesia()
+    elif cartesia_api_key:
+        async_cartesia_client = AsyncCartesia(api_key=cartesia_api_key)
+except Exception as e:
+    logging.error(f"Failed to initialize async Cartesia client: {str(e)}")
+
+
+async def VoiceNode(state: AgentState) -> AgentState:
+    try:
+        logging.info("Enter async Voice Node")
+        response_text = state.get("response", "")
+
+        if not response_text:
+            return {"audio": ""}
+
+        if not async_cartesia_client:
+            logging.error("Async Cartesia client not initialized")
+            return {"audio": ""}
+
+        audio_chunks = []
+        with timed_span("tts", "cartesia"):
+            audio_stream = async_cartesia_client.tts.bytes(**tts_request(response_text))
+            # Older SDKs return a coroutine resolving to the stream, newer ones the stream itself
+            if inspect.isawaitable(audio_stream):
+                audio_stream = await audio_stream
+            async for chunk in audio_stream:
+                audio_chunks.append(chunk)
+
+        return {
+            "audio": pcm_to_wav_base64(b''.join(audio_chunks))
+        }
+
+    except Exception as e:
+        logging.error(f"Error in async Voice Node: {str(e)}")
+        return {"audio": ""}
+
+
+async def MemoryNode(state: AgentState) -> AgentState:
+    """Queue the conversation for long-term memory; the write happens in the background"""
+    try:
+        logging.info("Enter async Memory Node")
+
+        user_email = state.get("user_email", "")
+        question = state.get("user_question", "")
+        response = state.get("response", "")
+        category = state.get("post", "general")
+
+        if user_email and question and response:
+            conversation_id = await conversation_memory.aenqueue(
+                user_email=user_email,
+                question=question,
+                response=response,
+                category=category
+            )
+
+            logging.info(f"Queued conversation {conversation_id} for user {user_email}")
+
+        return {}
+
+    except Exception as e:
+        logging.error(f"Error in async Memory Node: {str(e)}")
+        return {}
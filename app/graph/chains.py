@@ -0,0 +1,80 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import threading
+from typing import Dict, Optional, Tuple
+from graph.model import Router, MultiRouter, HRQuery
+from graph.utils.prompt import router_template, multi_router_template, multi_department_template, hr_query_template
+from graph.streaming import STRUCTURED_OUTPUT_TAG
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain.chains import RetrievalQA
+from app.llm_config import gemini_model, fake_providers
+from app.Storage.Hybrid_ret import retriever_registry
+from app.monitoring.metrics import llm_latency_handler
+from app.logger import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+if fake_providers:
+    from app.fake_providers import FakeChatModel
+    llm = FakeChatModel(callbacks = [llm_latency_handler])
+else:
+    llm = ChatGoogleGenerativeAI(model = gemini_model, google_api_key = os.getenv('GOOGLE_API_KEY'),
+                                 callbacks = [llm_latency_handler])
+
+
+class ChainFactory:
+    """Builds the router chain and the department RetrievalQA chains once and shares them across requests."""
+
+    def __init__(self, llm, registry):
+        self.llm = llm
+        self.registry = registry
+        self.router_prompt = PromptTemplate.from_template(router_template)
+        self.router_chain = self.router_prompt | self.llm.with_structured_output(Router)
+        self.multi_router_chain = PromptTemplate.from_template(multi_router_template) | self.llm.with_structured_output(MultiRouter)
+        # One generation over the contexts of every department a multi-route question fanned out to
+        self.merge_chain = PromptTemplate.from_template(multi_department_template) | self.llm | StrOutputParser()
+        # Tagged so the streaming endpoint does not forward the spec as answer tokens
+        self.hr_query_chain = (
+            PromptTemplate.from_template(hr_query_template) | self.llm.with_structured_output(HRQuery)
+        ).with_config(tags=[STRUCTURED_OUTPUT_TAG])
+        self._qa_chains: Dict[str, Tuple[object, RetrievalQA]] = {}
+        self._lock = threading.Lock()
+
+    def qa_chain(self, department: str) -> Optional[RetrievalQA]:
+        """Shared RetrievalQA chain for a department, rebuilt only when its retriever pipeline is."""
+        retriever = self.registry.get(department)
+        if retriever is None:
+            return None
+        cached = self._qa_chains.get(department)
+        if cached is not None and cached[0] is retriever:
+            return cached[1]
+        with self._lock:
+            cached = self._qa_chains.get(department)
+            if cached is not None and cached[0] is retriever:
+                return cached[1]
+            chain = RetrievalQA.from_chain_type(
+                llm = self.llm,
+                chain_type = "stuff",
+                retriever = retriever
+            )
+            self._qa_chains[department] = (retriever, chain)
+            logging.info(f"RetrievalQA chain built for {department}")
+            return chain
+
+    def warm(self) -> Dict[str, bool]:
+        """Build the retriever pipelines and QA chains of every department up front."""
+        status = {}
+        for department in self.registry.names():
+            try:
+                status[department] = self.qa_chain(department) is not None
+            except Exception as e:
+                logging.error(f"Error warming {department} QA chain: {str(e)}")
+                status[department] = False
+        return status
+
+
+chain_factory = ChainFactory(llm, retriever_registry)
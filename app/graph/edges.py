@@ -1,4 +1,5 @@
 from langgraph.graph import END
+from langgraph.types import Send
 from graph.state import AgentState
 from typing import Literal
 
@@ -20,6 +21,20 @@ def select_workflow(state: AgentState) -> Literal[
         return "GeneralNode"
     else:
         return "HRNode" 
+
+def cache_workflow(state: AgentState):
+    """Skip retrieval and generation when the answer cache already has the response."""
+    if state.get("cache_hit"):
+        return "MemoryNode"
+    return multi_route_workflow(state) or select_workflow(state)
+
+def multi_route_workflow(state: AgentState):
+    """Fan a multi-department question out to one RetrieveNode per department, None for a single route."""
+    posts = state.get("posts") or []
+    if len(posts) < 2:
+        return None
+    return [Send("RetrieveNode", {"department": post, "user_question": state["user_question"],
+                                   "request_id": state.get("request_id", "")}) for post in posts]
     
 def eng_conditional_edge(state: AgentState):
     workflow = state["voice"]
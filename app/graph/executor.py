@@ -0,0 +1,152 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from app.llm_config import (
+    graph_execution_mode,
+    graph_max_concurrency,
+    graph_max_queue,
+    graph_queue_timeout,
+    graph_request_timeout,
+)
+from app.logger import logging
+
+
+class ExecutorRejected(Exception):
+    """Raised when a question is refused or abandoned by the GraphExecutor."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+class ExecutorSlot:
+    """One admitted question's hold on a GraphExecutor slot; release() may be called any number of times."""
+
+    def __init__(self, executor: "GraphExecutor"):
+        self._executor = executor
+        self._held = True
+
+    def release(self):
+        if self._held:
+            self._held = False
+            self._executor.in_flight -= 1
+            self._executor._semaphore.release()
+
+
+class GraphExecutor:
+    """Runs a compiled LangGraph workflow off the event loop with bounded concurrency."""
+
+    def __init__(
+        self,
+        graph,
+        mode: str = graph_execution_mode,
+        max_concurrency: int = graph_max_concurrency,
+        max_queue: int = graph_max_queue,
+        queue_timeout: float = graph_queue_timeout,
+        request_timeout: float = graph_request_timeout,
+        stream_graph=None,
+    ):
+        if mode not in ("thread", "async"):
+            raise ValueError(f"Unknown graph execution mode '{mode}'")
+        self.graph = graph
+        # Streaming always drives an async graph, the sync one cannot emit sources through a StreamWriter
+        self.stream_graph = stream_graph or graph
+        self.mode = mode
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="graph")
+        logging.info(f"GraphExecutor initialized in {mode} mode with concurrency={max_concurrency}, queue={max_queue}")
+
+    async def _acquire_slot(self):
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return
+        if self.waiting >= self.max_queue:
+            logging.warning(f"Rejecting question, {self.waiting} already queued")
+            raise ExecutorRejected(429, "Too many questions queued, please retry shortly")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Question waited more than {self.queue_timeout}s for a free slot")
+            raise ExecutorRejected(503, "Service busy, no free slot to answer the question")
+        finally:
+            self.waiting -= 1
+
+    async def _execute(self, state: Dict[str, Any], config: Optional[Dict[str, Any]]):
+        if self.mode == "async":
+            return await self.graph.ainvoke(state, config=config)
+        loop = asyncio.get_running_loop()
+        # Carry the request's trace context into the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._pool, functools.partial(context.run, self.graph.invoke, state, config))
+
+    async def run(self, state: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Execute the graph for one question, enforcing admission control and the request timeout."""
+        await self._acquire_slot()
+        self.in_flight += 1
+        try:
+            return await asyncio.wait_for(self._execute(state, config), timeout=self.request_timeout)
+        except asyncio.TimeoutError:
+            # In thread mode the worker keeps running until the graph returns; only the caller is released
+            logging.error(f"Question exceeded the {self.request_timeout}s request timeout")
+            raise ExecutorRejected(504, "Timed out while answering the question")
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def admit(self) -> ExecutorSlot:
+        """Hold a slot for one question under the run admission control, raising ExecutorRejected if refused."""
+        await self._acquire_slot()
+        self.in_flight += 1
+        return ExecutorSlot(self)
+
+    async def stream(
+        self, state: Dict[str, Any], stream_mode: List[str], slot: ExecutorSlot, config: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream the graph for one question admitted with admit() as (mode, chunk) pairs.
+
+        The slot is released when the stream ends or is closed; callers release it themselves too
+        when the stream may never be iterated, e.g. the client disconnects before the response starts.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.request_timeout
+            chunks = self.stream_graph.astream(state, config=config, stream_mode=stream_mode).__aiter__()
+            while True:
+                try:
+                    item = await asyncio.wait_for(chunks.__anext__(), timeout=max(0, deadline - loop.time()))
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    logging.error(f"Streamed question exceeded the {self.request_timeout}s request timeout")
+                    raise ExecutorRejected(504, "Timed out while answering the question")
+                yield item
+        finally:
+            slot.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current load of the executor."""
+        return {
+            "mode": self.mode,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+    def shutdown(self):
+        """Stop accepting work on the worker pool."""
+        self._pool.shutdown(wait=False)
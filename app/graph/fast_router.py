@@ -0,0 +1,150 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import re
+import math
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+from graph.utils.prompt import router_template
+from app.cache.answer_cache import normalize_question
+from app.llm_config import fast_router_enabled, fast_router_threshold, fast_router_min_score, fast_router_memory_size
+from app.logger import logging
+
+_SECTION = re.compile(r"^\d+\.\s+\*\*(\w+)\*\*:", re.MULTILINE)
+_TOKEN = re.compile(r"[a-z0-9]+")
+_VOICE = re.compile(
+    r"\b(voice|audio|speak|spoken|say it|read (it |this )?(out|aloud)|out loud|aloud|listen)\b",
+    re.IGNORECASE
+)
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how",
+    "i", "in", "is", "it", "me", "my", "of", "on", "or", "our", "related", "route", "questions",
+    "tell", "that", "the", "their", "this", "to", "was", "we", "what", "when", "where", "which",
+    "who", "why", "will", "with", "you", "your", "about", "please", "give", "explain", "all",
+}
+
+
+def _tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS or len(token) < 2:
+            continue
+        # Cheap plural folding so "policies"/"policy" and "reports"/"report" meet
+        if token.endswith("ies") and len(token) > 4:
+            token = token[:-3] + "y"
+        elif token.endswith("s") and not token.endswith("ss") and len(token) > 3:
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class RouteDecision(NamedTuple):
+    post: str
+    voice: str
+    confidence: float
+    source: str
+
+
+class FastRouter:
+    """Local routing tier that scores questions against the department descriptions with BM25.
+
+    Questions it can classify confidently are routed without an LLM call; anything below
+    the confidence threshold returns None so route_node falls back to the structured LLM router.
+    """
+
+    def __init__(
+        self,
+        template: str = router_template,
+        threshold: float = fast_router_threshold,
+        min_score: float = fast_router_min_score,
+        memory_size: int = fast_router_memory_size,
+        enabled: bool = fast_router_enabled,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.threshold = threshold
+        self.min_score = min_score
+        self.memory_size = memory_size
+        self.enabled = enabled
+        self.k1 = k1
+        self.b = b
+        self._documents = self._parse_departments(template)
+        self._build_index()
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse_departments(template: str) -> Dict[str, List[str]]:
+        """Split the router prompt into one token list per department section."""
+        body = template.split("Analysis Guidelines:")[0]
+        matches = list(_SECTION.finditer(body))
+        documents = {}
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(body)
+            documents[match.group(1)] = _tokenize(match.group(1) + " " + body[match.end():end])
+        return documents
+
+    def _build_index(self):
+        self._term_freqs = {post: Counter(tokens) for post, tokens in self._documents.items()}
+        self._lengths = {post: len(tokens) for post, tokens in self._documents.items()}
+        self._avg_length = sum(self._lengths.values()) / max(len(self._lengths), 1)
+        document_freq = Counter()
+        for freqs in self._term_freqs.values():
+            document_freq.update(freqs.keys())
+        n = len(self._documents)
+        self._idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_freq.items()}
+
+    def scores(self, question: str) -> Dict[str, float]:
+        """BM25 score of the question against every department description."""
+        terms = set(_tokenize(question))
+        scores = {}
+        for post, freqs in self._term_freqs.items():
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[post] / self._avg_length)
+            score = 0.0
+            for term in terms:
+                tf = freqs.get(term, 0)
+                if tf:
+                    score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores[post] = score
+        return scores
+
+    @staticmethod
+    def detect_voice(question: str) -> str:
+        """'Yes' when the user asks for a spoken answer."""
+        return "Yes" if _VOICE.search(question) else "No"
+
+    def route(self, question: str) -> Optional[RouteDecision]:
+        """Route locally, or return None when the question needs the LLM router."""
+        if not self.enabled:
+            return None
+        voice = self.detect_voice(question)
+        with self._lock:
+            remembered = self._memory.get(normalize_question(question))
+        if remembered is not None:
+            return RouteDecision(remembered, voice, 1.0, "memory")
+
+        ranked = sorted(self.scores(question).items(), key=lambda item: item[1], reverse=True)
+        (best_post, best), (_, second) = ranked[0], ranked[1]
+        if best < self.min_score:
+            return None
+        confidence = best / (best + second)
+        if confidence < self.threshold:
+            logging.info(f"Fast router unsure ({best_post} at {confidence:.2f}), deferring to LLM")
+            return None
+        return RouteDecision(best_post, voice, confidence, "keyword")
+
+    def remember(self, question: str, post: str):
+        """Record an LLM routing decision so the same question is routed locally next time."""
+        if self.memory_size <= 0:
+            return
+        with self._lock:
+            key = normalize_question(question)
+            self._memory[key] = post
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+
+fast_router = FastRouter()
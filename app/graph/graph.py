@@ -1,31 +1,46 @@
 from graph.state import AgentState
-from graph.nodes import route_node, EngineeringNode, FinanceNode, MarketingNode, HRNode, GeneralNode, VoiceNode, MemoryNode
+from graph import nodes, async_nodes
 from langgraph.graph import END, START, StateGraph
-from graph.edges import select_workflow, eng_conditional_edge, fin_conditional_edge, gen_conditional_edge, hr_conditional_edge, mar_conditional_edge
+from app.monitoring.metrics import instrument_node
+from graph.edges import select_workflow, cache_workflow, eng_conditional_edge, fin_conditional_edge, gen_conditional_edge, hr_conditional_edge, mar_conditional_edge
 
-def create_workflow():
+def create_workflow(use_async_nodes: bool = False):
+    """Compile the workflow from the sync nodes, or from the native async nodes for ainvoke."""
+    node_module = async_nodes if use_async_nodes else nodes
     graph_builder = StateGraph(AgentState)
     
-    # Adding nodes
-    graph_builder.add_node("route_node", route_node)
-    graph_builder.add_node("EngineeringNode", EngineeringNode)
-    graph_builder.add_node("FinanceNode", FinanceNode)
-    graph_builder.add_node("MarketingNode", MarketingNode)
-    graph_builder.add_node("HRNode", HRNode)
-    graph_builder.add_node("GeneralNode", GeneralNode)
-    graph_builder.add_node("VoiceNode", VoiceNode)
-    graph_builder.add_node("MemoryNode", MemoryNode)
+    # Adding nodes, each timed into the graph_node_duration_seconds histogram
+    graph_builder.add_node("route_node", instrument_node("route_node", node_module.route_node))
+    graph_builder.add_node("EngineeringNode", instrument_node("EngineeringNode", node_module.EngineeringNode))
+    graph_builder.add_node("FinanceNode", instrument_node("FinanceNode", node_module.FinanceNode))
+    graph_builder.add_node("MarketingNode", instrument_node("MarketingNode", node_module.MarketingNode))
+    graph_builder.add_node("HRNode", instrument_node("HRNode", node_module.HRNode))
+    graph_builder.add_node("GeneralNode", instrument_node("GeneralNode", node_module.GeneralNode))
+    graph_builder.add_node("VoiceNode", instrument_node("VoiceNode", node_module.VoiceNode))
+    graph_builder.add_node("MemoryNode", instrument_node("MemoryNode", node_module.MemoryNode))
+    graph_builder.add_node("CacheNode", instrument_node("CacheNode", node_module.CacheNode))
+    graph_builder.add_node("CacheStoreNode", instrument_node("CacheStoreNode", node_module.CacheStoreNode))
+    graph_builder.add_node("RetrieveNode", instrument_node("RetrieveNode", node_module.RetrieveNode))
+    graph_builder.add_node("MergeNode", instrument_node("MergeNode", node_module.MergeNode))
     
     # Adding edges
     graph_builder.add_edge(START, "route_node")
-    graph_builder.add_conditional_edges("route_node", select_workflow)
+    graph_builder.add_edge("route_node", "CacheNode")
     
-    # All workflow nodes now go to MemoryNode first, then check for voice
-    graph_builder.add_edge("EngineeringNode", "MemoryNode")
-    graph_builder.add_edge("FinanceNode", "MemoryNode")
-    graph_builder.add_edge("MarketingNode", "MemoryNode")
-    graph_builder.add_edge("HRNode", "MemoryNode")
-    graph_builder.add_edge("GeneralNode", "MemoryNode")
+    # A cache hit skips retrieval and generation and goes straight to MemoryNode
+    graph_builder.add_conditional_edges("CacheNode", cache_workflow)
+    
+    # Multi-route questions retrieve from every routed department in parallel, then one generation merges them
+    graph_builder.add_edge("RetrieveNode", "MergeNode")
+    graph_builder.add_edge("MergeNode", "CacheStoreNode")
+    
+    # All workflow nodes store their answer in the cache, then go to MemoryNode, then check for voice
+    graph_builder.add_edge("EngineeringNode", "CacheStoreNode")
+    graph_builder.add_edge("FinanceNode", "CacheStoreNode")
+    graph_builder.add_edge("MarketingNode", "CacheStoreNode")
+    graph_builder.add_edge("HRNode", "CacheStoreNode")
+    graph_builder.add_edge("GeneralNode", "CacheStoreNode")
+    graph_builder.add_edge("CacheStoreNode", "MemoryNode")
     
     # From MemoryNode, check if voice response is needed
     graph_builder.add_conditional_edges("MemoryNode", lambda state: "VoiceNode" if state["voice"] == "Yes" else END)
@@ -34,4 +49,5 @@ def create_workflow():
     # Compile without checkpointer for simplicity
     return graph_builder.compile()
 
-Graph = create_workflow()
\ No newline at end of file
+Graph = create_workflow()
+AsyncGraph = create_workflow(use_async_nodes=True)
@@ -1,11 +1,67 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, List, Literal
 from langchain.prompts import PromptTemplate
 
+Department = Literal["engineering", "finance", "general", "hr", "marketing"]
+
+
 class Router(BaseModel):
     """Router model for route through different nodes"""
-    post: Literal["engineering", "finance", "general", "hr", "marketing"] = Field(..., description="Give the proper answer on the basis of understanding the user question and prompt")
+    post: Department = Field(..., description="Give the proper answer on the basis of understanding the user question and prompt")
+    voice: Literal["Yes", "No"] = Field(..., description="if the user want the answer in the Voice format then return 'Yes' else return 'No'")
+
+
+class MultiRouter(BaseModel):
+    """Router model that may send a question spanning several departments to each of them"""
+    posts: List[Department] = Field(..., min_length=1, description="Departments whose documents are needed to answer, most relevant first")
     voice: Literal["Yes", "No"] = Field(..., description="if the user want the answer in the Voice format then return 'Yes' else return 'No'")
 
+    @model_validator(mode="after")
+    def unique_posts(self):
+        self.posts = list(dict.fromkeys(self.posts))
+        return self
+
+
+HRColumn = Literal[
+    "employee_id", "full_name", "role", "department", "email", "location", "date_of_birth", "date_of_joining",
+    "manager_id", "salary", "leave_balance", "leaves_taken", "attendance_pct", "performance_rating", "last_review_date"
+]
+HRNumericColumn = Literal["salary", "leave_balance", "leaves_taken", "attendance_pct", "performance_rating"]
+HRGroupColumn = Literal["role", "department", "location", "manager_id", "performance_rating"]
+HR_NUMERIC_COLUMNS = {"salary", "leave_balance", "leaves_taken", "attendance_pct", "performance_rating"}
+
+
+class HRFilter(BaseModel):
+    """One condition on a column of the employee table"""
+    column: HRColumn = Field(..., description="Column the condition applies to")
+    op: Literal["=", "!=", ">", ">=", "<", "<=", "contains"] = Field(..., description="Comparison, 'contains' is a case-insensitive substring match")
+    value: str = Field(..., description="Value to compare with, dates as YYYY-MM-DD")
+
+    @model_validator(mode="after")
+    def check_value(self):
+        if self.column in HR_NUMERIC_COLUMNS:
+            if self.op == "contains":
+                raise ValueError(f"'contains' cannot be used on numeric column {self.column}")
+            float(self.value)
+        return self
+
 
+class HRQuery(BaseModel):
+    """Filter / aggregate spec over the employee table, executed by the structured HR path"""
+    structured: bool = Field(..., description="True if the question can be answered by filtering or aggregating the employee table, False for policy or free-text questions")
+    filters: List[HRFilter] = Field(default_factory=list, description="Conditions combined with AND")
+    aggregate: Literal["list", "count", "avg", "sum", "min", "max"] = Field("list", description="'list' returns matching employees, the others compute one value (per group)")
+    aggregate_column: Optional[HRNumericColumn] = Field(None, description="Numeric column for avg, sum, min and max")
+    group_by: Optional[HRGroupColumn] = Field(None, description="Compute the aggregate per value of this column")
+    select: List[HRColumn] = Field(default_factory=list, description="Columns to show when listing employees")
+    order_by: Optional[HRColumn] = Field(None, description="Column to sort listed employees by")
+    descending: bool = Field(False, description="Sort from highest to lowest")
+    limit: int = Field(20, ge=1, le=100, description="Maximum number of rows to return")
 
+    @model_validator(mode="after")
+    def check_aggregate(self):
+        if self.aggregate in ("avg", "sum", "min", "max") and self.aggregate_column is None:
+            raise ValueError(f"aggregate '{self.aggregate}' needs an aggregate_column")
+        if self.group_by is not None and self.aggregate == "list":
+            raise ValueError("group_by needs an aggregate other than 'list'")
+        return self
@@ -2,36 +2,55 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-import base64
 import tempfile
-import io
 from cartesia import Cartesia
-from graph.model import Router
 from graph.state import AgentState
-from graph.utils.prompt import router_template, engineering_prompt, finance_prompt, general_prompt, hr_prompt, marketing_prompt
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.prompts import PromptTemplate
+from graph.utils.helper import tts_request, pcm_to_wav_base64, multi_route_limit, format_department_contexts
+from graph.fast_router import fast_router
+from graph.chains import chain_factory
 from langchain_core.output_parsers import StrOutputParser
-from langchain.chains import RetrievalQA
-from app.llm_config import gemini_model 
-from app.memory.longterm_memory import longterm_memory
+from app.memory.write_behind import conversation_memory
+from app.cache.answer_cache import answer_cache
+from app.Storage.hr_table import hr_table
+from app.llm_config import hr_structured_enabled, multi_route_enabled, fake_providers
+from app.users import get_user_role
+from app.monitoring.metrics import timed_span
 from app.logger import logging
 from app.exception import CustomException
-from app.Storage.Hybrid_ret import create_general_reranker,create_engineering_reranker,create_finance_summary_reranker,create_hr_reranker,create_marketing_reranker
 from dotenv import load_dotenv
 
 load_dotenv()
-llm = ChatGoogleGenerativeAI(model = gemini_model, google_api_key = os.getenv('GOOGLE_API_KEY'))
 parser = StrOutputParser()
 
 def route_node(state: AgentState)-> AgentState:
-    structured_llm = llm.with_structured_output(Router)
-    prompt = PromptTemplate.from_template(router_template)
-    chain = prompt | structured_llm
-    result = chain.invoke({"question": state['user_question']})
+    # Confidently classifiable questions are routed locally without an LLM round-trip
+    decision = fast_router.route(state['user_question'])
+    if decision is not None:
+        logging.info(f"Fast router sent question to {decision.post} ({decision.source}, {decision.confidence:.2f})")
+        return {
+            "post": decision.post,
+            "posts": [decision.post],
+            "voice": decision.voice
+        }
+    if multi_route_enabled:
+        limit = multi_route_limit(get_user_role(state.get("user_email", "")))
+        result = chain_factory.multi_router_chain.invoke({"question": state['user_question'], "max_departments": limit})
+        posts = result.posts[:limit]
+        logging.info(f"Routed question to {posts} (voice={result.voice})")
+        if len(posts) == 1:
+            fast_router.remember(state['user_question'], posts[0])
+        # posts stays in relevance order for the prompt; the cache and memory label does not depend on it
+        return {
+            "post": "+".join(sorted(posts)),
+            "posts": posts,
+            "voice": result.voice
+        }
+    result = chain_factory.router_chain.invoke({"question": state['user_question']})
     print(result)
+    fast_router.remember(state['user_question'], result.post)
     return {
         "post": result.post,
+        "posts": [result.post],
         "voice": result.voice
     }
 
@@ -40,16 +59,10 @@ def route_node(state: AgentState)-> AgentState:
 def EngineeringNode(state: AgentState)->AgentState:
     try:
         logging.info("Enter Engineering Node")
-        prompt = PromptTemplate.from_template(engineering_prompt)
-        engineering_reranker = create_engineering_reranker()
-        if engineering_reranker is None:
+        eng_retrevial_chain = chain_factory.qa_chain("engineering")
+        if eng_retrevial_chain is None:
             raise CustomException("Failed to create engineering reranker", sys)
         
-        eng_retrevial_chain = RetrievalQA.from_chain_type(
-            llm = llm,
-            chain_type = "stuff",
-            retriever = engineering_reranker
-        )
         result = eng_retrevial_chain.invoke({"query": state["user_question"]})
         
         return {
@@ -62,15 +75,10 @@ def EngineeringNode(state: AgentState)->AgentState:
 def FinanceNode(state: AgentState)->AgentState:
     try:
         logging.info("Enter Finance Node")
-        finance_reranker = create_finance_summary_reranker()
-        if finance_reranker is None:
+        fin_retrevial_chain = chain_factory.qa_chain("finance")
+        if fin_retrevial_chain is None:
             raise CustomException("Failed to create Finance reranker", sys)
         
-        fin_retrevial_chain = RetrievalQA.from_chain_type(
-            llm = llm,
-            chain_type = "stuff",
-            retriever = finance_reranker
-        )
         result = fin_retrevial_chain.invoke({"query": state["user_question"]})
         
         return {
@@ -83,15 +91,10 @@ def FinanceNode(state: AgentState)->AgentState:
 def GeneralNode(state: AgentState)->AgentState:
     try:
         logging.info("Enter General Node")
-        general_reranker = create_general_reranker()
-        if general_reranker is None:
+        gen_retrevial_chain = chain_factory.qa_chain("general")
+        if gen_retrevial_chain is None:
             raise CustomException("Failed to create General reranker", sys)
         
-        gen_retrevial_chain = RetrievalQA.from_chain_type(
-            llm = llm,
-            chain_type = "stuff",
-            retriever = general_reranker
-        )
         result = gen_retrevial_chain.invoke({"query": state["user_question"]})
         
         return {
@@ -101,18 +104,32 @@ def GeneralNode(state: AgentState)->AgentState:
         logging.error(f"Error in Engineering Node : {str(e)}")
         raise CustomException(e, sys) from e
     
+def _structured_hr_answer(question: str):
+    """Answer filter / aggregate questions from the employee table, None falls back to RAG"""
+    if not hr_structured_enabled:
+        return None
+    try:
+        spec = chain_factory.hr_query_chain.invoke({"question": question})
+        if spec is None or not spec.structured:
+            return None
+        return hr_table.format_result(spec, hr_table.execute(spec))
+    except Exception as e:
+        logging.error(f"Structured HR query failed, falling back to RAG: {str(e)}")
+        return None
+
 def HRNode(state: AgentState)->AgentState:
     try:
         logging.info("Enter HR Node")
-        hr_reranker = create_hr_reranker()
-        if hr_reranker is None:
+        structured_answer = _structured_hr_answer(state["user_question"])
+        if structured_answer is not None:
+            return {
+                "response": structured_answer
+            }
+        
+        hr_retrevial_chain = chain_factory.qa_chain("hr")
+        if hr_retrevial_chain is None:
             raise CustomException("Failed to create HR reranker", sys)
         
-        hr_retrevial_chain = RetrievalQA.from_chain_type(
-            llm = llm,
-            chain_type = "stuff",
-            retriever = hr_reranker
-        )
         result = hr_retrevial_chain.invoke({"query": state["user_question"]})
         
         return {
@@ -125,15 +142,10 @@ def HRNode(state: AgentState)->AgentState:
 def MarketingNode(state: AgentState)->AgentState:
     try:
         logging.info("Enter Marketing Node")
-        marketing_reranker = create_marketing_reranker()
-        if marketing_reranker is None:
+        mar_retrevial_chain = chain_factory.qa_chain("marketing")
+        if mar_retrevial_chain is None:
             raise CustomException("Failed to create Marketing reranker", sys)
         
-        mar_retrevial_chain = RetrievalQA.from_chain_type(
-            llm = llm,
-            chain_type = "stuff",
-            retriever = marketing_reranker
-        )
         result = mar_retrevial_chain.invoke({"query": state["user_question"]})
         
         return {
@@ -144,10 +156,72 @@ def MarketingNode(state: AgentState)->AgentState:
         raise CustomException(e, sys) from e
     
 
+def RetrieveNode(state: AgentState) -> AgentState:
+    """Map step of a multi-route question: retrieve one department's context without generating"""
+    department = state["department"]
+    question = state["user_question"]
+    try:
+        logging.info(f"Enter Retrieve Node for {department}")
+        if department == "hr":
+            structured_answer = _structured_hr_answer(question)
+            if structured_answer is not None:
+                return {"contexts": [{"department": department, "documents": [structured_answer]}]}
+        
+        retrieval_chain = chain_factory.qa_chain(department)
+        if retrieval_chain is None:
+            raise CustomException(f"Failed to create {department} reranker", sys)
+        documents = retrieval_chain.retriever.invoke(question)
+        return {"contexts": [{"department": department, "documents": [d.page_content for d in documents]}]}
+    except Exception as e:
+        # One failing department should not sink the others; the merge step says what is missing
+        logging.error(f"Error in Retrieve Node for {department}: {str(e)}")
+        return {"contexts": [{"department": department, "documents": []}]}
+
+
+def MergeNode(state: AgentState) -> AgentState:
+    """Reduce step of a multi-route question: one generation over every department's context"""
+    try:
+        logging.info(f"Enter Merge Node for {state['posts']}")
+        response = chain_factory.merge_chain.invoke({
+            "context": format_department_contexts(state.get("contexts", []), state["posts"]),
+            "question": state["user_question"]
+        })
+        return {
+            "response": response
+        }
+    except Exception as e:
+        logging.error(f"Error in Merge Node : {str(e)}")
+        raise CustomException(e, sys) from e
+
+
+def CacheNode(state: AgentState) -> AgentState:
+    """Answer from the answer cache when the same (or a very similar) question was already answered"""
+    try:
+        cached = answer_cache.get(state["user_question"], state["post"], get_user_role(state.get("user_email", "")))
+        if cached is not None:
+            logging.info(f"Answer cache hit for {state['post']}")
+            return {"response": cached, "cache_hit": True}
+    except Exception as e:
+        logging.error(f"Error in Cache Node: {str(e)}")
+    return {"cache_hit": False}
+
+
+def CacheStoreNode(state: AgentState) -> AgentState:
+    """Remember the department answer for later identical or similar questions"""
+    try:
+        answer_cache.put(state["user_question"], state["post"], get_user_role(state.get("user_email", "")), state.get("response", ""))
+    except Exception as e:
+        logging.error(f"Error in Cache Store Node: {str(e)}")
+    return {}
+
+
 cartesia_client = None
 try:
     cartesia_api_key = os.getenv('CARTESIA_API_KEY')
-    if cartesia_api_key:
+    if fake_providers:
+        from app.fake_providers import FakeCartesia
+        cartesia_client = FakeCartesia()
+    elif cartesia_api_key:
         cartesia_client = Cartesia(api_key=cartesia_api_key)
 except Exception as e:
     logging.error(f"Failed to initialize Cartesia client: {str(e)}")
@@ -164,50 +238,12 @@ def VoiceNode(state: AgentState) -> AgentState:
             logging.error("Cartesia client not initialized")
             return {"audio": ""}
         
-        # voice_id = os.getenv('CARTESIA_VOICE_ID')
-        voice_id = "ef8390dc-0fc0-473b-bbc0-7277503793f7"
-        
-        # Generate audio using the new API
-        audio_generator = cartesia_client.tts.bytes(
-            model_id="sonic",
-            transcript=response_text,
-            voice={
-                "mode": "id",
-                "id": voice_id
-            },
-            language="en",
-            output_format={
-                "container": "raw",
-                "sample_rate": 16000,
-                "encoding": "pcm_f32le"
-            }
-        )
-        
-        # Collect all audio chunks
-        audio_chunks = []
-        for chunk in audio_generator:
-            audio_chunks.append(chunk)
-        
-        # Combine all chunks into a single bytes object
-        audio_data = b''.join(audio_chunks)
-        
-        # Convert raw PCM to WAV format for browser compatibility
-        import wave
-        import struct
-        
-        # Create WAV file in memory
-        wav_buffer = io.BytesIO()
-        with wave.open(wav_buffer, 'wb') as wav_file:
-            wav_file.setnchannels(1) 
-            wav_file.setsampwidth(4)  
-            wav_file.setframerate(16000)
-            wav_file.writeframes(audio_data)
+        # Generate audio using the new API and combine all chunks into a single bytes object
+        with timed_span("tts", "cartesia"):
+            audio_data = b''.join(cartesia_client.tts.bytes(**tts_request(response_text)))
         
-        wav_buffer.seek(0)
-        wav_bytes = wav_buffer.read()
-        
-        # Convert to base64 for JSON serialization
-        audio_base64 = base64.b64encode(wav_bytes).decode('utf-8')
+        # Convert raw PCM to WAV and base64 for browser compatibility and JSON serialization
+        audio_base64 = pcm_to_wav_base64(audio_data)
         
         return {
             "audio": audio_base64
@@ -219,7 +255,7 @@ def VoiceNode(state: AgentState) -> AgentState:
     
 
 def MemoryNode(state: AgentState) -> AgentState:
-    """Store conversation in long-term memory and retrieve relevant context"""
+    """Queue the conversation for long-term memory; the write happens in the background"""
     try:
         logging.info("Enter Memory Node")
         
@@ -229,22 +265,14 @@ def MemoryNode(state: AgentState) -> AgentState:
         category = state.get("post", "general")
         
         if user_email and question and response:
-            # Store current conversation in long-term memory
-            conversation_id = longterm_memory.store_conversation(
+            conversation_id = conversation_memory.enqueue(
                 user_email=user_email,
                 question=question,
                 response=response,
                 category=category
             )
             
-            # Get recent conversation history for context (optional)
-            recent_history = longterm_memory.get_user_history(user_email, limit=5)
-            
-            logging.info(f"Stored conversation {conversation_id} for user {user_email}")
-            
-            return {
-                "conversation_history": recent_history
-            }
+            logging.info(f"Queued conversation {conversation_id} for user {user_email}")
         
         return {}
         
@@ -1,4 +1,5 @@
-from typing import TypedDict, List, Dict, Optional
+import operator
+from typing import Annotated, TypedDict, List, Dict, Optional
 from langchain_core.messages import BaseMessage
 
 class AgentState(TypedDict):
@@ -9,4 +10,11 @@ class AgentState(TypedDict):
     audio: bytes
     user_email: str 
     conversation_history: Optional[List[Dict]] 
-    messages: List[BaseMessage]
\ No newline at end of file
+    messages: List[BaseMessage]
+    cache_hit: bool
+    # Multi-route: every routed department, the department of one fan-out branch and the contexts they return
+    posts: List[str]
+    department: str
+    contexts: Annotated[List[Dict], operator.add]
+    # Assigned per HTTP request in main.py; graph nodes trace their spans under it
+    request_id: str
\ No newline at end of file
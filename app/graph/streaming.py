@@ -0,0 +1,71 @@
+import json
+from typing import Any, List, Tuple
+
+# Modes passed to graph.astream: node updates, LLM tokens and what nodes emit through their StreamWriter
+STREAM_MODES = ["updates", "messages", "custom"]
+DEPARTMENT_NODES = {"EngineeringNode", "FinanceNode", "GeneralNode", "HRNode", "MarketingNode", "MergeNode"}
+# Chains whose LLM output is a structured spec rather than answer text carry this tag
+STRUCTURED_OUTPUT_TAG = "structured_output"
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Serialize one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class StreamTranslator:
+    """Turns LangGraph (mode, chunk) stream items into client events: route, sources, token, audio and done."""
+
+    def __init__(self):
+        self.response = ""
+        self.audio = ""
+        self.department = ""
+        self._streamed_tokens = False
+
+    def translate(self, mode: str, chunk: Any) -> List[Tuple[str, Any]]:
+        if mode == "messages":
+            return self._tokens(*chunk)
+        if mode == "custom":
+            if isinstance(chunk, dict) and "sources" in chunk:
+                return [("sources", chunk["sources"])]
+            return []
+        if mode == "updates":
+            return self._updates(chunk)
+        return []
+
+    def _tokens(self, message, metadata) -> List[Tuple[str, Any]]:
+        # Only the answer generation is streamed, not the router's structured output
+        if metadata.get("langgraph_node") not in DEPARTMENT_NODES:
+            return []
+        if STRUCTURED_OUTPUT_TAG in (metadata.get("tags") or []):
+            return []
+        text = message.content if isinstance(message.content, str) else ""
+        if not text:
+            return []
+        self._streamed_tokens = True
+        return [("token", {"text": text})]
+
+    def _updates(self, chunk) -> List[Tuple[str, Any]]:
+        events = []
+        for node, update in chunk.items():
+            update = update or {}
+            if node == "route_node":
+                self.department = update.get("post", "")
+                events.append(("route", {"department": self.department, "departments": update.get("posts", [self.department]),
+                                          "voice": update.get("voice", "")}))
+            elif node == "CacheNode" and update.get("cache_hit"):
+                self.response = update.get("response", "")
+                events.append(("token", {"text": self.response, "cached": True}))
+            elif node in DEPARTMENT_NODES:
+                self.response = update.get("response", "")
+                # A model that does not stream still gets its answer to the client before memory and voice
+                if not self._streamed_tokens and self.response:
+                    events.append(("token", {"text": self.response}))
+            elif node == "VoiceNode":
+                self.audio = update.get("audio", "")
+                if self.audio:
+                    events.append(("audio", {"audio": self.audio}))
+        return events
+
+    def done(self) -> Tuple[str, Any]:
+        return ("done", {"department": self.department, "response": self.response, "audio": self.audio})
@@ -0,0 +1,54 @@
+import io
+import base64
+import wave
+from typing import Dict, List
+from app.llm_config import multi_route_max_departments, multi_route_role_limits
+
+VOICE_ID = "ef8390dc-0fc0-473b-bbc0-7277503793f7"
+SAMPLE_RATE = 16000
+
+
+def tts_request(response_text: str) -> dict:
+    """Keyword arguments for a Cartesia tts.bytes call, shared by the sync and async voice nodes."""
+    return {
+        "model_id": "sonic",
+        "transcript": response_text,
+        "voice": {
+            "mode": "id",
+            "id": VOICE_ID
+        },
+        "language": "en",
+        "output_format": {
+            "container": "raw",
+            "sample_rate": SAMPLE_RATE,
+            "encoding": "pcm_f32le"
+        }
+    }
+
+
+def pcm_to_wav_base64(audio_data: bytes, sample_rate: int = SAMPLE_RATE) -> str:
+    """Wrap raw 32-bit mono PCM in a WAV container and base64 encode it for JSON."""
+    wav_buffer = io.BytesIO()
+    with wave.open(wav_buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(4)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(audio_data)
+
+    wav_buffer.seek(0)
+    return base64.b64encode(wav_buffer.read()).decode('utf-8')
+
+
+def multi_route_limit(role: str) -> int:
+    """Departments a question from this role may fan out to."""
+    return max(1, multi_route_role_limits.get(role, multi_route_max_departments))
+
+
+def format_department_contexts(contexts: List[Dict], posts: List[str]) -> str:
+    """Context of every department under its own heading, in the router's order of relevance."""
+    order = {department: i for i, department in enumerate(posts)}
+    sections = []
+    for context in sorted(contexts, key=lambda c: order.get(c["department"], len(order))):
+        documents = "\n\n".join(context["documents"]) or "No relevant documents found."
+        sections.append(f"### {context['department'].capitalize()}\n{documents}")
+    return "\n\n".join(sections)
@@ -86,6 +86,25 @@ Based on the above analysis, return only the department name (engineering/financ
 
 
 
+# Same department guide as the single router, with guidelines that allow several departments
+multi_router_template = router_template.split("Analysis Guidelines:")[0] + """Analysis Guidelines:
+- Look for specific technical terms, financial metrics, HR processes, or marketing concepts
+- If answering needs facts from more than one department (for example how marketing spend affected cash flow), list every department whose documents are needed, most relevant first, at most {max_departments}
+- Otherwise list exactly one department, the one with the most specialized knowledge needed
+
+
+User question: {question}
+"""
+
+multi_department_template = """You are a helpful assistant for FinSolve Technologies. The question below spans several departments.
+Answer it from the department context that follows, connecting facts across departments where the question asks for it,
+and say so when the context does not contain what is needed.
+
+{context}
+
+Question: {question}
+Answer:"""
+
 
 engineering_prompt = """
 You are an helpul assistant and answer the question regarding engineering 
@@ -110,4 +129,24 @@ you get a question from the user and docs from the vector database and keyword d
 marketing_prompt = """
 You are an helpul assistant and answer the question regarding marketing 
 you get a question from the user and docs from the vector database and keyword database and your task is too give the detailed asnwer on the basis of user question on the basis of docs
-"""
\ No newline at end of file
+"""
+
+hr_query_template = """You translate questions about FinSolve Technologies employees into a query over the employee table.
+
+Table columns:
+- employee_id (e.g. FINEMP1006), full_name, role, department, email, location (city)
+- date_of_birth, date_of_joining, last_review_date (YYYY-MM-DD)
+- manager_id (employee_id of the manager)
+- salary (INR per year), leave_balance, leaves_taken (days), attendance_pct (0-100), performance_rating (1-5)
+
+Departments: Business, Compliance, Data, Design, Finance, HR, Marketing, Operations, Product, Quality Assurance, Risk, Sales, Technology.
+
+Set structured to true only when the answer comes from filtering, counting or aggregating these columns, for example:
+- "average attendance in Finance" -> aggregate avg, aggregate_column attendance_pct, filter department = Finance
+- "who reports to FINEMP1006" -> aggregate list, filter manager_id = FINEMP1006
+- "how many employees are in Pune by department" -> aggregate count, filter location = Pune, group_by department
+- "top 5 salaries in Sales" -> aggregate list, filter department = Sales, order_by salary, descending true, limit 5
+Set structured to false for policies, procedures or anything the table cannot answer.
+
+Question: {question}
+"""
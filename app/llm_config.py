@@ -1,3 +1,5 @@
+import os
+
 gemini_model = "gemini-1.5-flash"
 groq_model = "deepseek-r1-distill-llama-70b"
 groq_stt = "whisper-large-v3"
@@ -13,4 +15,130 @@ chunk_size = 1000
 chunk_overlap = 200
 no_k = 2
 vector_weight = 0.7
-keyword_weight = 0.3
\ No newline at end of file
+keyword_weight = 0.3
+
+#### retriever registry
+
+retriever_reload_interval = 30   # seconds between index file checks, negative disables hot reload
+
+#### vector index
+
+vector_index_mode = "per_department"   # "per_department" (one Chroma directory per source) or "unified" (one filtered collection)
+unified_index_directory = "unified_db"
+
+#### hybrid retrieval
+
+retrieval_child_timeout = 2.0    # seconds each vector / keyword retriever gets before fusion goes on without it
+retrieval_max_workers = 16       # threads shared by every department for concurrent child retrieval
+
+#### rank fusion
+
+fusion_method = "rrf"                    # "rrf" (weighted reciprocal rank) or "score" (min-max normalised retriever scores)
+fusion_rrf_k = 60
+fusion_near_duplicate_threshold = 0.9    # cosine similarity at which a lower-ranked chunk is dropped, None disables it
+fusion_max_candidates = 6                # candidates passed to the reranker after fusion, None keeps all
+fusion_hash_dimensions = 1024            # hashed shingle features used for the near-duplicate check
+
+#### graph execution
+
+graph_execution_mode = "async"    # "thread" runs Graph.invoke on a worker pool, "async" awaits Graph.ainvoke
+graph_max_concurrency = 4         # questions executed at once per worker process
+graph_max_queue = 32              # questions allowed to wait for a slot before /ask answers 429
+graph_queue_timeout = 10          # seconds a question may wait for a slot before /ask answers 503
+graph_request_timeout = 60        # seconds a question may run before /ask answers 504
+
+#### multi-route
+
+multi_route_enabled = True              # the router may send one question to several departments, answered in one merge step
+multi_route_max_departments = 2         # departments a question may fan out to
+multi_route_role_limits = {"Admin": 5}  # roles allowed to fan out wider than multi_route_max_departments
+
+#### answer cache
+
+answer_cache_enabled = True
+answer_cache_max_entries = 1024
+answer_cache_ttl = 3600                    # seconds an answer stays valid
+answer_cache_similarity_threshold = 0.95   # cosine similarity needed for a semantic hit, None disables the tier
+
+#### fast router
+
+fast_router_enabled = True
+fast_router_threshold = 0.75   # share of the top two BM25 scores the best department needs to skip the LLM
+fast_router_min_score = 1.5    # minimum BM25 score for a local decision
+fast_router_memory_size = 2048 # LLM routing decisions remembered per process
+
+#### embedding cache
+
+embedding_cache_path = "embedding_cache.sqlite3"   # None keeps the cache in memory only
+embedding_cache_memory_entries = 4096
+
+#### index build
+
+embedding_batch_size = 64          # chunks embedded per request while building an index
+embedding_max_concurrency = 2      # embedding requests in flight across all departments
+embedding_max_retries = 5
+embedding_retry_backoff = 2.0      # seconds, doubled after every failed attempt
+index_build_workers = 4            # departments built in parallel
+
+#### reranker
+
+# Backend per department: "cohere" (remote CohereRerank), "cross_encoder" (local ONNX model) or "none" (fused order)
+reranker_backends = {
+    "engineering": "cohere",
+    "finance": "cohere",
+    "general": "cohere",
+    "hr": "cohere",
+    "marketing": "cohere",
+}
+reranker_default_backend = "cohere"
+cohere_rerank_model = "rerank-v3.5"
+cross_encoder_model = "cross-encoder/ms-marco-MiniLM-L-6-v2"   # checkpoint exported by Storage/rerankers.py --export
+cross_encoder_model_dir = "models/cross_encoder"
+cross_encoder_max_length = 256     # tokens per (question, chunk) pair
+cross_encoder_threads = 2          # onnxruntime intra-op threads shared by every department
+
+#### conversation memory
+
+memory_write_behind = True        # queue conversation writes and flush them from a background thread
+memory_batch_size = 32            # conversations flushed per batch
+memory_flush_interval = 0.5       # seconds the writer waits to fill a batch
+memory_max_queue = 10000          # queued writes before callers store synchronously
+memory_max_retries = 3
+memory_retry_backoff = 1.0        # seconds the writer waits after a failed batch, doubled on every further attempt
+history_page_max = 100            # largest page /history returns
+memory_layout = "per_user"        # "per_user" (one Chroma collection per email) or "shared" (user_email filter)
+memory_shards = 1                 # hash-sharded collections in the shared layout
+
+#### structured hr queries
+
+hr_structured_enabled = True      # answer filter / aggregate HR questions from the employee table before RAG
+hr_data_path = "resources/data/hr/hr_data.csv"
+hr_query_max_rows = 50            # rows a listing answer may show
+
+#### metrics
+
+metrics_enabled = True            # per-node and per-call latency histograms served on /metrics
+metrics_latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)   # seconds
+
+#### tracing
+
+tracing_enabled = True            # record a span waterfall per request, shown on /debug/traces/{request_id}
+trace_buffer_size = 500           # most recent traces kept in memory
+trace_max_spans = 500             # spans kept per trace
+trace_export_path = None          # e.g. "logs/traces.jsonl" to also append every finished span to a file
+
+#### provider stand-ins
+
+fake_providers = os.getenv("FAKE_PROVIDERS", "0") == "1"   # deterministic local Gemini, embeddings, Cohere, Cartesia and AssemblyAI
+fake_latency = {                  # seconds injected per call, before jitter
+    "gemini": 0.6,                # time to first token, structured outputs included
+    "gemini_token": 0.01,         # every further streamed token
+    "embeddings": 0.08,
+    "cohere": 0.12,
+    "cartesia": 0.35,             # time to first audio chunk
+    "assemblyai": 1.5,
+}
+fake_jitter = 0.25                # +/- fraction of the base latency, seeded by provider and input
+fake_seed = 7
+fake_answer_words = 60            # words in a generated answer
+fake_embedding_dimensions = 768   # same as models/embedding-001
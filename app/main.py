@@ -1,10 +1,104 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
-from graph.graph import Graph
+from typing import Optional
+from graph.graph import Graph, AsyncGraph
+from graph.executor import GraphExecutor, ExecutorRejected, ExecutorSlot
 from langchain_core.messages import HumanMessage
+from graph.chains import chain_factory
+from graph.streaming import STREAM_MODES, StreamTranslator, format_sse
+from app.memory.write_behind import conversation_memory
+from app.cache.answer_cache import answer_cache
+from app.dataloader.Database import get_embeddings
+from app.monitoring.metrics import metrics, request_latency
+from app.monitoring.tracing import tracer, trace_store
+from app.llm_config import graph_execution_mode, history_page_max
+from app.logger import logging
 import uuid
+import time
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build every department retrieval pipeline and QA chain once before serving requests
+    status = await run_in_threadpool(chain_factory.warm)
+    logging.info(f"Startup warm-up finished: {status}")
+    yield
+    graph_executor.shutdown()
+    # Flush conversations still waiting for the background memory writer
+    await run_in_threadpool(conversation_memory.drain, 30)
+
+
+# Async mode awaits the native async graph, thread mode runs the sync graph on a worker pool
+graph_executor = GraphExecutor(AsyncGraph if graph_execution_mode == "async" else Graph, stream_graph=AsyncGraph)
+app = FastAPI(lifespan=lifespan)
+
+# Scrapes and trace lookups would otherwise push real requests out of the trace buffer
+UNTRACED_PATHS = ("/metrics", "/debug/")
+
+# Read at scrape time from the components that already keep these counters
+metrics.callback("graph_requests_in_flight", "Questions currently running in the graph",
+                 lambda: {(): graph_executor.in_flight})
+metrics.callback("graph_requests_waiting", "Questions queued for a graph execution slot",
+                 lambda: {(): graph_executor.waiting})
+metrics.callback("answer_cache_lookups_total", "Answer cache lookups by result",
+                 lambda: {("exact_hit",): answer_cache.hits["exact"], ("semantic_hit",): answer_cache.hits["semantic"],
+                          ("miss",): answer_cache.misses},
+                 kind="counter", labelnames=["result"])
+metrics.callback("embedding_cache_lookups_total", "Embedding cache lookups by result",
+                 lambda: {("hit",): get_embeddings().hits, ("miss",): get_embeddings().misses},
+                 kind="counter", labelnames=["result"])
+metrics.callback("memory_write_queue_depth", "Conversations waiting for the background memory writer",
+                 lambda: {(): conversation_memory.stats()["queue_depth"]})
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """Assign the request ID, open the root trace span and time the request until its body is sent"""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    request.state.request_id = request_id
+    root = None
+    if not request.url.path.startswith(UNTRACED_PATHS):
+        root = tracer.start_trace(request_id, f"{request.method} {request.url.path}")
+    start = time.perf_counter()
+
+    def finish(status: int, error: Optional[BaseException] = None):
+        if root is not None:
+            root.attributes["status"] = status
+        tracer.end_trace(root, error)
+        if metrics.enabled:
+            # Label by route template so per-user paths like /history/{user_email} stay one series
+            route = request.scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            request_latency.observe(time.perf_counter() - start, path=path, method=request.method, status=status)
+
+    try:
+        response = await call_next(request)
+    except Exception as e:
+        finish(500, e)
+        raise
+
+    response.headers["X-Request-ID"] = request_id
+    # Streamed answers are still being generated after the headers go out
+    return FinishingResponse(response, finish)
+
+class FinishingResponse:
+    """Sends a middleware response and finishes its request however sending ends, client disconnects included"""
+
+    def __init__(self, response, finish):
+        self.response = response
+        self.finish = finish
+
+    async def __call__(self, scope, receive, send):
+        error = None
+        try:
+            await self.response(scope, receive, send)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.finish(self.response.status_code, error)
 
 class QuestionRequest(BaseModel):
     user_question: str
@@ -14,9 +108,9 @@ class QuestionRequest(BaseModel):
 async def root():
     return {"status": "ok", "message": "Agent Chatbot API is running"}
 
-@app.post("/ask")
-async def ask_question(request: QuestionRequest):
-    state = {
+def initial_state(request: QuestionRequest, request_id: str):
+    return {
+        "request_id": request_id,
         "user_question": request.user_question,
         "user_email": request.user_email,  # Pass user email for memory
         "voice": "",
@@ -24,35 +118,109 @@ async def ask_question(request: QuestionRequest):
         "response": "",
         "audio": b"",
         "conversation_history": [],
-        "messages": [HumanMessage(content=request.user_question)]
+        "messages": [HumanMessage(content=request.user_question)],
+        "cache_hit": False
     }
+
+def request_config(http_request: Request):
+    # Also reaches LangChain callbacks, so the request ID shows up on every run's metadata
+    return {"metadata": {"request_id": http_request.state.request_id}}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Latency histograms, cache hit counters and queue gauges in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/debug/traces")
+async def list_traces(limit: int = Query(20, ge=1, le=500)):
+    """Most recent request traces, newest first"""
+    return {"traces": trace_store.recent(limit)}
+
+@app.get("/debug/traces/{request_id}")
+async def get_trace(request_id: str):
+    """Span waterfall of one request: every span with its parent, start offset and duration"""
+    spans = trace_store.get(request_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail=f"No trace recorded for request {request_id}")
+    return {"request_id": request_id, "spans": spans}
+
+@app.post("/ask")
+async def ask_question(request: QuestionRequest, http_request: Request):
+    state = initial_state(request, http_request.state.request_id)
     
     # If using checkpointing, uncomment the following lines:
     # thread_id = str(uuid.uuid4())
     # config = {"configurable": {"thread_id": thread_id}}
-    # result = Graph.invoke(state, config=config)
+    # result = await graph_executor.run(state, config=config)
     
     # For no checkpointing (simpler approach):
-    result = Graph.invoke(state)
+    try:
+        result = await graph_executor.run(state, config=request_config(http_request))
+    except ExecutorRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     
     response_data = {
         "response": result.get("response", ""),
         "audio": result.get("audio", ""),
+        "request_id": http_request.state.request_id,
         # "thread_id": thread_id  # Uncomment if using checkpointing
     }
     
     return response_data
 
+class SlotStreamingResponse(StreamingResponse):
+    """StreamingResponse that releases the executor slot however the response ends, client disconnects included"""
+
+    def __init__(self, content, slot: ExecutorSlot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+@app.post("/ask/stream")
+async def ask_question_stream(request: QuestionRequest, http_request: Request):
+    """Stream the answer as Server-Sent Events: route, sources, token..., audio, then done"""
+    try:
+        # Admission happens before the response starts so a rejection is still a plain HTTP error
+        slot = await graph_executor.admit()
+    except ExecutorRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    stream = graph_executor.stream(initial_state(request, http_request.state.request_id), STREAM_MODES, slot,
+                                   config=request_config(http_request))
+
+    async def events():
+        translator = StreamTranslator()
+        try:
+            async for mode, chunk in stream:
+                for event, data in translator.translate(mode, chunk):
+                    yield format_sse(event, data)
+            event, data = translator.done()
+            yield format_sse(event, data)
+        except ExecutorRejected as e:
+            yield format_sse("error", {"status_code": e.status_code, "detail": e.message})
+        except Exception as e:
+            logging.error(f"Error while streaming answer: {str(e)}")
+            yield format_sse("error", {"status_code": 500, "detail": str(e)})
+        finally:
+            await stream.aclose()
+
+    return SlotStreamingResponse(events(), slot, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/history/{user_email}")
-async def get_user_history(user_email: str, limit: int = 10):
-    """Get user's conversation history from long-term memory"""
-    from app.memory.longterm_memory import longterm_memory
-    
+async def get_user_history(user_email: str, limit: int = Query(10, ge=1, le=history_page_max), cursor: Optional[str] = None):
+    """Get one newest-first page of the user's conversation history; pass next_cursor back for the next page"""
     try:
-        history = longterm_memory.get_user_history(user_email, limit)
-        return {"history": history}
+        # Includes conversations still queued for the background writer
+        history, next_cursor = await run_in_threadpool(conversation_memory.get_user_history_page, user_email, limit, cursor)
+        return {"history": history, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        return {"error": str(e), "history": []}
+        return {"error": str(e), "history": [], "next_cursor": None}
 
 @app.post("/search/{user_email}")
 async def search_user_conversations(user_email: str, query: str, limit: int = 5):
@@ -60,7 +228,7 @@ async def search_user_conversations(user_email: str, query: str, limit: int = 5)
     from app.memory.longterm_memory import longterm_memory
     
     try:
-        results = longterm_memory.search_user_conversations(user_email, query, limit)
+        results = await run_in_threadpool(longterm_memory.search_user_conversations, user_email, query, limit)
         return {"results": results}
     except Exception as e:
         return {"error": str(e), "results": []}
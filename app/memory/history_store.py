@@ -0,0 +1,142 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import json
+import base64
+import sqlite3
+import argparse
+import threading
+from typing import Dict, List, Optional, Tuple
+from app.logger import logging
+from app.exception import CustomException
+
+
+def encode_cursor(timestamp: str, conversation_id: str) -> str:
+    """Opaque cursor pointing just after the given history entry."""
+    return base64.urlsafe_b64encode(json.dumps([timestamp, conversation_id]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        timestamp, conversation_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(timestamp), str(conversation_id)
+    except Exception as e:
+        raise ValueError(f"Invalid history cursor: {cursor}") from e
+
+
+class HistoryStore:
+    """SQLite side table of conversation turns indexed on (user_email, timestamp).
+
+    Chroma keeps the embeddings for search; this table answers newest-first history reads with an
+    index range scan, so a page costs the same no matter how many turns a user has.
+    """
+
+    def __init__(self, path: str):
+        try:
+            self.path = path
+            self._lock = threading.Lock()
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self.created = self._connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'conversations'"
+            ).fetchone() is None
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "conversation_id TEXT PRIMARY KEY, user_email TEXT NOT NULL, timestamp TEXT NOT NULL, "
+                "question TEXT NOT NULL, response TEXT NOT NULL, category TEXT NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_conversations_user_time "
+                "ON conversations (user_email, timestamp DESC, conversation_id DESC)"
+            )
+            self._connection.commit()
+            logging.info(f"History store initialized at {path}")
+        except Exception as e:
+            logging.error(f"Failed to initialize history store: {str(e)}")
+            raise CustomException(e, sys)
+
+    def add(self, records: List[Dict]):
+        """Insert conversation records built by LongTermMemory.conversation_record; existing ids are kept."""
+        rows = [(
+            record["id"],
+            record["metadata"]["user_email"],
+            record["metadata"]["timestamp"],
+            record["metadata"]["question"],
+            record["metadata"]["response"],
+            record["metadata"]["category"],
+        ) for record in records]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO conversations "
+                "(conversation_id, user_email, timestamp, question, response, category) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._connection.commit()
+
+    def page(self, user_email: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Newest-first history of a user after the cursor, plus the cursor of the next page (None at the end)."""
+        query = ("SELECT conversation_id, timestamp, question, response, category FROM conversations "
+                 "WHERE user_email = ?")
+        params: list = [user_email]
+        if cursor:
+            query += " AND (timestamp, conversation_id) < (?, ?)"
+            params.extend(decode_cursor(cursor))
+        query += " ORDER BY timestamp DESC, conversation_id DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        history = [{
+            "question": question,
+            "response": response,
+            "category": category,
+            "timestamp": timestamp,
+            "conversation_id": conversation_id
+        } for conversation_id, timestamp, question, response, category in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit and history:
+            next_cursor = encode_cursor(history[-1]["timestamp"], history[-1]["conversation_id"])
+        return history, next_cursor
+
+    def count(self, user_email: Optional[str] = None) -> int:
+        with self._lock:
+            if user_email is None:
+                return self._connection.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM conversations WHERE user_email = ?", (user_email,)
+            ).fetchone()[0]
+
+    def backfill(self, client) -> int:
+        """Copy the turns already stored in Chroma collections into the side table."""
+        copied = 0
+        for collection in client.list_collections():
+            collection = client.get_collection(collection if isinstance(collection, str) else collection.name)
+            results = collection.get(include=["metadatas"])
+            records = [{"id": conversation_id, "metadata": {
+                "user_email": metadata.get("user_email", ""),
+                "timestamp": metadata.get("timestamp", ""),
+                "question": metadata.get("question", ""),
+                "response": metadata.get("response", ""),
+                "category": metadata.get("category", "general"),
+            }} for conversation_id, metadata in zip(results["ids"], results["metadatas"] or []) if metadata]
+            if records:
+                self.add(records)
+                copied += len(records)
+        logging.info(f"Backfilled {copied} conversation(s) into the history store")
+        return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the conversation history side table")
+    parser.add_argument("--backfill", action="store_true", help="copy existing Chroma conversations into the table")
+    args = parser.parse_args()
+
+    from app.memory.longterm_memory import longterm_memory
+    if args.backfill:
+        copied = longterm_memory.history.backfill(longterm_memory.client)
+        print(f"✅ Backfilled {copied} conversation(s)")
+    print(f"📊 {longterm_memory.history.count()} conversation(s) in {longterm_memory.history.path}")
+
+
+if __name__ == "__main__":
+    main()
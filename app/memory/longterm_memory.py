@@ -2,18 +2,39 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+import asyncio
+import hashlib
+import threading
 import chromadb
 from chromadb.config import Settings
 import uuid
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import os
+from app.memory.history_store import HistoryStore
+from app.llm_config import memory_layout, memory_shards, fake_providers
 from app.logger import logging
 from app.exception import CustomException
 
+SHARED_COLLECTION_PREFIX = "conversations_"
+
+
+def shard_for(user_email: str, shards: int) -> int:
+    """Stable shard of a user, the same in every process"""
+    return int(hashlib.sha1(user_email.encode("utf-8")).hexdigest(), 16) % shards
+
+
 class LongTermMemory:
-    def __init__(self, persist_directory: str = "./chroma_db"):
+    def __init__(self, persist_directory: str = "./chroma_db", layout: str = memory_layout, shards: int = memory_shards,
+                 embedding_function=None):
         try:
+            if layout not in ("per_user", "shared"):
+                raise ValueError(f"Unknown memory layout '{layout}'")
+            self.layout = layout
+            self.shards = shards
+            self.embedding_function = embedding_function
+            self._collections = {}
+            self._collections_lock = threading.Lock()
             self.client = chromadb.PersistentClient(
                 path=persist_directory,
                 settings=Settings(
@@ -22,90 +43,104 @@ class LongTermMemory:
                 )
             )
             logging.info("ChromaDB client initialized successfully")
+            # Time-indexed side table for history reads, Chroma stays the store for semantic search
+            self.history = HistoryStore(os.path.join(persist_directory, "history.sqlite3"))
+            if self.history.created:
+                self.history.backfill(self.client)
         except Exception as e:
             logging.error(f"Failed to initialize ChromaDB: {str(e)}")
             raise CustomException(e, sys)
     
+    def collection_name(self, user_email: str) -> str:
+        """Collection holding a user's conversations in the configured layout"""
+        if self.layout == "shared":
+            return f"{SHARED_COLLECTION_PREFIX}{shard_for(user_email, self.shards)}"
+        # Sanitize email for collection name (replace @ and . with _)
+        return user_email.replace("@", "_").replace(".", "_")
+    
     def get_or_create_collection(self, user_email: str):
-        """Get or create collection for a specific user"""
+        """Get or create collection for a specific user, handles are cached per process"""
         try:
-            # Sanitize email for collection name (replace @ and . with _)
-            collection_name = user_email.replace("@", "_").replace(".", "_")
-            collection = self.client.get_or_create_collection(
-                name=collection_name,
-                metadata={"user_email": user_email}
-            )
-            return collection
+            collection_name = self.collection_name(user_email)
+            collection = self._collections.get(collection_name)
+            if collection is not None:
+                return collection
+            with self._collections_lock:
+                if collection_name not in self._collections:
+                    kwargs = {"embedding_function": self.embedding_function} if self.embedding_function else {}
+                    metadata = {"layout": "shared"} if self.layout == "shared" else {"user_email": user_email}
+                    self._collections[collection_name] = self.client.get_or_create_collection(
+                        name=collection_name,
+                        metadata=metadata,
+                        **kwargs
+                    )
+                return self._collections[collection_name]
         except Exception as e:
             logging.error(f"Failed to get/create collection for {user_email}: {str(e)}")
             raise CustomException(e, sys)
     
-    def store_conversation(self, user_email: str, question: str, response: str, category: str = "general"):
-        """Store user question and response in long-term memory"""
+    def conversation_record(self, user_email: str, question: str, response: str, category: str = "general") -> Dict:
+        """Build the Chroma document, metadata and id of one conversation turn"""
+        conversation_id = str(uuid.uuid4())
+        return {
+            "id": conversation_id,
+            "document": f"Question: {question}\nResponse: {response}",
+            "metadata": {
+                "user_email": user_email,
+                "question": question,
+                "response": response,
+                "category": category,
+                "timestamp": datetime.now().isoformat(),
+                "conversation_id": conversation_id
+            }
+        }
+    
+    def add_conversations(self, user_email: str, records: List[Dict]):
+        """Store several conversation records of one user with a single collection.add"""
         try:
             collection = self.get_or_create_collection(user_email)
-            
-            conversation_id = str(uuid.uuid4())
-            timestamp = datetime.now().isoformat()
-            
-            # Store the conversation
             collection.add(
-                documents=[f"Question: {question}\nResponse: {response}"],
-                metadatas=[{
-                    "user_email": user_email,
-                    "question": question,
-                    "response": response,
-                    "category": category,
-                    "timestamp": timestamp,
-                    "conversation_id": conversation_id
-                }],
-                ids=[conversation_id]
+                documents=[record["document"] for record in records],
+                metadatas=[record["metadata"] for record in records],
+                ids=[record["id"] for record in records]
             )
-            
-            logging.info(f"Stored conversation for user {user_email}")
-            return conversation_id
-            
+            self.history.add(records)
+            logging.info(f"Stored {len(records)} conversation(s) for user {user_email}")
         except Exception as e:
-            logging.error(f"Failed to store conversation: {str(e)}")
+            logging.error(f"Failed to store conversations: {str(e)}")
             raise CustomException(e, sys)
     
+    def store_conversation(self, user_email: str, question: str, response: str, category: str = "general"):
+        """Store user question and response in long-term memory"""
+        record = self.conversation_record(user_email, question, response, category)
+        self.add_conversations(user_email, [record])
+        return record["id"]
+    
     def get_user_history(self, user_email: str, limit: int = 10) -> List[Dict]:
-        """Retrieve user's conversation history"""
+        """Retrieve user's conversation history (most recent first)"""
+        return self.get_user_history_page(user_email, limit)[0]
+    
+    def get_user_history_page(self, user_email: str, limit: int = 10, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """One newest-first page of the user's history and the cursor of the next page"""
         try:
-            collection = self.get_or_create_collection(user_email)
-            
-            results = collection.get(
-                limit=limit,
-                include=["metadatas", "documents"]
-            )
-            
-            history = []
-            if results['metadatas']:
-                for i, metadata in enumerate(results['metadatas']):
-                    history.append({
-                        "question": metadata.get("question", ""),
-                        "response": metadata.get("response", ""),
-                        "category": metadata.get("category", "general"),
-                        "timestamp": metadata.get("timestamp", ""),
-                        "conversation_id": metadata.get("conversation_id", "")
-                    })
-            
-            # Sort by timestamp (most recent first)
-            history.sort(key=lambda x: x['timestamp'], reverse=True)
-            return history
-            
+            return self.history.page(user_email, limit, cursor)
+        except ValueError:
+            raise
         except Exception as e:
             logging.error(f"Failed to retrieve history for {user_email}: {str(e)}")
-            return []
+            return [], None
     
     def search_user_conversations(self, user_email: str, query: str, n_results: int = 5) -> List[Dict]:
         """Search user's past conversations"""
         try:
             collection = self.get_or_create_collection(user_email)
             
+            # A shared collection holds many users, the filter keeps the search to this one
+            where = {"user_email": user_email} if self.layout == "shared" else None
             results = collection.query(
                 query_texts=[query],
                 n_results=n_results,
+                where=where,
                 include=["metadatas", "documents", "distances"]
             )
             
@@ -125,7 +160,26 @@ class LongTermMemory:
         except Exception as e:
             logging.error(f"Failed to search conversations for {user_email}: {str(e)}")
             return []
+    
+    async def astore_conversation(self, user_email: str, question: str, response: str, category: str = "general"):
+        """Async variant of store_conversation, the Chroma write runs in a worker thread"""
+        return await asyncio.to_thread(self.store_conversation, user_email, question, response, category)
+    
+    async def aget_user_history(self, user_email: str, limit: int = 10) -> List[Dict]:
+        """Async variant of get_user_history"""
+        return await asyncio.to_thread(self.get_user_history, user_email, limit)
+    
+    async def asearch_user_conversations(self, user_email: str, query: str, n_results: int = 5) -> List[Dict]:
+        """Async variant of search_user_conversations"""
+        return await asyncio.to_thread(self.search_user_conversations, user_email, query, n_results)
+
+
 
+def _default_embedding_function():
+    if fake_providers:
+        from app.fake_providers import FakeChromaEmbeddings
+        return FakeChromaEmbeddings()
+    return None
 
 
-longterm_memory = LongTermMemory()
\ No newline at end of file
+longterm_memory = LongTermMemory(embedding_function=_default_embedding_function())
\ No newline at end of file
@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import argparse
+from typing import Dict
+from app.memory.longterm_memory import LongTermMemory, SHARED_COLLECTION_PREFIX
+from app.llm_config import memory_shards
+from app.logger import logging
+from app.exception import CustomException
+
+
+def migrate_to_shared(persist_directory: str = "./chroma_db", shards: int = memory_shards,
+                      delete_source: bool = False, batch_size: int = 500, embedding_function=None) -> Dict[str, int]:
+    """Copy every per-user collection into the hash-sharded shared layout.
+
+    Stored embeddings are copied as they are, so nothing is re-embedded, and upserts keep the
+    migration safe to re-run. Source collections are only deleted when asked to.
+    """
+    try:
+        target = LongTermMemory(persist_directory, layout="shared", shards=shards, embedding_function=embedding_function)
+        stats = {"users": 0, "conversations": 0, "deleted": 0}
+        for collection in target.client.list_collections():
+            name = collection if isinstance(collection, str) else collection.name
+            if name.startswith(SHARED_COLLECTION_PREFIX):
+                continue
+            source = target.client.get_collection(name)
+            user_email = (source.metadata or {}).get("user_email")
+            if not user_email:
+                logging.warning(f"Skipping collection {name}, it has no user_email metadata")
+                continue
+
+            destination = target.get_or_create_collection(user_email)
+            total = source.count()
+            for offset in range(0, total, batch_size):
+                batch = source.get(limit=batch_size, offset=offset, include=["documents", "metadatas", "embeddings"])
+                if not batch["ids"]:
+                    break
+                destination.upsert(
+                    ids=batch["ids"],
+                    documents=batch["documents"],
+                    metadatas=batch["metadatas"],
+                    embeddings=batch["embeddings"]
+                )
+            stats["users"] += 1
+            stats["conversations"] += total
+            print(f"✅ {user_email}: {total} conversation(s) -> {destination.name}")
+
+            if delete_source:
+                target.client.delete_collection(name)
+                stats["deleted"] += 1
+
+        logging.info(f"Memory migration finished: {stats}")
+        return stats
+    except Exception as e:
+        logging.error(f"Memory migration failed: {str(e)}")
+        raise CustomException(e, sys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move per-user memory collections into shared, hash-sharded collections")
+    parser.add_argument("--persist-directory", default="./chroma_db")
+    parser.add_argument("--shards", type=int, default=memory_shards)
+    parser.add_argument("--delete-source", action="store_true", help="drop each per-user collection once copied")
+    args = parser.parse_args()
+
+    stats = migrate_to_shared(args.persist_directory, args.shards, args.delete_source)
+    print("=" * 60)
+    print(f"📊 Migrated {stats['conversations']} conversation(s) of {stats['users']} user(s), "
+          f"deleted {stats['deleted']} source collection(s)")
+    print("Set memory_layout = \"shared\" and memory_shards in llm_config.py to serve from the new layout")
+
+
+if __name__ == "__main__":
+    main()
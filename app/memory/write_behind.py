@@ -0,0 +1,242 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import time
+import asyncio
+import queue
+import atexit
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from app.memory.longterm_memory import LongTermMemory, longterm_memory
+from app.memory.history_store import encode_cursor, decode_cursor
+from app.llm_config import (
+    memory_write_behind,
+    memory_batch_size,
+    memory_flush_interval,
+    memory_max_queue,
+    memory_max_retries,
+    memory_retry_backoff,
+)
+from app.logger import logging
+
+_STOP = object()
+
+
+class WriteBehindMemory:
+    """Queues conversation writes in process and stores them in batches from a background thread.
+
+    Records stay visible to history reads until they are flushed, and the queue is drained on
+    shutdown, so answering a question never waits on the embedding and Chroma insert.
+    """
+
+    def __init__(
+        self,
+        memory: LongTermMemory,
+        enabled: bool = memory_write_behind,
+        batch_size: int = memory_batch_size,
+        flush_interval: float = memory_flush_interval,
+        max_queue: int = memory_max_queue,
+        max_retries: int = memory_max_retries,
+        retry_backoff: float = memory_retry_backoff,
+    ):
+        self.memory = memory
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._pending: Dict[str, Dict[str, Dict]] = defaultdict(dict)
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._stopped = False
+        self._draining = threading.Event()
+        self._retry_after = 0.0
+        self.flushed = 0
+        self.failed = 0
+
+    def _start(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+                    self._worker.start()
+
+    def _offer(self, record: Dict) -> bool:
+        """Queue a record for the writer; False when it has to be stored synchronously instead."""
+        if not self.enabled:
+            return False
+        self._start()
+        # Checked and queued under the lock drain() stops under, so nothing lands behind the stop marker
+        with self._lock:
+            if self._stopped:
+                return False
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                logging.warning("Memory write queue full, storing conversation synchronously")
+                return False
+            self._pending[record["metadata"]["user_email"]][record["id"]] = record
+        return True
+
+    def _store(self, record: Dict):
+        self.memory.add_conversations(record["metadata"]["user_email"], [record])
+
+    def enqueue(self, user_email: str, question: str, response: str, category: str = "general") -> str:
+        """Record a conversation turn and return its id; the Chroma write happens later in the background."""
+        record = self.memory.conversation_record(user_email, question, response, category)
+        if not self._offer(record):
+            self._store(record)
+        return record["id"]
+
+    async def aenqueue(self, user_email: str, question: str, response: str, category: str = "general") -> str:
+        """Async variant of enqueue, a synchronous store (disabled, stopped or full queue) runs in a worker thread"""
+        record = self.memory.conversation_record(user_email, question, response, category)
+        if not self._offer(record):
+            await asyncio.to_thread(self._store, record)
+        return record["id"]
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._flush(self._remaining())
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._flush(batch + self._remaining())
+                    return
+                batch.append(item)
+            self._backoff()
+            self._flush(batch)
+
+    def _backoff(self):
+        """Hold the next batch while a failed write backs off, unless drain() wants the queue flushed now."""
+        delay = self._retry_after - time.monotonic()
+        if delay > 0:
+            self._draining.wait(delay)
+
+    def _remaining(self) -> List[Dict]:
+        """Writes that raced in behind the stop marker."""
+        records = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return records
+            if item is not _STOP:
+                records.append(item)
+
+    def _flush(self, records: List[Dict]):
+        by_user = defaultdict(list)
+        for record in records:
+            by_user[record["metadata"]["user_email"]].append(record)
+        for user_email, user_records in by_user.items():
+            try:
+                self.memory.add_conversations(user_email, user_records)
+                self._forget(user_email, user_records)
+                self.flushed += len(user_records)
+            except Exception as e:
+                logging.error(f"Flushing {len(user_records)} conversation(s) for {user_email} failed: {str(e)}")
+                self._retry(user_email, user_records)
+
+    def _retry(self, user_email: str, records: List[Dict]):
+        for record in records:
+            attempts = self._attempts.get(record["id"], 0) + 1
+            if attempts >= self.max_retries or self._stopped:
+                logging.error(f"Dropping conversation {record['id']} after {attempts} failed write(s)")
+                self._forget(user_email, [record])
+                self.failed += 1
+                continue
+            self._attempts[record["id"]] = attempts
+            self._retry_after = max(self._retry_after, time.monotonic() + self.retry_backoff * 2 ** (attempts - 1))
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self._forget(user_email, [record])
+                self.failed += 1
+
+    def _forget(self, user_email: str, records: List[Dict]):
+        with self._lock:
+            pending = self._pending.get(user_email, {})
+            for record in records:
+                pending.pop(record["id"], None)
+                self._attempts.pop(record["id"], None)
+            if not pending:
+                self._pending.pop(user_email, None)
+
+    def pending_history(self, user_email: str) -> List[Dict]:
+        """Queued, not yet flushed turns of a user in the same shape as get_user_history."""
+        with self._lock:
+            records = list(self._pending.get(user_email, {}).values())
+        return [{
+            "question": record["metadata"]["question"],
+            "response": record["metadata"]["response"],
+            "category": record["metadata"]["category"],
+            "timestamp": record["metadata"]["timestamp"],
+            "conversation_id": record["id"]
+        } for record in records]
+
+    def get_user_history(self, user_email: str, limit: int = 10) -> List[Dict]:
+        """User history including conversations still waiting in the queue, most recent first."""
+        return self.get_user_history_page(user_email, limit)[0]
+
+    def get_user_history_page(self, user_email: str, limit: int = 10, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """One page of get_user_history and the cursor of the next page."""
+        pending = self.pending_history(user_email)
+        if cursor:
+            position = decode_cursor(cursor)
+            pending = [entry for entry in pending if (entry["timestamp"], entry["conversation_id"]) < position]
+        # One extra stored entry tells whether anything follows this page
+        stored, stored_cursor = self.memory.get_user_history_page(user_email, limit + 1, cursor)
+        seen = set()
+        merged = []
+        for entry in sorted(pending + stored, key=lambda x: (x["timestamp"], x["conversation_id"]), reverse=True):
+            if entry["conversation_id"] in seen:
+                continue
+            seen.add(entry["conversation_id"])
+            merged.append(entry)
+        history = merged[:limit]
+        next_cursor = None
+        if (len(merged) > limit or stored_cursor) and history:
+            next_cursor = encode_cursor(history[-1]["timestamp"], history[-1]["conversation_id"])
+        return history, next_cursor
+
+    def drain(self, timeout: Optional[float] = None):
+        """Flush everything queued and stop the writer; later writes are stored synchronously."""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        self._draining.set()
+        if self._worker is not None:
+            self._queue.put(_STOP)
+            self._worker.join(timeout)
+            if self._worker.is_alive():
+                logging.error(f"Memory writer did not drain within {timeout}s, {self._queue.qsize()} write(s) left")
+            else:
+                logging.info(f"Memory writer drained, {self.flushed} conversation(s) flushed")
+
+    def stats(self) -> Dict:
+        """Queue depth and flush counters."""
+        with self._lock:
+            pending = sum(len(records) for records in self._pending.values())
+        return {
+            "queue_depth": self._queue.qsize(),
+            "pending": pending,
+            "flushed": self.flushed,
+            "failed": self.failed,
+        }
+
+
+conversation_memory = WriteBehindMemory(longterm_memory)
+atexit.register(conversation_memory.drain, 30)
@@ -0,0 +1,270 @@
+import sys
+import os
+import time
+import bisect
+import inspect
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from langchain_core.callbacks import BaseCallbackHandler
+from app.llm_config import metrics_enabled, metrics_latency_buckets
+from app.monitoring.tracing import tracer
+from app.logger import logging
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set, in seconds."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = metrics_latency_buckets):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: bucket counts (last slot is +Inf), sum, count
+        self._series: Dict[LabelValues, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            series = {key: ([*counts], total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip([*self.buckets, float("inf")], counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+class CallbackMetric:
+    """Gauge or counter whose values are read from a function at scrape time, e.g. a stats() dict."""
+
+    def __init__(self, name: str, help: str, kind: str, collect: Callable[[], Dict[LabelValues, float]],
+                 labelnames: Sequence[str] = ()):
+        self.name, self.help, self.kind, self.labelnames = name, help, kind, tuple(labelnames)
+        self.collect = collect
+
+    def samples(self) -> Iterable[str]:
+        try:
+            values = self.collect()
+        except Exception as e:
+            logging.error(f"Failed to collect metric {self.name}: {str(e)}")
+            return
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self, enabled: bool = metrics_enabled):
+        self.enabled = enabled
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Re-registering a name (e.g. on module reload) replaces the old metric
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = metrics_latency_buckets) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name: str, help: str, collect: Callable[[], Dict[LabelValues, float]],
+                 kind: str = "gauge", labelnames: Sequence[str] = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, help, kind, collect, labelnames))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+node_latency = metrics.histogram("graph_node_duration_seconds", "Time spent in each LangGraph node", ["node"])
+node_errors = metrics.counter("graph_node_errors_total", "Exceptions raised by each LangGraph node", ["node"])
+span_latency = metrics.histogram(
+    "span_duration_seconds", "Time spent in embedding, chroma, bm25, rerank, llm and tts calls", ["span", "component"]
+)
+span_errors = metrics.counter("span_errors_total", "Failed embedding, chroma, bm25, rerank, llm and tts calls", ["span"])
+request_latency = metrics.histogram("http_request_duration_seconds", "Latency of API requests", ["path", "method", "status"])
+
+
+@contextmanager
+def timed_span(span: str, component: str = ""):
+    """Record the duration of one sub-step of a request, and trace it as a child of the current span."""
+    start = time.perf_counter()
+    with tracer.span(span, component=component):
+        try:
+            yield
+        except Exception:
+            if metrics.enabled:
+                span_errors.inc(span=span)
+            raise
+        finally:
+            if metrics.enabled:
+                span_latency.observe(time.perf_counter() - start, span=span, component=component)
+
+
+def _request_id(args) -> Optional[str]:
+    state = args[0] if args else None
+    return state.get("request_id") if isinstance(state, dict) else None
+
+
+def instrument_node(name: str, func: Callable) -> Callable:
+    """Wrap a graph node so its latency and errors are recorded under its node name.
+
+    The node is also traced as a span of the request whose request_id is in its state, so the
+    retriever, rerank and LLM spans it opens nest under it. functools.wraps keeps the signature
+    LangGraph inspects to decide whether to pass config and writer.
+    """
+    if not metrics.enabled and not tracer.enabled:
+        return func
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_node(*args, **kwargs):
+            start = time.perf_counter()
+            with tracer.span(name, _request_id(args)):
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    if metrics.enabled:
+                        node_errors.inc(node=name)
+                    raise
+                finally:
+                    if metrics.enabled:
+                        node_latency.observe(time.perf_counter() - start, node=name)
+        return async_node
+
+    @functools.wraps(func)
+    def node(*args, **kwargs):
+        start = time.perf_counter()
+        with tracer.span(name, _request_id(args)):
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                if metrics.enabled:
+                    node_errors.inc(node=name)
+                raise
+            finally:
+                if metrics.enabled:
+                    node_latency.observe(time.perf_counter() - start, node=name)
+    return node
+
+
+class LLMLatencyHandler(BaseCallbackHandler):
+    """LangChain callback that records every LLM call from start to final token under the llm span,
+    traced as a child of the span that made the call."""
+
+    # Only touches a dict and a histogram, so it is cheap enough to run on the event loop
+    run_inline = True
+
+    def __init__(self):
+        self._started: Dict[UUID, Tuple[float, str, Any]] = {}
+
+    def _start(self, serialized: Optional[Dict[str, Any]], run_id: UUID, metadata: Optional[Dict[str, Any]]):
+        model = str((metadata or {}).get("ls_model_name") or ((serialized or {}).get("kwargs") or {}).get("model", ""))
+        self._started[run_id] = (time.perf_counter(), model, tracer.open("llm", component=model))
+
+    def _finish(self, run_id: UUID, error: Optional[BaseException] = None):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        start, model, span = started
+        tracer.close(span, error)
+        if not metrics.enabled:
+            return
+        if error is not None:
+            span_errors.inc(span="llm")
+        span_latency.observe(time.perf_counter() - start, span="llm", component=model)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(serialized, run_id, metadata)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(serialized, run_id, metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error)
+
+
+llm_latency_handler = LLMLatencyHandler()
@@ -0,0 +1,175 @@
+import sys
+import os
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.llm_config import tracing_enabled, trace_buffer_size, trace_max_spans, trace_export_path
+from app.logger import logging
+
+
+@dataclass
+class Span:
+    """One timed step of a request; parent_id links it into the request's waterfall."""
+
+    trace_id: str
+    name: str
+    parent_id: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    start: float = field(default_factory=time.time)
+    duration_ms: Optional[float] = None
+    error: Optional[str] = None
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class TraceStore:
+    """Ring buffer of the most recent traces, optionally appending every finished span to a JSONL file."""
+
+    def __init__(self, max_traces: int = trace_buffer_size, max_spans: int = trace_max_spans,
+                 export_path: Optional[str] = trace_export_path):
+        self.max_traces = max_traces
+        self.max_spans = max_spans
+        self.export_path = export_path
+        self._traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        record = span.to_dict()
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._traces[span.trace_id] = []
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            if len(spans) < self.max_spans:
+                spans.append(record)
+            if self.export_path:
+                try:
+                    with open(self.export_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record, default=str) + "\n")
+                except OSError as e:
+                    logging.error(f"Failed to export span to {self.export_path}: {str(e)}")
+
+    def get(self, trace_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Finished spans of a trace ordered by start time, each with its offset from the first."""
+        with self._lock:
+            spans = list(self._traces.get(trace_id, []))
+        if not spans:
+            return None
+        spans.sort(key=lambda s: s["start"])
+        origin = spans[0]["start"]
+        return [{**s, "offset_ms": round((s["start"] - origin) * 1000, 3)} for s in spans]
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Newest traces first, summarised by their root span."""
+        with self._lock:
+            traces = list(self._traces.items())[-limit:]
+        summaries = []
+        for trace_id, spans in reversed(traces):
+            root = next((s for s in spans if s["parent_id"] is None), None)
+            summaries.append({
+                "trace_id": trace_id,
+                "name": root["name"] if root else None,
+                "duration_ms": root["duration_ms"] if root else None,
+                "spans": len(spans),
+            })
+        return summaries
+
+
+class Tracer:
+    """Request-scoped spans kept in a context variable, so they nest across asyncio tasks and
+    context-copying thread pools without passing a span object around.
+
+    Nothing is recorded outside a trace, so index builds and benchmarks pay only a lookup.
+    """
+
+    def __init__(self, store: TraceStore, enabled: bool = tracing_enabled):
+        self.store = store
+        self.enabled = enabled
+        self._current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+        # Root span of every open trace, so graph nodes can attach to it from the request ID in their state
+        self._roots: Dict[str, Span] = {}
+
+    def current(self) -> Optional[Span]:
+        return self._current.get()
+
+    def _parent(self, trace_id: Optional[str]) -> Optional[Span]:
+        current = self._current.get()
+        if current is not None and (trace_id is None or current.trace_id == trace_id):
+            return current
+        return self._roots.get(trace_id) if trace_id else None
+
+    def open(self, name: str, trace_id: Optional[str] = None, **attributes) -> Optional[Span]:
+        """Start a child of the current span (or of trace_id's root); None when there is no trace to join."""
+        if not self.enabled:
+            return None
+        parent = self._parent(trace_id)
+        if parent is None:
+            return None
+        return Span(trace_id=parent.trace_id, name=name, parent_id=parent.span_id, attributes=attributes)
+
+    def close(self, span: Optional[Span], error: Optional[BaseException] = None):
+        if span is None:
+            return
+        span.duration_ms = round((time.perf_counter() - span._started) * 1000, 3)
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        self.store.add(span)
+
+    def start_trace(self, trace_id: str, name: str, **attributes) -> Optional[Span]:
+        """Open the root span of a request and make it current in this context."""
+        if not self.enabled:
+            return None
+        root = Span(trace_id=trace_id, name=name, attributes=attributes)
+        self._roots[trace_id] = root
+        self._current.set(root)
+        return root
+
+    def end_trace(self, root: Optional[Span], error: Optional[BaseException] = None):
+        if root is None:
+            return
+        self._roots.pop(root.trace_id, None)
+        if self._current.get() is root:
+            self._current.set(None)
+        self.close(root, error)
+
+    @contextmanager
+    def span(self, name: str, trace_id: Optional[str] = None, **attributes):
+        """Time a block as a child span and make it the parent of the spans opened inside it."""
+        span = self.open(name, trace_id, **attributes)
+        if span is None:
+            yield None
+            return
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self._current.reset(token)
+            self.close(span, e)
+            raise
+        self._current.reset(token)
+        self.close(span)
+
+
+trace_store = TraceStore()
+tracer = Tracer(trace_store)
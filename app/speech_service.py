@@ -1,6 +1,9 @@
 import assemblyai as aai
 import tempfile
 import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.llm_config import fake_providers
 
 class AudioTranscriber:
     def __init__(self, api_key):
@@ -11,7 +14,11 @@ class AudioTranscriber:
             punctuate=True,
             format_text=True
         )
-        self.transcriber = aai.Transcriber(config=self.config)
+        if fake_providers:
+            from app.fake_providers import FakeTranscriber
+            self.transcriber = FakeTranscriber()
+        else:
+            self.transcriber = aai.Transcriber(config=self.config)
     
     def transcribe_bytes(self, audio_bytes):
         """Transcribe audio bytes to text"""
@@ -5,4 +5,9 @@ USERS = {
     "marketing@company.com": {"password": "mkt123", "role": "Marketing"},
     "hr@company.com": {"password": "hr123", "role": "HR"},
     "user@company.com": {"password": "user123", "role": "General"}
-}
\ No newline at end of file
+}
+
+
+def get_user_role(user_email: str) -> str:
+    """Role of a user, unknown users are treated as General"""
+    return USERS.get(user_email, {}).get("role", "General")
@@ -0,0 +1,103 @@
+"""Per-request chain construction overhead, before and after the prebuilt ChainFactory.
+
+Run from the repository root:
+    python benchmarks/bench_chain_construction.py --iterations 200
+
+Only construction is timed; no LLM, embedding or rerank calls are made.
+"""
+import sys
+import os
+import time
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "app"))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+os.environ.setdefault("cohere_api_key", "benchmark-placeholder")
+
+from langchain.prompts import PromptTemplate
+from langchain.chains import RetrievalQA
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from graph.model import Router
+from graph.utils.prompt import router_template
+from graph.chains import ChainFactory, llm
+
+DEPARTMENTS = ["engineering", "finance", "general", "hr", "marketing"]
+
+
+class StaticRetriever(BaseRetriever):
+    """Retriever stand-in so construction can be timed without opening any index."""
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return [Document(page_content=query)]
+
+
+class StaticRegistry:
+    def __init__(self):
+        self._retrievers = {department: StaticRetriever() for department in DEPARTMENTS}
+
+    def get(self, name):
+        return self._retrievers[name]
+
+    def names(self):
+        return list(self._retrievers)
+
+
+def build_per_request(department, retriever):
+    """What route_node and a department node constructed on every question before ChainFactory."""
+    structured_llm = llm.with_structured_output(Router)
+    prompt = PromptTemplate.from_template(router_template)
+    router_chain = prompt | structured_llm
+    qa_chain = RetrievalQA.from_chain_type(llm=llm, chain_type="stuff", retriever=retriever)
+    return router_chain, qa_chain
+
+
+def build_prebuilt(factory, department):
+    return factory.router_chain, factory.qa_chain(department)
+
+
+def measure(fn, iterations):
+    samples = []
+    for i in range(iterations):
+        department = DEPARTMENTS[i % len(DEPARTMENTS)]
+        start = time.perf_counter()
+        fn(department)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": statistics.mean(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    registry = StaticRegistry()
+    factory_start = time.perf_counter()
+    factory = ChainFactory(llm, registry)
+    factory.warm()
+    startup_ms = (time.perf_counter() - factory_start) * 1000
+
+    before = measure(lambda d: build_per_request(d, registry.get(d)), args.iterations)
+    after = measure(lambda d: build_prebuilt(factory, d), args.iterations)
+
+    print(f"Chain construction per request ({args.iterations} iterations)")
+    print("-" * 60)
+    print(f"{'':<22}{'mean ms':>12}{'p50 ms':>12}{'p99 ms':>12}")
+    for label, result in (("per-request build", before), ("prebuilt factory", after)):
+        print(f"{label:<22}{result['mean_ms']:>12.4f}{result['p50_ms']:>12.4f}{result['p99_ms']:>12.4f}")
+    print("-" * 60)
+    print(f"One-time factory warm-up: {startup_ms:.2f} ms")
+    if after["mean_ms"] > 0:
+        print(f"Speed-up: {before['mean_ms'] / after['mean_ms']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
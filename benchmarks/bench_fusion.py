@@ -0,0 +1,120 @@
+"""Candidates, prompt size and latency of EnsembleRetriever's RRF against fuse_documents.
+
+Run from the repository root:
+    python benchmarks/bench_fusion.py --candidates 10 --threshold 0.9 --max-candidates 6
+
+Every fixture question is sent to each keyword retriever of its department, and the ranked
+lists are fused twice: by EnsembleRetriever.weighted_reciprocal_rank (exact-content dedupe, no
+cap) and by fuse_documents (content hash, near-duplicate cosine and a cap). A question counts as
+recalled when a fused candidate contains its "relevant" snippet. The census at the end counts
+chunk pairs in each corpus at or above the near-duplicate threshold.
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "app"))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+
+import numpy as np
+from langchain.retrievers import EnsembleRetriever
+from app.Storage.keyword_ret import KeywordRetrieverManager
+from app.Storage.fusion import fuse_documents, shingle_vectors
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "rerank_questions.json")
+KEYWORD_RETRIEVERS = {
+    "engineering": ["eng_keyword"],
+    "finance": ["fin_summary_keyword", "fin_quarterly_keyword"],
+    "general": ["general_keyword"],
+    "hr": ["hr_keyword"],
+    "marketing": ["marketing_keyword"],
+}
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def summarize(label, results):
+    candidates = [r["candidates"] for r in results]
+    chars = [r["chars"] for r in results]
+    latencies = [ms for r in results for ms in r["latencies"]]
+    recall = sum(r["recalled"] for r in results) / len(results)
+    print(f"{label:<16}{statistics.mean(candidates):>12.1f}{statistics.mean(chars) / 4:>14.0f}"
+          f"{recall:>10.2f}{percentile(latencies, 0.5):>12.3f}{percentile(latencies, 0.99):>12.3f}")
+
+
+def run(fuse, lists, snippet, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fused = fuse(lists)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "candidates": len(fused),
+        "chars": sum(len(d.page_content) for d in fused),
+        "recalled": any(snippet in d.page_content for d in fused),
+        "latencies": latencies,
+    }
+
+
+def census(manager, threshold):
+    print(f"Chunk pairs with cosine >= {threshold} per corpus")
+    for names in KEYWORD_RETRIEVERS.values():
+        for name in names:
+            retriever = manager.get_retriever(name)
+            if hasattr(retriever, "index"):
+                documents = [retriever.index.document(i) for i in range(retriever.index.meta["n_docs"])]
+            else:
+                documents = retriever.docs
+            texts = [d.page_content for d in documents]
+            vectors = shingle_vectors(texts)
+            similarity = np.triu(vectors @ vectors.T, k=1)
+            print(f"  {name:<24}{len(texts):>6} chunks{int((similarity >= threshold).sum()):>6} pair(s)"
+                  f"   max cosine {similarity.max():.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=10, help="documents each retriever returns")
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--max-candidates", type=int, default=6)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    with open(FIXTURES, encoding="utf-8") as f:
+        fixtures = json.load(f)
+    manager = KeywordRetrieverManager(retrievers_storage_path=os.path.join(ROOT, "retrievers"))
+
+    baseline, fused = [], []
+    for fixture in fixtures:
+        lists = []
+        for name in KEYWORD_RETRIEVERS[fixture["department"]]:
+            retriever = manager.get_retriever(name)
+            retriever.k = args.candidates
+            lists.append(retriever.invoke(fixture["question"]))
+        weights = [1.0 / len(lists)] * len(lists)
+        ensemble = EnsembleRetriever(retrievers=[manager.get_retriever(n) for n in KEYWORD_RETRIEVERS[fixture["department"]]],
+                                     weights=weights)
+        baseline.append(run(ensemble.weighted_reciprocal_rank, lists, fixture["relevant"], args.repeats))
+        fused.append(run(lambda l: fuse_documents(l, weights, near_duplicate_threshold=args.threshold,
+                                                  max_candidates=args.max_candidates),
+                         lists, fixture["relevant"], args.repeats))
+
+    print(f"{len(fixtures)} questions, {args.candidates} candidates per retriever")
+    print("-" * 76)
+    print(f"{'fusion':<16}{'candidates':>12}{'~tokens':>14}{'recall':>10}{'p50 ms':>12}{'p99 ms':>12}")
+    summarize("ensemble rrf", baseline)
+    summarize("fuse_documents", fused)
+    print("-" * 76)
+    census(manager, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Insert and search latency of the per-user and shared (hash-sharded) memory layouts.
+
+Run from the repository root:
+    python benchmarks/bench_memory_layout.py --users 10000 --shards 1 8
+
+Every layout is built in its own temporary Chroma directory with a deterministic hashing
+embedding function, so no model is downloaded and no API is called. Client startup is timed
+by reopening the directory once it is populated.
+"""
+import sys
+import os
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import numpy as np
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+TOPICS = ["leave policy", "quarterly revenue", "deployment pipeline", "campaign ROI", "salary revision",
+          "sick leave", "cloud costs", "hiring plan", "performance review", "vendor payments"]
+
+
+class HashEmbeddings(EmbeddingFunction):
+    """Bag of hashed words, L2 normalised: stable across runs and free to compute."""
+
+    def __init__(self, dimensions: int = 128):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            vector = np.zeros(self.dimensions, dtype=np.float32)
+            for word in text.lower().split():
+                vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dimensions] += 1.0
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "benchmark-hash"
+
+    def get_config(self):
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashEmbeddings(config["dimensions"])
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        "mean": statistics.mean(samples),
+    }
+
+
+def run_layout(label, users, turns, searches, layout, shards, rng):
+    from app.memory.longterm_memory import LongTermMemory
+
+    directory = tempfile.mkdtemp(prefix="bench_memory_")
+    try:
+        embeddings = HashEmbeddings()
+        memory = LongTermMemory(directory, layout=layout, shards=shards, embedding_function=embeddings)
+        insert_ms = []
+        for turn in range(turns):
+            for user in users:
+                topic = rng.choice(TOPICS)
+                record = memory.conversation_record(user, f"What is the {topic} for turn {turn}?", f"Answer about {topic}.")
+                start = time.perf_counter()
+                memory.add_conversations(user, [record])
+                insert_ms.append((time.perf_counter() - start) * 1000)
+
+        search_ms = []
+        for _ in range(searches):
+            user = rng.choice(users)
+            start = time.perf_counter()
+            results = memory.search_user_conversations(user, rng.choice(TOPICS), n_results=3)
+            search_ms.append((time.perf_counter() - start) * 1000)
+            assert all(r["question"] for r in results)
+
+        collections = len(memory.client.list_collections())
+        del memory
+        start = time.perf_counter()
+        reopened = LongTermMemory(directory, layout=layout, shards=shards, embedding_function=embeddings)
+        reopened.search_user_conversations(users[0], TOPICS[0], n_results=3)
+        startup_ms = (time.perf_counter() - start) * 1000
+        return {"label": label, "collections": collections, "insert": percentiles(insert_ms),
+                "search": percentiles(search_ms), "startup_ms": startup_ms}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=1, help="conversations stored per user")
+    parser.add_argument("--searches", type=int, default=500)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 8], help="shard counts of the shared layout")
+    parser.add_argument("--skip-per-user", action="store_true")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # Importing app.memory opens the default store in ./chroma_db, so keep the working directory out of the checkout
+    workdir = tempfile.mkdtemp(prefix="bench_memory_")
+    os.chdir(workdir)
+    try:
+        run(args)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(args):
+    users = [f"employee{i}@fintechco.com" for i in range(args.users)]
+    layouts = [] if args.skip_per_user else [("per_user", "per_user", 1)]
+    layouts += [(f"shared x{shards}", "shared", shards) for shards in args.shards]
+
+    print(f"Memory layouts with {args.users} users, {args.turns} turn(s) each, {args.searches} searches")
+    print("-" * 96)
+    print(f"{'layout':<14}{'collections':>12}{'insert p50':>12}{'insert p99':>12}"
+          f"{'search p50':>12}{'search p95':>12}{'search p99':>12}{'startup ms':>12}")
+    for label, layout, shards in layouts:
+        result = run_layout(label, users, args.turns, args.searches, layout, shards, random.Random(args.seed))
+        print(f"{label:<14}{result['collections']:>12}{result['insert']['p50']:>12.2f}{result['insert']['p99']:>12.2f}"
+              f"{result['search']['p50']:>12.2f}{result['search']['p95']:>12.2f}{result['search']['p99']:>12.2f}"
+              f"{result['startup_ms']:>12.1f}")
+    print("-" * 96)
+    print("Latencies in ms per call; history reads are served by the SQLite side table in every layout.")
+
+
+if __name__ == "__main__":
+    main()
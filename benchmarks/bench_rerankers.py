@@ -0,0 +1,117 @@
+"""Latency and recall of the reranker backends on the fixture questions.
+
+Run from the repository root:
+    python benchmarks/bench_rerankers.py --backends cohere cross_encoder none --candidates 20
+
+Candidate pools come from the saved keyword retrievers so the fixtures run without the
+vector stores or an embedding key. A question counts as recalled when a chunk containing its
+"relevant" snippet is in the reranked top_n. The cohere backend needs cohere_api_key and is
+skipped without it; cross_encoder needs the model exported by app/Storage/rerankers.py --export.
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "app"))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+
+from app.Storage.keyword_ret import KeywordRetrieverManager
+from app.Storage.rerankers import create_reranker, RERANKER_BACKENDS
+from app.llm_config import no_k, cross_encoder_model_dir
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "rerank_questions.json")
+KEYWORD_RETRIEVERS = {
+    "engineering": ["eng_keyword"],
+    "finance": ["fin_summary_keyword", "fin_quarterly_keyword"],
+    "general": ["general_keyword"],
+    "hr": ["hr_keyword"],
+    "marketing": ["marketing_keyword"],
+}
+
+
+def candidate_pools(fixtures, candidates):
+    """Top keyword candidates of every fixture question, deduplicated on content."""
+    manager = KeywordRetrieverManager(retrievers_storage_path=os.path.join(ROOT, "retrievers"))
+    pools = []
+    for fixture in fixtures:
+        pool = {}
+        for name in KEYWORD_RETRIEVERS[fixture["department"]]:
+            retriever = manager.get_retriever(name)
+            retriever.k = candidates
+            for doc in retriever.invoke(fixture["question"]):
+                pool.setdefault(doc.page_content, doc)
+        pools.append(list(pool.values()))
+    return pools
+
+
+def rank_of_relevant(documents, snippet):
+    for rank, doc in enumerate(documents, start=1):
+        if snippet in doc.page_content:
+            return rank
+    return None
+
+
+def evaluate(reranker, fixtures, pools, repeats):
+    latencies, hits, reciprocal_ranks = [], 0, []
+    for fixture, pool in zip(fixtures, pools):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            ranked = reranker.compress_documents(pool, fixture["question"])
+            latencies.append((time.perf_counter() - start) * 1000)
+        rank = rank_of_relevant(ranked, fixture["relevant"])
+        hits += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+    latencies.sort()
+    return {
+        "recall": hits / len(fixtures),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def available(backend):
+    if backend == "cohere" and not os.getenv("cohere_api_key"):
+        return "cohere_api_key not set"
+    if backend == "cross_encoder" and not os.path.isdir(os.path.join(ROOT, cross_encoder_model_dir)):
+        return f"no model in {cross_encoder_model_dir}"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(RERANKER_BACKENDS), choices=RERANKER_BACKENDS)
+    parser.add_argument("--candidates", type=int, default=20, help="keyword candidates reranked per question")
+    parser.add_argument("--top-n", type=int, default=no_k)
+    parser.add_argument("--repeats", type=int, default=3, help="timed reranks per question")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    with open(FIXTURES) as f:
+        fixtures = json.load(f)
+    pools = candidate_pools(fixtures, args.candidates)
+    pool_recall = sum(rank_of_relevant(pool, f["relevant"]) is not None for f, pool in zip(fixtures, pools)) / len(fixtures)
+
+    print(f"Reranker comparison on {len(fixtures)} fixture questions, {args.candidates} candidates, top_n={args.top_n}")
+    print("-" * 72)
+    print(f"{'backend':<16}{'recall':>9}{'MRR':>9}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+    for backend in args.backends:
+        reason = available(backend)
+        if reason:
+            print(f"{backend:<16}skipped ({reason})")
+            continue
+        result = evaluate(create_reranker(backend, top_n=args.top_n), fixtures, pools, args.repeats)
+        print(f"{backend:<16}{result['recall']:>9.2f}{result['mrr']:>9.3f}"
+              f"{result['p50_ms']:>12.2f}{result['p95_ms']:>12.2f}{result['p99_ms']:>12.2f}")
+    print("-" * 72)
+    print(f"Candidate pool recall (upper bound for every backend): {pool_recall:.2f}")
+
+
+if __name__ == "__main__":
+    main()
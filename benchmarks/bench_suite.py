@@ -0,0 +1,186 @@
+"""Offline scenario benchmarks of the hot paths, against the deterministic provider stand-ins.
+
+Run from the repository root:
+    python benchmarks/bench_suite.py --iterations 60 --concurrency 4
+    python benchmarks/bench_suite.py --scenarios ask --latency-scale 0 --save baseline.json
+    python benchmarks/bench_suite.py --compare baseline.json --tolerance 0.25
+
+Scenarios: route (route_node), pipeline (each department's hybrid retrieval and rerank from
+Hybrid_ret.py), memory (LongTermMemory store, history and search), voice (VoiceNode synthesis and
+WAV encoding) and ask (the full /ask request through the FastAPI app). Gemini, embeddings, Cohere
+and Cartesia are replaced by app/fake_providers.py with the injected latency and jitter from
+llm_config; --latency-scale 0 removes it to time only the application's own work.
+
+--compare exits with status 1 when a scenario's p95 grew, or its throughput shrank, by more than
+the tolerance against a file written by --save.
+"""
+import sys
+import os
+import json
+import asyncio
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from offline import (
+    load_questions,
+    prepare_workspace,
+    seed_vector_indexes,
+    measure,
+    summarize,
+    print_header,
+    print_row,
+)
+
+SCENARIOS = ("route", "pipeline", "memory", "voice", "ask")
+DEPARTMENTS = ("engineering", "finance", "general", "hr", "marketing")
+USERS = ["admin@company.com", "engineer@company.com", "finance@company.com", "marketing@company.com",
+         "hr@company.com", "user@company.com"]
+
+
+async def route_scenario(questions, args):
+    from graph import async_nodes
+
+    states = [{"user_question": q["question"], "user_email": USERS[i % len(USERS)]} for i, q in enumerate(questions)]
+    return {"route_node": await measure(async_nodes.route_node, states, args.iterations, args.concurrency)}
+
+
+async def pipeline_scenario(questions, args):
+    from app.Storage.Hybrid_ret import retriever_registry
+
+    results = {}
+    for department in DEPARTMENTS:
+        pipeline = retriever_registry.get(department)
+        inputs = [q["question"] for q in questions if q["department"] == department]
+        results[f"pipeline:{department}"] = await measure(pipeline.ainvoke, inputs, args.iterations, args.concurrency)
+    return results
+
+
+async def memory_scenario(questions, args):
+    from app.fake_providers import FakeChromaEmbeddings
+    from app.memory.longterm_memory import LongTermMemory
+
+    memory = LongTermMemory(persist_directory="bench_memory", embedding_function=FakeChromaEmbeddings())
+    turns = [(USERS[i % len(USERS)], q["question"]) for i, q in enumerate(questions)]
+
+    async def store(turn):
+        await memory.astore_conversation(turn[0], turn[1], f"Answer to: {turn[1]}", "general")
+
+    async def history(turn):
+        await memory.aget_user_history(turn[0], 10)
+
+    async def search(turn):
+        await memory.asearch_user_conversations(turn[0], turn[1], 5)
+
+    return {
+        "memory:store": await measure(store, turns, args.iterations, args.concurrency),
+        "memory:history": await measure(history, turns, args.iterations, args.concurrency),
+        "memory:search": await measure(search, turns, args.iterations, args.concurrency),
+    }
+
+
+async def voice_scenario(questions, args):
+    from graph import async_nodes
+
+    states = [{"response": " ".join([q["question"]] * 6)} for q in questions]
+
+    async def voice(state):
+        if not (await async_nodes.VoiceNode(state))["audio"]:
+            raise RuntimeError("VoiceNode returned no audio")
+
+    return {"voice_node": await measure(voice, states, args.iterations, args.concurrency)}
+
+
+async def ask_scenario(questions, args):
+    import httpx
+    import main
+    from app.cache.answer_cache import answer_cache
+
+    # Repeated fixture questions would otherwise be answered from the cache after the first pass
+    answer_cache.enabled = args.answer_cache
+    await asyncio.to_thread(main.chain_factory.warm)
+    bodies = [{"user_question": q["question"], "user_email": USERS[i % len(USERS)]} for i, q in enumerate(questions)]
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        async def ask(body):
+            response = await client.post("/ask", json=body, timeout=120)
+            response.raise_for_status()
+
+        return {"ask": await measure(ask, bodies, args.iterations, args.concurrency)}
+
+
+SCENARIO_RUNNERS = {
+    "route": route_scenario,
+    "pipeline": pipeline_scenario,
+    "memory": memory_scenario,
+    "voice": voice_scenario,
+    "ask": ask_scenario,
+}
+
+
+def compare(summaries, baseline_path, tolerance) -> bool:
+    """Print regressions against a saved run; True when there are none."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, summary in summaries.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if summary["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.1f} -> {summary['p95_ms']:.1f} ms")
+        if summary["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput']:.1f} -> {summary['throughput']:.1f} req/s")
+    for regression in regressions:
+        print(f"❌ {regression}")
+    if not regressions:
+        print(f"✅ No regression beyond {tolerance:.0%} against {baseline_path}")
+    return not regressions
+
+
+async def run(args):
+    from app.fake_providers import latency
+
+    latency.scale = args.latency_scale
+    questions = load_questions()
+    summaries = {}
+    print_header()
+    for scenario in args.scenarios:
+        for name, result in (await SCENARIO_RUNNERS[scenario](questions, args)).items():
+            summaries[name] = summarize(result)
+            print_row(name, summaries[name])
+            for error in sorted(set(result["errors"]))[:3]:
+                print(f"    ⚠️  {error}")
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--iterations", type=int, default=60, help="calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="calls in flight at once")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier of the injected provider latency")
+    parser.add_argument("--answer-cache", action="store_true", help="keep the answer cache on for the ask scenario")
+    parser.add_argument("--workdir", help="scratch directory for indexes and memory, a new temporary one by default")
+    parser.add_argument("--save", help="write the summaries to this JSON file")
+    parser.add_argument("--compare", help="JSON file from --save to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 / throughput change")
+    args = parser.parse_args()
+
+    if args.save:
+        args.save = os.path.abspath(args.save)
+    if args.compare:
+        args.compare = os.path.abspath(args.compare)
+    print(f"📁 Workspace: {prepare_workspace(args.workdir)}")
+    seed_vector_indexes()
+    summaries = asyncio.run(run(args))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, indent=2)
+        print(f"💾 Saved to {args.save}")
+    if args.compare and not compare(summaries, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Retrieval quality against latency and prompt tokens, per department and retrieval configuration.
+
+Run from the repository root:
+    python benchmarks/eval_retrieval.py
+    python benchmarks/eval_retrieval.py --chunk-size 500 1000 --no-k 2 4 --vector-weight 0.5 0.7
+    python benchmarks/eval_retrieval.py --sweep --latency-scale 0 --save sweep.json
+    python benchmarks/eval_retrieval.py --sweep --live --workdir eval_workspace
+
+Every configuration of chunk_size, chunk_overlap, no_k, vector_weight and keyword_weight (the grid
+of the values given, the current llm_config ones by default) is built the way Hybrid_ret.py builds a
+department: sources split and embedded into their own vector indexes and BM25 index, fused by
+ConcurrentEnsembleRetriever, then reranked to no_k. The questions of
+fixtures/golden_retrieval.json are asked of it and scored:
+
+    recall@k     share of a question's relevant snippets found in the returned chunks of its source
+    MRR          1 / rank of the first returned chunk holding a relevant snippet, 0 when none does
+    p50/p95 ms   end-to-end retrieval latency, reranking included
+    prompt tok   tokens of the QA prompt the returned chunks make, counted by the chat model
+
+Snippets instead of chunk IDs keep the golden sets valid for any chunking. --sweep runs a wider
+grid and marks each department's Pareto front: the configurations no other one beats on recall,
+MRR, p95 and prompt tokens at once. By default the provider stand-ins are used, which rank with
+hashed shingles and only approximate Gemini's tokenizer; --live uses Gemini embeddings and tokens
+and the configured rerankers, for numbers worth choosing settings from.
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import itertools
+import statistics
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from offline import ROOT, prepare_workspace, percentile
+
+GOLDEN = os.path.join(ROOT, "benchmarks", "fixtures", "golden_retrieval.json")
+SWEEP_GRID = {
+    "chunk_size": [500, 1000, 2000],
+    "chunk_overlap": [100, 200],
+    "no_k": [2, 4],
+    "vector_weight": [0.5, 0.7, 0.9],
+}
+OBJECTIVES = (("recall", 1), ("mrr", 1), ("p95_ms", -1), ("prompt_tokens", -1))
+
+
+def load_golden(departments):
+    with open(GOLDEN, encoding="utf-8") as f:
+        golden = json.load(f)
+    return [g for g in golden if g["department"] in departments]
+
+
+def configurations(args):
+    """Grid of the given values; keyword_weight defaults to 1 - vector_weight."""
+    configs = []
+    for chunk_size, chunk_overlap, k, vector in itertools.product(args.chunk_size, args.chunk_overlap, args.no_k,
+                                                                 args.vector_weight):
+        if chunk_overlap >= chunk_size:
+            continue
+        for keyword in args.keyword_weight or [round(1 - vector, 4)]:
+            configs.append({"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "no_k": k,
+                            "vector_weight": vector, "keyword_weight": keyword})
+    return configs
+
+
+def config_label(config) -> str:
+    return (f"cs={config['chunk_size']} co={config['chunk_overlap']} k={config['no_k']} "
+            f"w={config['vector_weight']:g}/{config['keyword_weight']:g}")
+
+
+class IndexBuilder:
+    """Chunks, vector indexes and BM25 indexes of each chunking, built once under eval_indexes/."""
+
+    def __init__(self):
+        self.chunks = {}
+        self.raw_text = set()
+
+    def _documents(self, file_path: str):
+        from langchain_core.documents import Document
+        from app.dataloader.dataload import DataLoader
+
+        loader = DataLoader(file_path)
+        if file_path.endswith(".csv"):
+            return loader.load_csv()
+        try:
+            return loader.load_markdown()
+        except Exception as e:
+            # Same text without unstructured's markup stripping, so relative results still hold
+            if file_path not in self.raw_text:
+                self.raw_text.add(file_path)
+                print(f"⚠️  Markdown loader unavailable for {file_path} ({str(e)}), splitting the raw text")
+            return [Document(page_content=Path(file_path).read_text(encoding="utf-8"), metadata={"source": file_path})]
+
+    def source_chunks(self, file_path: str, chunk_size: int, chunk_overlap: int):
+        from app.dataloader.Database import VectorDB
+        from app.dataloader.splitter import TextSplitter
+
+        key = (file_path, chunk_size, chunk_overlap)
+        if key not in self.chunks:
+            splitter = TextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            self.chunks[key] = VectorDB._unique_chunks(splitter.split_text(self._documents(file_path)))
+        return self.chunks[key]
+
+    def retrievers(self, department: str, config):
+        """Vector retrievers of every source and the BM25 retriever of the first, as in Hybrid_ret.py."""
+        from app.fake_providers import latency
+        from app.dataloader.Database import VectorDB
+        from app.Storage.bm25_index import BM25Index, MmapBM25Retriever
+        from app.Storage.fusion import scored_retriever
+        from app.Storage.Hybrid_ret import DEPARTMENT_SOURCES, base_path
+
+        directory = Path("eval_indexes") / f"cs{config['chunk_size']}_co{config['chunk_overlap']}"
+        vector_retrievers = []
+        # Index builds are set-up, not retrieval; the stand-ins skip their injected latency for them
+        scale, latency.scale = latency.scale, 0.0
+        try:
+            for file_path, db_name in DEPARTMENT_SOURCES[department]:
+                chunks = self.source_chunks(str(base_path / file_path), config["chunk_size"], config["chunk_overlap"])
+                index = VectorDB(str(base_path / file_path), str(directory / db_name))
+                index.build_from_chunks(chunks)
+                vector_retrievers.append(scored_retriever(index.load_existing_db(), k=config["no_k"]))
+
+            keyword_source = str(base_path / DEPARTMENT_SOURCES[department][0][0])
+            keyword_dir = directory / f"{department}_keyword"
+            if not BM25Index.exists(keyword_dir):
+                chunks = self.source_chunks(keyword_source, config["chunk_size"], config["chunk_overlap"])
+                MmapBM25Retriever.from_documents(chunks, keyword_dir)
+        finally:
+            latency.scale = scale
+        return vector_retrievers, MmapBM25Retriever.load(keyword_dir, k=config["no_k"])
+
+
+def build_pipeline(builder, department: str, config, backend: str):
+    from langchain.retrievers import ContextualCompressionRetriever
+    from app.Storage.parallel_ret import ConcurrentEnsembleRetriever
+    from app.Storage.rerankers import create_reranker
+
+    vector_retrievers, keyword_retriever = builder.retrievers(department, config)
+    ensemble = ConcurrentEnsembleRetriever(
+        retrievers=[*vector_retrievers, keyword_retriever],
+        weights=[config["vector_weight"] / len(vector_retrievers)] * len(vector_retrievers) + [config["keyword_weight"]]
+    )
+    return ContextualCompressionRetriever(base_compressor=create_reranker(backend, top_n=config["no_k"]),
+                                          base_retriever=ensemble)
+
+
+def score(documents, golden):
+    """Recall of the golden snippets and reciprocal rank of the first relevant chunk from the golden source."""
+    from_source = [d.page_content if Path(d.metadata.get("source", "")).name == Path(golden["source"]).name else ""
+                   for d in documents]
+    found = [any(snippet in text for text in from_source) for snippet in golden["relevant"]]
+    rank = next((i for i, text in enumerate(from_source, start=1)
+                 if any(snippet in text for snippet in golden["relevant"])), None)
+    return sum(found) / len(found), 1 / rank if rank else 0.0
+
+
+def evaluate(pipeline, questions, prompt, llm, repeats: int):
+    recalls, reciprocal_ranks, latencies, tokens = [], [], [], []
+    # Untimed first call, so opening the indexes is not counted as retrieval latency
+    pipeline.invoke(questions[0]["question"])
+    for golden in questions:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            documents = pipeline.invoke(golden["question"])
+            latencies.append((time.perf_counter() - start) * 1000)
+        recall, reciprocal_rank = score(documents, golden)
+        recalls.append(recall)
+        reciprocal_ranks.append(reciprocal_rank)
+        context = "\n\n".join(d.page_content for d in documents)
+        tokens.append(llm.get_num_tokens(prompt.format(context=context, question=golden["question"])))
+    return {
+        "recall": statistics.mean(recalls),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "prompt_tokens": statistics.mean(tokens),
+    }
+
+
+def pareto_front(results):
+    """Indexes of the results no other result is at least as good as on every objective and better on one."""
+    def dominates(a, b):
+        at_least = all(sign * a[name] >= sign * b[name] for name, sign in OBJECTIVES)
+        better = any(sign * a[name] > sign * b[name] for name, sign in OBJECTIVES)
+        return at_least and better
+
+    return [i for i, result in enumerate(results) if not any(dominates(other, result) for other in results)]
+
+
+def print_department(department, configs, results, front):
+    print(f"\n📊 {department}")
+    print(f"  {'configuration':<36}{'recall@k':>10}{'MRR':>8}{'p50 ms':>10}{'p95 ms':>10}{'prompt tok':>12}")
+    for i, (config, result) in enumerate(zip(configs, results)):
+        marker = "*" if i in front else " "
+        print(f"{marker} {config_label(config):<36}{result['recall']:>10.2f}{result['mrr']:>8.3f}"
+              f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['prompt_tokens']:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, nargs="+", help="llm_config value by default")
+    parser.add_argument("--chunk-overlap", type=int, nargs="+", help="llm_config value by default")
+    parser.add_argument("--no-k", type=int, nargs="+", help="llm_config value by default")
+    parser.add_argument("--vector-weight", type=float, nargs="+", help="llm_config value by default")
+    parser.add_argument("--keyword-weight", type=float, nargs="+", help="1 - vector weight by default")
+    parser.add_argument("--sweep", action="store_true", help="grid over the SWEEP_GRID values of the options not given")
+    parser.add_argument("--departments", nargs="+", default=["engineering", "finance", "general", "hr", "marketing"])
+    parser.add_argument("--reranker", help="backend for every department instead of reranker_backends")
+    parser.add_argument("--repeats", type=int, default=3, help="timed retrievals per question")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier of the stand-ins' injected latency")
+    parser.add_argument("--live", action="store_true", help="use the configured providers instead of the stand-ins")
+    parser.add_argument("--workdir", help="scratch directory for the indexes, a new temporary one by default")
+    parser.add_argument("--save", help="write every result and the Pareto fronts to this JSON file")
+    args = parser.parse_args()
+
+    if args.live:
+        # offline.py switched to the stand-ins and placeholder keys on import; undo both before the app loads
+        os.environ["FAKE_PROVIDERS"] = "0"
+        for key in ("GOOGLE_API_KEY", "cohere_api_key"):
+            if os.environ.get(key) == "benchmark-placeholder":
+                del os.environ[key]
+    from app import llm_config
+
+    if args.keyword_weight is None and args.vector_weight is None and not args.sweep:
+        args.keyword_weight = [llm_config.keyword_weight]
+    for name, values in SWEEP_GRID.items():
+        if getattr(args, name) is None:
+            setattr(args, name, values if args.sweep else [getattr(llm_config, name)])
+    if args.save:
+        args.save = os.path.abspath(args.save)
+    print(f"📁 Workspace: {prepare_workspace(args.workdir)}")
+
+    from langchain.chains.question_answering.stuff_prompt import PROMPT_SELECTOR
+    from app.fake_providers import latency
+    from app.llm_config import reranker_backends, reranker_default_backend
+    from graph.chains import llm
+
+    latency.scale = args.latency_scale
+    prompt = PROMPT_SELECTOR.get_prompt(llm)
+    golden = load_golden(args.departments)
+    configs = configurations(args)
+    builder = IndexBuilder()
+    print(f"🔍 {len(configs)} configuration(s), {len(golden)} golden questions")
+
+    report = {}
+    for department in args.departments:
+        questions = [g for g in golden if g["department"] == department]
+        backend = args.reranker or reranker_backends.get(department, reranker_default_backend)
+        results = [evaluate(build_pipeline(builder, department, config, backend), questions, prompt, llm, args.repeats)
+                   for config in configs]
+        front = pareto_front(results)
+        print_department(department, configs, results, front)
+        report[department] = {
+            "results": [{**config, **result} for config, result in zip(configs, results)],
+            "pareto_front": [configs[i] for i in front],
+        }
+    print("\n* Pareto front: no other configuration has higher recall@k and MRR with lower p95 and prompt tokens")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
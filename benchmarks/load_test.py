@@ -0,0 +1,238 @@
+"""Load generator for the FastAPI service: latency distribution, error rate and saturation curves.
+
+Run from the repository root, against a server it starts with the provider stand-ins:
+    python benchmarks/load_test.py --concurrency 1 2 4 8 16 --duration 20 --workers 1
+    python benchmarks/load_test.py --rps 2 4 8 16 --duration 20 --workers 2 --csv saturation.csv
+or against one already running (start it with FAKE_PROVIDERS=1 to stay offline):
+    python benchmarks/load_test.py --url http://localhost:8000 --rps 5 --duration 60
+
+Each level replays a weighted mix of /ask (text, and voice questions that are answered with
+audio), /history and /search. --concurrency keeps that many employees asking back to back
+(closed loop); --rps sends requests at that rate whatever the response times (open loop, Poisson
+arrivals), which is what shows queueing and 429/503 shedding once the worker saturates. Every
+level reports throughput, p50/p95/p99 and error rate per request type; the table across levels is
+the saturation curve, and --csv writes it for plotting.
+"""
+import sys
+import os
+import time
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+from collections import Counter, defaultdict
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from offline import ROOT, load_questions, prepare_workspace, seed_vector_indexes, percentile
+
+import httpx
+
+USERS = ["admin@company.com", "engineer@company.com", "finance@company.com", "marketing@company.com",
+         "hr@company.com", "user@company.com"]
+DEFAULT_MIX = "ask=0.6,ask_voice=0.1,history=0.2,search=0.1"
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, weight = part.split("=")
+        if kind not in ("ask", "ask_voice", "history", "search"):
+            raise ValueError(f"Unknown request type {kind}")
+        mix[kind] = float(weight)
+    return mix
+
+
+class RequestMix:
+    """Seeded stream of (kind, method, path, params, body) drawn from the weighted mix."""
+
+    def __init__(self, mix, seed):
+        self.kinds, self.weights = zip(*mix.items())
+        self.questions = [q["question"] for q in load_questions()]
+        self.rng = random.Random(seed)
+
+    def next(self):
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        user = self.rng.choice(USERS)
+        question = self.rng.choice(self.questions)
+        if kind == "ask":
+            return kind, "POST", "/ask", None, {"user_question": question, "user_email": user}
+        if kind == "ask_voice":
+            return kind, "POST", "/ask", None, {"user_question": f"{question} Please answer in voice.", "user_email": user}
+        if kind == "history":
+            return kind, "GET", f"/history/{user}", {"limit": 10}, None
+        return kind, "POST", f"/search/{user}", {"query": question, "limit": 5}, None
+
+
+async def send(client, request, results, timeout):
+    kind, method, path, params, body = request
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, path, params=params, json=body, timeout=timeout)
+        outcome = str(response.status_code)
+        ok = response.status_code < 400 and "error" not in response.json()
+    except httpx.TimeoutException:
+        outcome, ok = "timeout", False
+    except httpx.HTTPError as e:
+        outcome, ok = type(e).__name__, False
+    results.append((kind, (time.perf_counter() - start) * 1000, ok, outcome))
+
+
+async def closed_loop(client, mix, concurrency, duration, timeout):
+    """concurrency employees each sending their next request as soon as the last one is answered."""
+    results, deadline = [], time.perf_counter() + duration
+
+    async def employee():
+        while time.perf_counter() < deadline:
+            await send(client, mix.next(), results, timeout)
+
+    await asyncio.gather(*(employee() for _ in range(concurrency)))
+    return results
+
+
+async def open_loop(client, mix, rps, duration, timeout, seed):
+    """Requests arriving at rps on average (exponential gaps), independent of response times."""
+    results, tasks, rng = [], [], random.Random(seed)
+    loop = asyncio.get_running_loop()
+    start = next_at = loop.time()
+    while next_at < start + duration:
+        await asyncio.sleep(max(0.0, next_at - loop.time()))
+        tasks.append(asyncio.create_task(send(client, mix.next(), results, timeout)))
+        next_at += rng.expovariate(rps)
+    await asyncio.gather(*tasks)
+    return results
+
+
+def level_summary(label, results, elapsed):
+    latencies = [ms for _, ms, ok, _ in results if ok] or [float("nan")]
+    errors = sum(1 for _, _, ok, _ in results if not ok)
+    return {
+        "level": label,
+        "requests": len(results),
+        "throughput": (len(results) - errors) / elapsed,
+        "error_rate": errors / len(results) if results else 0.0,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+def print_level(label, results, elapsed):
+    print(f"\n📊 {label}: {len(results)} requests in {elapsed:.1f}s")
+    print(f"  {'type':<12}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    by_kind = defaultdict(list)
+    for result in results:
+        by_kind[result[0]].append(result)
+    for kind, rows in sorted(by_kind.items()):
+        latencies = [ms for _, ms, ok, _ in rows if ok] or [float("nan")]
+        errors = sum(1 for _, _, ok, _ in rows if not ok)
+        print(f"  {kind:<12}{len(rows):>7}{errors:>8}{percentile(latencies, 0.5):>10.1f}"
+              f"{percentile(latencies, 0.95):>10.1f}{percentile(latencies, 0.99):>10.1f}")
+    outcomes = Counter(outcome for _, _, ok, outcome in results if not ok)
+    if outcomes:
+        print("  errors: " + ", ".join(f"{outcome} x{count}" for outcome, count in outcomes.most_common()))
+    # Latency distribution of successful requests
+    counts = Counter(next((b for b in LATENCY_BUCKETS_MS if ms <= b), float("inf"))
+                     for _, ms, ok, _ in results if ok)
+    total = max(sum(counts.values()), 1)
+    for bound in [*LATENCY_BUCKETS_MS, float("inf")]:
+        if counts[bound]:
+            label = f"<= {bound:g} ms" if bound != float("inf") else f"> {LATENCY_BUCKETS_MS[-1]} ms"
+            print(f"  {label:>12} {'█' * max(1, round(40 * counts[bound] / total))} {counts[bound]}")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, workdir):
+    """uvicorn serving app/main.py with the provider stand-ins, from the scratch workspace."""
+    port = free_port()
+    env = {**os.environ, "FAKE_PROVIDERS": "1", "PYTHONPATH": os.pathsep.join([ROOT, os.path.join(ROOT, "app")])}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", os.path.join(ROOT, "app"), "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=env
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with status {server.returncode}")
+        try:
+            if httpx.get(url + "/", timeout=1).status_code == 200:
+                return server, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("Server did not start within 300s")
+
+
+async def run(args, url):
+    mix = RequestMix(parse_mix(args.mix), args.seed)
+    levels = [("rps", rps) for rps in args.rps] if args.rps else [("concurrency", c) for c in args.concurrency]
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    curve = []
+    async with httpx.AsyncClient(base_url=url, limits=limits) as client:
+        for kind, value in levels:
+            label = f"{kind} {value:g}"
+            start = time.perf_counter()
+            if kind == "rps":
+                results = await open_loop(client, mix, value, args.duration, args.timeout, args.seed)
+            else:
+                results = await closed_loop(client, mix, int(value), args.duration, args.timeout)
+            elapsed = time.perf_counter() - start
+            print_level(label, results, elapsed)
+            curve.append(level_summary(label, results, elapsed))
+    return curve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8], help="closed-loop levels")
+    load.add_argument("--rps", type=float, nargs="+", help="open-loop arrival rates")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weights of ask, ask_voice, history and search")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds before a request counts as failed")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--url", help="target an already running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the started server")
+    parser.add_argument("--workdir", help="scratch directory of the started server, a new temporary one by default")
+    parser.add_argument("--csv", help="write the saturation curve to this file")
+    args = parser.parse_args()
+
+    if args.csv:
+        args.csv = os.path.abspath(args.csv)
+    server, url = None, args.url
+    if url is None:
+        workdir = prepare_workspace(args.workdir)
+        print(f"📁 Workspace: {workdir}")
+        seed_vector_indexes()
+        server, url = start_server(args.workers, workdir)
+        print(f"🚀 Server with {args.workers} worker(s) at {url}")
+    try:
+        curve = asyncio.run(run(args, url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=60)
+
+    print("\n📈 Saturation curve")
+    print(f"{'level':<18}{'requests':>10}{'ok req/s':>10}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for row in curve:
+        print(f"{row['level']:<18}{row['requests']:>10}{row['throughput']:>10.1f}{row['error_rate']:>9.1%}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    if args.csv:
+        with open(args.csv, "w", encoding="utf-8") as f:
+            f.write(",".join(curve[0].keys()) + "\n")
+            for row in curve:
+                f.write(",".join(str(value) for value in row.values()) + "\n")
+        print(f"💾 Saved to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Shared setup of the offline benchmarks: provider stand-ins, a scratch workspace and reporting.
+
+Import this module before anything from app/: it switches every provider to the deterministic
+stand-ins in app/fake_providers.py (FAKE_PROVIDERS=1), so no key or network is needed.
+prepare_workspace() then moves into a scratch directory where the vector indexes, embedding
+cache and conversation memory are created, leaving the checkout untouched.
+"""
+import sys
+import os
+import re
+import json
+import time
+import asyncio
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "app"))
+os.environ["FAKE_PROVIDERS"] = "1"
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+os.environ.setdefault("cohere_api_key", "benchmark-placeholder")
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "rerank_questions.json")
+KEYWORD_RETRIEVERS = ["eng_keyword", "fin_summary_keyword", "fin_quarterly_keyword", "general_keyword",
+                      "hr_keyword", "marketing_keyword"]
+# Questions spanning departments, so multi-route fan-out is part of the mix
+MULTI_DEPARTMENT_QUESTIONS = [
+    "How did marketing campaign spend affect cash flow this quarter?",
+    "What did the engineering infrastructure cost in the financial summary?",
+    "How many employees work in marketing and what was the campaign ROI?",
+]
+
+
+def load_questions():
+    """Fixture questions with their department, plus the multi-department ones."""
+    with open(FIXTURES, encoding="utf-8") as f:
+        fixtures = json.load(f)
+    return [{"department": q["department"], "question": q["question"]} for q in fixtures] + \
+        [{"department": None, "question": q} for q in MULTI_DEPARTMENT_QUESTIONS]
+
+
+def prepare_workspace(workdir=None) -> str:
+    """Move into a scratch directory that links resources/ and retrievers/ from the checkout."""
+    workdir = os.path.abspath(workdir or tempfile.mkdtemp(prefix="ds-rpc-bench-"))
+    os.makedirs(workdir, exist_ok=True)
+    for name in ("resources", "retrievers"):
+        link = os.path.join(workdir, name)
+        if not os.path.exists(link):
+            os.symlink(os.path.join(ROOT, name), link)
+    os.chdir(workdir)
+    return workdir
+
+
+def _file_name(path: str) -> str:
+    # Keyword pickles were built on Windows, so sources use backslashes
+    return re.split(r"[\\/]", path)[-1]
+
+
+def seed_vector_indexes():
+    """Embed every department's chunks with the stand-in embeddings into its vector directory.
+
+    Chunks come from the saved keyword retrievers, the same split the vector stores were built from,
+    so seeding needs no document loaders; a source without keyword chunks is loaded and split.
+    Checkpoints make a second run in the same workspace a no-op.
+    """
+    from app.fake_providers import latency
+    from app.dataloader.Database import VectorDB
+    from app.Storage.keyword_ret import KeywordRetrieverManager
+    from app.Storage.Hybrid_ret import DEPARTMENT_SOURCES, base_path
+
+    manager = KeywordRetrieverManager()
+    by_file = {}
+    for name in KEYWORD_RETRIEVERS:
+        retriever = manager.get_retriever(name)
+        if hasattr(retriever, "index"):
+            documents = [retriever.index.document(i) for i in range(retriever.index.meta["n_docs"])]
+        else:
+            documents = retriever.docs
+        for doc in documents:
+            by_file.setdefault(_file_name(doc.metadata.get("source", "")), []).append(doc)
+
+    scale, latency.scale = latency.scale, 0.0
+    try:
+        for department, sources in DEPARTMENT_SOURCES.items():
+            for file_path, db_name in sources:
+                index = VectorDB(str(base_path / file_path), db_name)
+                chunks = by_file.get(_file_name(file_path))
+                if chunks is None:
+                    try:
+                        chunks = index.load_chunks("csv" if file_path.endswith(".csv") else "markdown")
+                    except Exception as e:
+                        print(f"⚠️  {db_name}: no chunks for {file_path} ({str(e)}), left empty")
+                        continue
+                index.build_from_chunks(chunks)
+                print(f"✅ {db_name}: {len(chunks)} chunks ({department})")
+    finally:
+        latency.scale = scale
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+async def measure(call, inputs, iterations: int, concurrency: int):
+    """Await call(input) iterations times over the inputs, at most concurrency at once."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call(inputs[i % len(inputs)])
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                return
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(iterations)))
+    return {"latencies": latencies, "errors": errors, "wall": time.perf_counter() - start}
+
+
+def summarize(result) -> dict:
+    latencies = result["latencies"] or [float("nan")]
+    return {
+        "calls": len(result["latencies"]) + len(result["errors"]),
+        "errors": len(result["errors"]),
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "throughput": len(result["latencies"]) / result["wall"] if result["wall"] else 0.0,
+    }
+
+
+def print_header():
+    print(f"{'scenario':<28}{'calls':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    print("-" * 82)
+
+
+def print_row(name, summary):
+    print(f"{name:<28}{summary['calls']:>7}{summary['errors']:>8}{summary['p50_ms']:>10.1f}"
+          f"{summary['p95_ms']:>10.1f}{summary['p99_ms']:>10.1f}{summary['throughput']:>9.1f}")